@@ -0,0 +1,204 @@
+# Purpose:
+#   to stand in for chain endpoints during offline benchmarks: one process listens on a range of
+#   ports (each port is a separate "host" to the per-host prober) and answers the RPC /status
+#   and REST syncing/latest-block queries the tooling sends, with optional latency and a stable
+#   set of failing endpoints; it also serves release binaries under /binaries/ (deterministic
+#   content, Range requests honoured unless turned off, a stable set of downloads cut off
+#   halfway), Tendermint WebSocket subscriptions at <endpoint>/websocket, and, on a second
+#   range of ports, gRPC servers with the health service (even ports only) and server reflection;
+#   createApp() and startGrpcServer() also start single variants in-process for tests
+#
+# Usage:
+#   python .github/workflows/benchmarks/mock_server.py --port 18600 --ports 32 --latency-ms 20 --failure-rate 0.1 --grpc-port 18700 --grpc-ports 8
+
+
+# -- IMPORTS --
+
+import argparse
+import asyncio
+import hashlib
+import json
+import re
+import zlib
+
+import grpc
+from aiohttp import web
+
+
+# -- VARIABLES --
+
+defaultPort = 18600
+
+blockHeight = "1000000"
+
+responses = {
+    "/status": {"result": {"sync_info": {"latest_block_height": blockHeight, "catching_up": False}}},
+    "/cosmos/base/tendermint/v1beta1/syncing": {"syncing": False},
+    "/cosmos/base/tendermint/v1beta1/blocks/latest": {"block": {"header": {"height": blockHeight}}},
+}
+
+
+binaryPrefix = "/binaries/"
+
+defaultBinarySize = 1 << 20
+
+rangePattern = re.compile(r"bytes=(\d+)-$")
+
+defaultGrpcPort = 18700
+
+# HealthCheckResponse{status: SERVING} and {status: NOT_SERVING}, and a ServerReflectionResponse
+# carrying an empty list_services_response (field 6)
+grpcServing = b"\x08\x01"
+grpcNotServing = b"\x08\x02"
+grpcServiceList = b"\x32\x00"
+
+
+# -- SERVER --
+
+def endpointOf(path):
+    # synthetic addresses are http://host/<chain>/<type>/<n>; anything after is the query
+    return "/".join(path.split("/")[:4])
+
+
+def isFailing(endpoint, failureRate):
+    # the same endpoints fail on every request and every run
+    return zlib.crc32(endpoint.encode("utf-8")) % 10000 < failureRate * 10000
+
+
+def binaryContent(name, size=defaultBinarySize):
+    # the bytes served for /binaries/<name>?size=<size>, so checksums can be computed offline
+    block = hashlib.sha256(name.encode("utf-8")).digest() * 2048
+    return (block * (size // len(block) + 1))[:size]
+
+
+def binaryUrl(host, name, size=defaultBinarySize):
+    # the URL of a served binary, with its go-getter style checksum
+    return "http://" + host + binaryPrefix + name + "?size=" + str(size) + "&checksum=sha256:" + hashlib.sha256(binaryContent(name, size)).hexdigest()
+
+
+async def serveBinary(request, interruptRate, honourRange=True):
+    name = request.path[len(binaryPrefix):]
+    content = binaryContent(name, int(request.query.get("size", defaultBinarySize)))
+    match = rangePattern.match(request.headers.get("Range", "")) if honourRange else None
+    start = int(match.group(1)) if match else 0
+    if start >= len(content) and start:
+        return web.Response(status=416, headers={"Content-Range": "bytes */" + str(len(content))})
+    response = web.StreamResponse(status=206 if start else 200, headers={"Content-Length": str(len(content) - start), "Accept-Ranges": "bytes"})
+    if start:
+        response.headers["Content-Range"] = "bytes " + str(start) + "-" + str(len(content) - 1) + "/" + str(len(content))
+    await response.prepare(request)
+    if not start and isFailing(name, interruptRate):
+        # the same downloads are cut off on every first attempt; a Range request completes them
+        await response.write(content[:len(content) // 2])
+        request.transport.close()
+        return response
+    await response.write(content[start:])
+    await response.write_eof()
+    return response
+
+
+async def serveWebsocket(request, websocketError=None):
+    # acknowledges every JSON-RPC request, as a node does a subscription, or answers each with
+    # `websocketError` as the JSON-RPC error
+    ws = web.WebSocketResponse()
+    await ws.prepare(request)
+    async for message in ws:
+        if message.type == web.WSMsgType.TEXT:
+            response = {"jsonrpc": "2.0", "id": json.loads(message.data).get("id")}
+            if websocketError:
+                response["error"] = websocketError
+            else:
+                response["result"] = {}
+            await ws.send_str(json.dumps(response))
+    return ws
+
+
+def grpcHandlers(health, failing, serving=True, latency=0):
+    async def check(request, context):
+        if latency:
+            await asyncio.sleep(latency)
+        if failing:
+            await context.abort(grpc.StatusCode.UNAVAILABLE, "unavailable")
+        return grpcServing if serving else grpcNotServing
+
+    async def reflect(requests, context):
+        if latency:
+            await asyncio.sleep(latency)
+        if failing:
+            await context.abort(grpc.StatusCode.UNAVAILABLE, "unavailable")
+        async for request in requests:
+            yield grpcServiceList
+
+    # requests and responses stay raw bytes, as no serializers are given
+    handlers = [grpc.method_handlers_generic_handler("grpc.reflection.v1alpha.ServerReflection", {"ServerReflectionInfo": grpc.stream_stream_rpc_method_handler(reflect)})]
+    if health:
+        handlers.append(grpc.method_handlers_generic_handler("grpc.health.v1.Health", {"Check": grpc.unary_unary_rpc_method_handler(check)}))
+    return handlers
+
+
+async def startGrpcServer(port, health=True, failing=False, serving=True, latency=0):
+    # returns (started server, port); port 0 picks a free one
+    server = grpc.aio.server()
+    server.add_generic_rpc_handlers(grpcHandlers(health, failing, serving, latency))
+    port = server.add_insecure_port("127.0.0.1:" + str(port))
+    await server.start()
+    return server, port
+
+
+def createApp(latency=0, failureRate=0, interruptRate=0, honourRange=True, websocketError=None):
+    async def handle(request):
+        if latency:
+            await asyncio.sleep(latency)
+        if request.path.startswith(binaryPrefix):
+            return await serveBinary(request, interruptRate, honourRange)
+        if isFailing(endpointOf(request.path), failureRate):
+            return web.Response(status=503)
+        query = request.path[len(endpointOf(request.path)):]
+        if query == "/websocket":
+            return await serveWebsocket(request, websocketError)
+        # the bare endpoint answers like an RPC/REST root does
+        return web.json_response(responses.get(query, {}))
+
+    app = web.Application()
+    app.router.add_get("/{tail:.*}", handle)
+    return app
+
+
+async def serve(port=defaultPort, ports=1, latency=0, failureRate=0, interruptRate=0, grpcPort=defaultGrpcPort, grpcPorts=0):
+    runner = web.AppRunner(createApp(latency, failureRate, interruptRate), access_log=None)
+    await runner.setup()
+    for i in range(ports):
+        await web.TCPSite(runner, "127.0.0.1", port + i, backlog=1024).start()
+    print("Serving on 127.0.0.1:" + str(port) + "-" + str(port + ports - 1), flush=True)
+    # one server per port, so each port can answer differently
+    grpcServers = []
+    for i in range(grpcPorts):
+        server, _ = await startGrpcServer(grpcPort + i, i % 2 == 0, isFailing(str(grpcPort + i), failureRate), latency=latency)
+        grpcServers.append(server)
+    if grpcPorts:
+        print("Serving gRPC on 127.0.0.1:" + str(grpcPort) + "-" + str(grpcPort + grpcPorts - 1), flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await asyncio.gather(*(server.stop(None) for server in grpcServers))
+        await runner.cleanup()
+
+
+def hosts(port=defaultPort, ports=1):
+    return ["127.0.0.1:" + str(port + i) for i in range(ports)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve mock chain endpoints for offline benchmarks")
+    parser.add_argument("--port", type=int, default=defaultPort, help="first port to listen on")
+    parser.add_argument("--ports", type=int, default=1, help="number of consecutive ports (hosts) to listen on")
+    parser.add_argument("--latency-ms", type=float, default=0, help="delay before every response")
+    parser.add_argument("--failure-rate", type=float, default=0, help="fraction of endpoints that answer 503")
+    parser.add_argument("--interrupt-rate", type=float, default=0, help="fraction of binaries whose first download is cut off halfway")
+    parser.add_argument("--grpc-port", type=int, default=defaultGrpcPort, help="first port for gRPC servers")
+    parser.add_argument("--grpc-ports", type=int, default=0, help="number of consecutive gRPC ports (hosts)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.port, args.ports, args.latency_ms / 1000, args.failure_rate, args.interrupt_rate, args.grpc_port, args.grpc_ports))
+    except KeyboardInterrupt:
+        pass
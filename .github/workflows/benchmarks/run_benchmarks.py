@@ -0,0 +1,313 @@
+# Purpose:
+#   to time the Python tooling (endpoint test collection, checkChains, the IBC data tests, endpoint
+#   probing, the stale-endpoint pipeline and binary checksum verification) against synthetic
+#   registries of 1x, 10x, ... the current size, offline, and store the results as JSON so runs
+#   can be compared across commits; a stage whose tool reports failures fails the run, since its
+#   timings no longer measure the tool doing its job
+#
+# Usage (from the registry root):
+#   python .github/workflows/benchmarks/run_benchmarks.py --scales 1 10 --repeat 3
+#   python .github/workflows/benchmarks/run_benchmarks.py --compare .cache/benchmarks/<old>.json
+#
+# Every stage runs in a fresh process with the synthetic registry as its working directory, the
+# way CI runs the tools; endpoints point at mock_server.py.
+
+
+# -- IMPORTS --
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+benchmarksDirectory = os.path.dirname(os.path.abspath(__file__))
+utilityDirectory = os.path.join(benchmarksDirectory, os.pardir, "utility")
+testsDirectory = os.path.join(benchmarksDirectory, os.pardir, "tests")
+
+sys.path.append(utilityDirectory)
+from chain_registry import cacheDirectoryName, chainRegistryRoot, getCachePath  # noqa: E402
+from endpoint_history import EndpointHistory  # noqa: E402
+
+import mock_server  # noqa: E402
+from synthetic_registry import generateRegistry  # noqa: E402
+
+
+# -- VARIABLES --
+
+resultsVersion = 1
+
+resultMarker = "BENCHMARK_RESULT "
+
+stages = ["endpoint_tests", "check_chains", "ibc_tests", "probe", "stale_endpoints", "binaries"]
+
+# stages that edit the registry; it is regenerated before the next run of any stage
+mutatingStages = {"stale_endpoints"}
+
+mockPort = 18600
+mockPorts = 32
+mockFailureRate = 0.05
+# binaries whose first download is cut off, so the verifier has to resume them
+mockInterruptRate = 0.1
+# gRPC servers answering the synthetic registry's grpc endpoints (health on every other one)
+mockGrpcPort = 18700
+mockGrpcPorts = 8
+
+# history written for the stale-endpoint stage: every endpoint last succeeded this long ago,
+# so the pipeline has to probe all of them
+staleDays = 40
+
+
+# -- STAGES --
+# each runs inside the synthetic registry and returns {"timings": {...}, "metrics": {...}}
+
+def stageEndpointTests():
+    sys.path.append(testsDirectory)
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(os.path.join(".pytest_cache", "endpoint_tests.json"))
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        start = time.perf_counter()
+        import apis  # collects the tests on import, with an empty endpoint cache
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        testCases = apis.generate_endpoint_tests()
+        warm = time.perf_counter() - start
+    return {"timings": {"cold": cold, "warm": warm}, "metrics": {"test_cases": len(testCases)}}
+
+
+def stageCheckChains():
+    import chain_registry
+    import validate_data
+    # the SLIP tables describe real chains only
+    validate_data.checkSlip173 = 0
+    validate_data.checkSlip44 = 0
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(getCachePath(validate_data.manifestFileName, os.getcwd()))
+    timings = {}
+    failed = False
+    for name in ("full", "incremental"):
+        # a fresh registry parse each time, as a new CI process would do
+        chain_registry._getRegistry.cache_clear()
+        start = time.perf_counter()
+        failed = bool(validate_data.checkChains(incremental=True)) or failed
+        timings[name] = time.perf_counter() - start
+    return {"timings": timings, "metrics": {"failed": int(failed)}, "failed": failed}
+
+
+def stageIbcTests():
+    import pytest
+    start = time.perf_counter()
+    exitCode = pytest.main(["-q", "-p", "no:cacheprovider", "--import-mode=append", os.path.join(utilityDirectory, "test_ibcdata.py")])
+    return {"timings": {"total": time.perf_counter() - start}, "metrics": {"exit_code": int(exitCode)}, "failed": exitCode != 0}
+
+
+def stageProbe():
+    sys.path.append(testsDirectory)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        import apis
+        from prober import run_probes
+    # the mock hosts are ours, so pacing is off and only the prober itself is measured
+    start = time.perf_counter()
+    results = run_probes(apis.test_cases, rate_per_host=0)
+    elapsed = time.perf_counter() - start
+    ok = sum(result.ok for result in results.values())
+    # probes and successes per endpoint type, e.g. {"grpc": [120, 114]}
+    byType = {}
+    for result in results.values():
+        counts = byType.setdefault(result.test_case.endpoint, [0, 0])
+        counts[0] += 1
+        counts[1] += result.ok
+    return {"timings": {"total": elapsed}, "metrics": {"probes": len(results), "ok": ok, "per_second": round(len(results) / elapsed, 1), "by_type": byType}}
+
+
+def stageStaleEndpoints():
+    import chain_registry
+    registry = chain_registry.loadRegistry(os.getcwd())
+    then = time.time() - staleDays * 24 * 60 * 60
+    history = EndpointHistory(root=registry.root)
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(history.path)
+    records = [
+        (then, chain.chain_name, endpointType, endpoint["address"], True, 200, 0.01)
+        for chain in registry.getChains(network_types=["mainnet"], domains=["cosmos"])
+        for endpointType in ("rpc", "rest")
+        for endpoint in chain.chain.get("apis", {}).get(endpointType, [])
+    ]
+    history.append(records)
+    start = time.perf_counter()
+    # a separate interpreter, since the script's Pool workers must be able to import it
+    output = subprocess.run([sys.executable, os.path.join("_scripts", "remove-stale-endpoints.py")], capture_output=True, text=True, check=True).stdout
+    elapsed = time.perf_counter() - start
+    removed = sum(line.startswith("[-]") for line in output.splitlines())
+    return {"timings": {"total": elapsed}, "metrics": {"candidates": len(records), "removed": removed}}
+
+
+def stageBinaries():
+    import binary_checksums
+    import chain_registry
+    registry = chain_registry.loadRegistry(os.getcwd())
+    binaries = binary_checksums.collectBinaries(registry)
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(getCachePath(binary_checksums.cacheFileName, registry.root))
+    shutil.rmtree(getCachePath(binary_checksums.partialDirectoryName, registry.root), ignore_errors=True)
+    timings = {}
+    for name in ("cold", "cached"):
+        start = time.perf_counter()
+        results = binary_checksums.verifyBinaries(binaries, registry.root)
+        timings[name] = time.perf_counter() - start
+    verified = sum(result.status in ("verified", "cached") for result in results)
+    return {"timings": timings, "metrics": {"binaries": len(binaries), "verified": verified}, "failed": verified != len(binaries)}
+
+
+stageFunctions = {
+    "endpoint_tests": stageEndpointTests,
+    "check_chains": stageCheckChains,
+    "ibc_tests": stageIbcTests,
+    "probe": stageProbe,
+    "stale_endpoints": stageStaleEndpoints,
+    "binaries": stageBinaries,
+}
+
+
+def runChild(stage):
+    # stage output is dropped; only the result line reaches the parent
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        result = stageFunctions[stage]()
+    print(resultMarker + json.dumps(result), flush=True)
+
+
+# -- RUNNER --
+
+def runStage(stage, root):
+    process = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", stage],
+        cwd=root, capture_output=True, text=True,
+    )
+    for line in process.stdout.splitlines():
+        if line.startswith(resultMarker):
+            return json.loads(line[len(resultMarker):])
+    raise Exception(stage + " failed:\n" + process.stderr[-2000:])
+
+
+def waitForPort(port, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        with contextlib.suppress(OSError), socket.create_connection(("127.0.0.1", port), timeout=1):
+            return
+        time.sleep(0.1)
+    raise Exception("mock server did not start on port " + str(port))
+
+
+def gitRevision(root):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=root, capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root, capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def summarize(runs):
+    return {"runs": [round(run, 4) for run in runs], "min": round(min(runs), 4), "median": round(statistics.median(runs), 4)}
+
+
+def runBenchmarks(scales, repeat, selectedStages, workdir=None):
+    server = subprocess.Popen([sys.executable, mock_server.__file__, "--port", str(mockPort), "--ports", str(mockPorts), "--failure-rate", str(mockFailureRate), "--interrupt-rate", str(mockInterruptRate), "--grpc-port", str(mockGrpcPort), "--grpc-ports", str(mockGrpcPorts)], stdout=subprocess.DEVNULL)
+    results = []
+    try:
+        waitForPort(mockPort)
+        hosts = mock_server.hosts(mockPort, mockPorts)
+        grpcHosts = mock_server.hosts(mockGrpcPort, mockGrpcPorts)
+        for scale in scales:
+            root = tempfile.mkdtemp(prefix="registry-" + str(scale) + "x-", dir=workdir)
+            try:
+                start = time.perf_counter()
+                generated = generateRegistry(root, scale, hosts, grpcHosts=grpcHosts)
+                print(str(scale) + "x: generated " + json.dumps(generated) + " in " + str(round(time.perf_counter() - start, 1)) + "s", flush=True)
+                mutated = False
+                for stage in selectedStages:
+                    timings = {}
+                    metrics = {}
+                    failed = False
+                    for i in range(repeat):
+                        if mutated:
+                            generateRegistry(root, scale, hosts, grpcHosts=grpcHosts)
+                        result = runStage(stage, root)
+                        mutated = stage in mutatingStages
+                        for name, seconds in result["timings"].items():
+                            timings.setdefault(name, []).append(seconds)
+                        metrics = result["metrics"]
+                        failed = failed or result.get("failed", False)
+                    for name, runs in timings.items():
+                        results.append(dict({"stage": stage, "timing": name, "scale": scale, "metrics": metrics, "failed": failed}, **summarize(runs)))
+                        print("  " + stage + "." + name + ": median " + str(results[-1]["median"]) + "s " + json.dumps(metrics) + (" FAILED" if failed else ""), flush=True)
+            finally:
+                shutil.rmtree(root, ignore_errors=True)
+    finally:
+        server.terminate()
+        server.wait()
+    return results
+
+
+def compareResults(previous, current):
+    # one line per (stage, timing, scale) present in both: old and new median and their ratio
+    old = {(r["stage"], r["timing"], r["scale"]): r["median"] for r in previous["results"]}
+    for r in current["results"]:
+        key = (r["stage"], r["timing"], r["scale"])
+        if key in old and old[key]:
+            print(r["stage"] + "." + r["timing"] + " @" + str(r["scale"]) + "x: " + str(old[key]) + "s -> " + str(r["median"]) + "s (" + str(round(r["median"] / old[key], 2)) + "x)" + (" FAILED" if r.get("failed") else ""))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Python tooling against synthetic registries")
+    parser.add_argument("--scales", type=float, nargs="*", default=[1, 10], help="registry sizes relative to today's (e.g. 1 10 100)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per stage and scale")
+    parser.add_argument("--stages", nargs="*", default=stages, choices=stages)
+    parser.add_argument("--workdir", default=None, help="where synthetic registries are generated (default: system temp)")
+    parser.add_argument("--output", default=None, help="results file (default: .cache/benchmarks/<commit>.json)")
+    parser.add_argument("--compare", default=None, help="previous results file to compare against")
+    parser.add_argument("--child", default=None, choices=stages, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        runChild(args.child)
+        return
+
+    commit, dirty = gitRevision(chainRegistryRoot)
+    report = {
+        "version": resultsVersion,
+        "commit": commit,
+        "dirty": dirty,
+        "timestamp": int(time.time()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "repeat": args.repeat,
+        "results": runBenchmarks([int(scale) if scale == int(scale) else scale for scale in args.scales], args.repeat, args.stages, args.workdir),
+    }
+    output = args.output or os.path.join(chainRegistryRoot, cacheDirectoryName, "benchmarks", (commit or "unknown")[:12] + ("-dirty" if dirty else "") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print("Results written to " + output)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compareResults(json.load(f), report)
+    failedStages = sorted({r["stage"] + " @" + str(r["scale"]) + "x" for r in report["results"] if r["failed"]})
+    if failedStages:
+        print("FAILED: " + ", ".join(failedStages))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+# Purpose:
+#   to build a synthetic chain registry from _template at a multiple of the current registry's
+#   size (chains, endpoints, assets and _IBC files per network type), so the Python tooling can
+#   be benchmarked against the registry we expect to have, not only the one we have today;
+#   every endpoint and release binary points at one of the given hosts (see mock_server.py),
+#   gRPC endpoints at the given gRPC hosts
+#
+# Usage (from the registry root):
+#   python .github/workflows/benchmarks/synthetic_registry.py /tmp/registry-10x --scale 10
+
+
+# -- IMPORTS --
+
+import argparse
+import copy
+import json
+import os
+import random
+import shutil
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "utility"))
+from chain_registry import calculateIbcHash, chainRegistryRoot, fileToFileName, getRegistry, ibcDirectoryName, networkTypeToDirectoryName  # noqa: E402
+
+from mock_server import binaryUrl  # noqa: E402
+
+
+# -- VARIABLES --
+
+templateDirectoryName = "_template"
+
+defaultHosts = ["127.0.0.1:18600"]
+
+# scripts are copied rather than linked, since they locate the registry from their own path
+copiedScripts = [os.path.join("_scripts", "remove-stale-endpoints.py")]
+
+# bytes per synthetic release binary; one linux/amd64 binary per version
+binarySize = 64 * 1024
+
+
+# -- PROFILE --
+
+def average(values):
+    values = list(values)
+    return sum(values) / len(values) if values else 0
+
+
+def registryProfile(registry):
+    # per network type: chain and _IBC file counts, and the average number of rpc/rest/grpc/wss
+    # endpoints and assets per chain and of channels per _IBC file
+    profile = {}
+    for networkType in networkTypeToDirectoryName:
+        chains = [chain for chain in registry.getChains(network_types=[networkType], domains=["cosmos"]) if chain.chain]
+        connections = [connection for connection in registry.ibc if connection.network_type == networkType and connection.data]
+        profile[networkType] = {
+            "chains": len(chains),
+            "ibc_files": len(connections),
+            "rpc": average(len(chain.chain.get("apis", {}).get("rpc", [])) for chain in chains),
+            "rest": average(len(chain.chain.get("apis", {}).get("rest", [])) for chain in chains),
+            "grpc": average(len(chain.chain.get("apis", {}).get("grpc", [])) for chain in chains),
+            "wss": average(len(chain.chain.get("apis", {}).get("wss", [])) for chain in chains),
+            "assets": average(len((chain.assetlist or {}).get("assets", [])) for chain in chains),
+            "channels": average(len(connection.data.get("channels", [])) for connection in connections),
+        }
+    profile["providers"] = len({
+        endpoint.get("provider")
+        for chain in registry.chains if chain.chain
+        for endpointType in ("rpc", "rest")
+        for endpoint in chain.chain.get("apis", {}).get(endpointType, [])
+    })
+    return profile
+
+
+def sampleCount(rng, mean):
+    # an integer whose expected value is `mean`
+    count = int(mean)
+    return count + (rng.random() < mean - count)
+
+
+# -- GENERATION --
+
+def writeJson(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(data, indent=2, ensure_ascii=False))
+
+
+def chainNames(networkType, count):
+    suffix = "" if networkType == "mainnet" else "testnet"
+    return ["synth" + suffix + str(i).zfill(6) for i in range(count)]
+
+
+def generateIbc(rng, names, fileCount, channelsPerFile):
+    # returns {(chain_1, chain_2): _IBC data}; connection and channel ids are unique per chain
+    connections = {}
+    channelCounters = dict.fromkeys(names, 0)
+    connectionCounters = dict.fromkeys(names, 0)
+    fileCount = min(fileCount, len(names) * (len(names) - 1) // 2)
+    while len(connections) < fileCount:
+        chain1, chain2 = sorted(rng.sample(names, 2))
+        if (chain1, chain2) in connections:
+            continue
+        sides = {}
+        for side, chainName in (("chain_1", chain1), ("chain_2", chain2)):
+            sides[side] = {
+                "chain_name": chainName,
+                "chain_id": chainName + "-1",
+                "client_id": "07-tendermint-" + str(connectionCounters[chainName]),
+                "connection_id": "connection-" + str(connectionCounters[chainName]),
+            }
+            connectionCounters[chainName] += 1
+        channels = []
+        for i in range(max(1, sampleCount(rng, channelsPerFile))):
+            channel = {}
+            for side, chainName in (("chain_1", chain1), ("chain_2", chain2)):
+                channel[side] = {"channel_id": "channel-" + str(channelCounters[chainName]), "port_id": "transfer"}
+                channelCounters[chainName] += 1
+            channel.update({"ordering": "unordered", "version": "ics20-1", "tags": {"preferred": i == 0, "status": "ACTIVE"}})
+            channels.append(channel)
+        connections[(chain1, chain2)] = dict({"$schema": "../ibc_data.schema.json"}, **sides, channels=channels)
+    return connections
+
+
+def generateChain(template, networkType, chainName, endpointAddresses):
+    chain = copy.deepcopy(template["chain"])
+    denom = "u" + chainName
+    chain.update({
+        "chain_name": chainName,
+        "network_type": networkType,
+        "pretty_name": "Synthetic " + chainName,
+        "chain_id": chainName + "-1",
+        "bech32_prefix": chainName,
+        "daemon_name": chainName + "d",
+        "fees": {"fee_tokens": [dict(template["chain"]["fees"]["fee_tokens"][0], denom=denom)]},
+        "staking": {"staking_tokens": [{"denom": denom}]},
+        "apis": endpointAddresses,
+    })
+    return chain
+
+
+def nativeAsset(template, chainName):
+    asset = copy.deepcopy(template["assetlist"]["assets"][0])
+    asset.update({
+        "denom_units": [{"denom": "u" + chainName, "exponent": 0}, {"denom": chainName, "exponent": 6}],
+        "base": "u" + chainName,
+        "name": "Synthetic " + chainName,
+        "display": chainName,
+        "symbol": chainName.upper(),
+    })
+    asset.pop("coingecko_id", None)
+    return asset
+
+
+def ibcAsset(template, chainName, counterpartyChainName, channelId, counterpartyChannelId):
+    origin = nativeAsset(template, counterpartyChainName)
+    path = "transfer/" + channelId + "/" + origin["base"]
+    base = calculateIbcHash(path)
+    origin.update({
+        "type_asset": "ics20",
+        "base": base,
+        "denom_units": [{"denom": base, "exponent": 0, "aliases": [origin["base"]]}, {"denom": counterpartyChainName, "exponent": 6}],
+        "traces": [{
+            "type": "ibc",
+            "counterparty": {"chain_name": counterpartyChainName, "base_denom": "u" + counterpartyChainName, "channel_id": counterpartyChannelId},
+            "chain": {"channel_id": channelId, "path": path},
+        }],
+    })
+    origin.pop("description", None)
+    return origin
+
+
+def generateRegistry(output, scale=1, hosts=None, source=chainRegistryRoot, seed=0, profile=None, grpcHosts=None):
+    # returns the profile of the generated registry (counts per network type); grpc endpoints
+    # are only generated when there are gRPC hosts to point them at
+    hosts = hosts or defaultHosts
+    rng = random.Random(seed)
+    # grpc and wss endpoints draw from their own generator, so the rest of the registry is the
+    # same as before they were generated
+    streamRng = random.Random(seed + 1)
+    profile = profile or registryProfile(getRegistry(source))
+    template = {}
+    for file, fileName in fileToFileName.items():
+        with open(os.path.join(source, templateDirectoryName, fileName), encoding="utf-8") as f:
+            template[file] = json.load(f)
+
+    if os.path.exists(output):
+        shutil.rmtree(output)
+    os.makedirs(output)
+    # the tooling lives under .github; linking it lets it run against this registry unchanged
+    os.symlink(os.path.join(os.path.abspath(source), ".github"), os.path.join(output, ".github"))
+    for script in copiedScripts:
+        os.makedirs(os.path.dirname(os.path.join(output, script)), exist_ok=True)
+        shutil.copy(os.path.join(source, script), os.path.join(output, script))
+
+    providers = ["Provider " + str(i) for i in range(max(1, round(profile["providers"] * scale)))]
+    generated = {}
+    for networkType, networkTypeDirectoryName in networkTypeToDirectoryName.items():
+        counts = profile[networkType]
+        names = chainNames(networkType, max(2, round(counts["chains"] * scale)))
+        connections = generateIbc(rng, names, round(counts["ibc_files"] * scale), counts["channels"])
+
+        # chain -> [(counterparty, channel on this chain, channel on the counterparty)]
+        neighbors = {name: [] for name in names}
+        for (chain1, chain2), data in connections.items():
+            channel = data["channels"][0]
+            neighbors[chain1].append((chain2, channel["chain_1"]["channel_id"], channel["chain_2"]["channel_id"]))
+            neighbors[chain2].append((chain1, channel["chain_2"]["channel_id"], channel["chain_1"]["channel_id"]))
+
+        directory = os.path.join(output, networkTypeDirectoryName)
+        endpointCount = 0
+        for name in names:
+            apis = {}
+            for endpointType in ("rpc", "rest"):
+                apis[endpointType] = []
+                for i in range(max(1, sampleCount(rng, counts[endpointType]))):
+                    provider = rng.randrange(len(providers))
+                    host = hosts[provider % len(hosts)]
+                    apis[endpointType].append({"address": "http://" + host + "/" + name + "/" + endpointType + "/" + str(i), "provider": providers[provider]})
+                endpointCount += len(apis[endpointType])
+            # gRPC addresses carry no scheme, as in the registry; wss ones end in /websocket
+            if grpcHosts:
+                apis["grpc"] = []
+                for i in range(sampleCount(streamRng, counts["grpc"])):
+                    provider = streamRng.randrange(len(providers))
+                    apis["grpc"].append({"address": grpcHosts[provider % len(grpcHosts)], "provider": providers[provider]})
+            wss = []
+            for i in range(sampleCount(streamRng, counts["wss"])):
+                provider = streamRng.randrange(len(providers))
+                wss.append({"address": "ws://" + hosts[provider % len(hosts)] + "/" + name + "/wss/" + str(i) + "/websocket", "provider": providers[provider]})
+            if wss:
+                apis["wss"] = wss
+            endpointCount += len(apis.get("grpc", [])) + len(wss)
+            assets = [nativeAsset(template, name)]
+            for counterparty, channelId, counterpartyChannelId in neighbors[name][:max(0, sampleCount(rng, counts["assets"]) - 1)]:
+                assets.append(ibcAsset(template, name, counterparty, channelId, counterpartyChannelId))
+            versions = dict(copy.deepcopy(template["versions"]), chain_name=name)
+            for version in versions["versions"]:
+                version["binaries"] = {"linux/amd64": binaryUrl(hosts[rng.randrange(len(hosts))], name + "/" + version["name"] + "/linux-amd64", binarySize)}
+            writeJson(os.path.join(directory, name, fileToFileName["chain"]), generateChain(template, networkType, name, apis))
+            writeJson(os.path.join(directory, name, fileToFileName["assetlist"]), dict(template["assetlist"], chain_name=name, assets=assets))
+            writeJson(os.path.join(directory, name, fileToFileName["versions"]), versions)
+
+        for (chain1, chain2), data in connections.items():
+            writeJson(os.path.join(directory, ibcDirectoryName, chain1 + "-" + chain2 + ".json"), data)
+
+        generated[networkType] = {"chains": len(names), "ibc_files": len(connections), "endpoints": endpointCount}
+    return generated
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic chain registry from _template")
+    parser.add_argument("output", help="directory to create (replaced if it exists)")
+    parser.add_argument("--scale", type=float, default=1, help="size relative to the current registry")
+    parser.add_argument("--hosts", nargs="*", default=defaultHosts, help="host:port values the endpoints point at")
+    parser.add_argument("--grpc-hosts", nargs="*", default=None, help="host:port values gRPC endpoints point at (default: no gRPC endpoints)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(generateRegistry(args.output, args.scale, args.hosts, seed=args.seed, grpcHosts=args.grpc_hosts)))
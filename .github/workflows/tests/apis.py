@@ -1,19 +1,46 @@
 # -*- coding: utf-8 -*-
-import requests
 import pytest
 from collections import namedtuple
 import glob
+import hashlib
 import os
 import json
 import logging
 import re
+import sys
+import tempfile
+import time
 import warnings
 
+from prober import TIMEOUT_SECONDS, run_probes
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'utility'))
+from endpoint_history import EndpointHistory  # noqa: E402
+import instrumentation  # noqa: E402
+
 # Setup basic configuration for logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 EndpointTest = namedtuple('EndpointTest', ['chain', 'endpoint', 'provider', 'address'])
 
+# Path appended to each chain.json address to probe it
+PROBE_PATHS = {
+    'rpc': '/status',
+    'rest': '/cosmos/base/tendermint/v1beta1/syncing',
+}
+
+# API types tested; grpc is probed with a health/reflection call and wss with a
+# subscription (see prober.py). Only rpc and rest are expected on every chain.
+API_TYPES = ['rpc', 'rest', 'grpc', 'wss']
+REQUIRED_API_TYPES = ['rpc', 'rest']
+
+# Set this to False to skip recording results in the local endpoint history
+record_history = True
+
+# Records older than this are dropped from the history after each run; it must stay longer
+# than the window _scripts/remove-stale-endpoints.py looks back over
+HISTORY_RETENTION_DAYS = 90
+
 # Set this to False to ignore the whitelist and process all providers
 use_whitelist = True
 
@@ -56,6 +83,91 @@ whitelist = {
     ]
 } if use_whitelist else {'chains': [], 'providers': []}
 
+# Parsed endpoint entries per chain.json, shared by every process that collects these tests
+ENDPOINT_CACHE_FILE = os.path.join('.pytest_cache', 'endpoint_tests.json')
+ENDPOINT_CACHE_VERSION = 3
+
+def read_chain_endpoints(filename, content):
+    # Returns the [chain, api_type, provider, address] entries of one chain.json, before
+    # any whitelist filtering, plus the warnings raised while reading it.
+    endpoints = []
+    messages = []
+    try:
+        data = json.loads(content)
+        chain_name = data.get('chain_name', 'unknown')
+        if 'apis' in data:
+            if not isinstance(data['apis'], dict):
+                messages.append(f"Invalid 'apis' format in file '{filename}'. Expected a dictionary.")
+                return endpoints, messages
+            for api_type in API_TYPES:
+                if api_type not in data['apis']:
+                    if api_type in REQUIRED_API_TYPES:
+                        messages.append(f"Missing '{api_type}' key in 'apis' of file '{filename}'.")
+                    continue
+                if not isinstance(data['apis'][api_type], list):
+                    messages.append(f"Invalid '{api_type}' format in 'apis' of file '{filename}'. Expected a list.")
+                    continue
+                for api in data['apis'].get(api_type, []):
+                    if 'provider' not in api:
+                        messages.append(f"Missing 'provider' key in '{api_type}' of file '{filename}'.")
+                        continue
+                    if not isinstance(api['provider'], str):
+                        messages.append(f"Invalid 'provider' format in '{api_type}' of file '{filename}'. Expected a string.")
+                        continue
+                    if api.get('address') is not None and not isinstance(api['address'], str):
+                        messages.append(f"Invalid 'address' format in '{api_type}' of file '{filename}'. Expected a string.")
+                        continue
+                    endpoints.append([chain_name, api_type, api['provider'], api.get('address')])
+        else:
+            messages.append(f"Missing 'apis' key in file '{filename}'.")
+    except json.JSONDecodeError as e:
+        messages.append(f"Failed to decode JSON file '{filename}': {str(e)}")
+    except Exception as e:
+        messages.append(f"An error occurred while processing file '{filename}': {str(e)}")
+    return endpoints, messages
+
+def load_endpoint_index(files_found):
+    # Entries are reused while a file's mtime and size are unchanged; otherwise its content
+    # hash decides, so a fresh checkout with new mtimes still skips the JSON parse.
+    try:
+        with open(ENDPOINT_CACHE_FILE) as f:
+            cache = json.load(f)
+        if cache.get('version') != ENDPOINT_CACHE_VERSION:
+            cache = {}
+    except (OSError, ValueError):
+        cache = {}
+    cached_files = cache.get('files', {})
+
+    index = {}
+    changed = False
+    for filename in files_found:
+        stat = os.stat(filename)
+        key = [stat.st_mtime_ns, stat.st_size]
+        entry = cached_files.get(filename)
+        if entry and entry['stat'] == key:
+            index[filename] = entry
+            continue
+        with open(filename, 'rb') as f:
+            content = f.read()
+        digest = hashlib.sha1(content).hexdigest()
+        if not entry or entry['sha1'] != digest:
+            instrumentation.count('chain_files_parsed')
+            endpoints, messages = read_chain_endpoints(filename, content)
+            entry = {'endpoints': endpoints, 'warnings': messages}
+        index[filename] = dict(entry, stat=key, sha1=digest)
+        changed = True
+
+    if changed or len(index) != len(cached_files):
+        os.makedirs(os.path.dirname(ENDPOINT_CACHE_FILE), exist_ok=True)
+        # Written under a unique name and renamed, so concurrent collectors never read a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(ENDPOINT_CACHE_FILE), suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'version': ENDPOINT_CACHE_VERSION, 'files': index}, f, separators=(',', ':'))
+        os.replace(tmp_path, ENDPOINT_CACHE_FILE)
+
+    return index
+
+@instrumentation.stage('collect')
 def generate_endpoint_tests():
     test_cases = []
     files_found = glob.glob('*/chain.json', recursive=True)
@@ -63,62 +175,60 @@ def generate_endpoint_tests():
     if not files_found:
         warnings.warn("No chain.json files found in the current directory or its subdirectories.")
 
-    for filename in files_found:
-        try:
-            with open(filename) as f:
-                data = json.load(f)
-                chain_name = data.get('chain_name', 'unknown')
-                if 'apis' in data:
-                    if not isinstance(data['apis'], dict):
-                        warnings.warn(f"Invalid 'apis' format in file '{filename}'. Expected a dictionary.")
-                        continue
-                    for api_type in ['rpc', 'rest']:
-                        if api_type not in data['apis']:
-                            warnings.warn(f"Missing '{api_type}' key in 'apis' of file '{filename}'.")
-                            continue
-                        if not isinstance(data['apis'][api_type], list):
-                            warnings.warn(f"Invalid '{api_type}' format in 'apis' of file '{filename}'. Expected a list.")
-                            continue
-                        for api in data['apis'].get(api_type, []):
-                            if 'provider' not in api:
-                                warnings.warn(f"Missing 'provider' key in '{api_type}' of file '{filename}'.")
-                                continue
-                            if not isinstance(api['provider'], str):
-                                warnings.warn(f"Invalid 'provider' format in '{api_type}' of file '{filename}'. Expected a string.")
-                                continue
-                            if (
-                                not use_whitelist or
-                                (not whitelist['chains'] or chain_name in whitelist['chains']) and
-                                (not whitelist['providers'] or api['provider'] in whitelist['providers'])
-                            ):
-                                address = api.get('address')
-                                if not address:
-                                    warnings.warn(f"Missing 'address' key in '{api_type}' of file '{filename}'.")
-                                    continue
-                                if api_type == 'rpc':
-                                    address += '/status'
-                                elif api_type == 'rest':
-                                    address += '/cosmos/base/tendermint/v1beta1/syncing'
-                                test_cases.append(EndpointTest(chain=chain_name, endpoint=api_type, provider=api['provider'], address=address))
-                else:
-                    warnings.warn(f"Missing 'apis' key in file '{filename}'.")
-        except json.JSONDecodeError as e:
-            warnings.warn(f"Failed to decode JSON file '{filename}': {str(e)}")
-        except Exception as e:
-            warnings.warn(f"An error occurred while processing file '{filename}': {str(e)}")
+    for filename, entry in load_endpoint_index(files_found).items():
+        for message in entry['warnings']:
+            warnings.warn(message)
+        for chain_name, api_type, provider, address in entry['endpoints']:
+            if (
+                not use_whitelist or
+                (not whitelist['chains'] or chain_name in whitelist['chains']) and
+                (not whitelist['providers'] or provider in whitelist['providers'])
+            ):
+                if not address:
+                    warnings.warn(f"Missing 'address' key in '{api_type}' of file '{filename}'.")
+                    continue
+                address += PROBE_PATHS.get(api_type, '')
+                test_cases.append(EndpointTest(chain=chain_name, endpoint=api_type, provider=provider, address=address))
 
     return test_cases
 
 test_cases = generate_endpoint_tests()
 
+def chain_address(test_case):
+    path = PROBE_PATHS.get(test_case.endpoint, '')
+    return test_case.address[:len(test_case.address) - len(path)]
+
+# Every selected endpoint is probed once, concurrently, the first time a test asks for
+# results; each generated test then only reports its own entry. Run without xdist (-n),
+# since each worker would otherwise probe every selected endpoint again.
+@pytest.fixture(scope="session")
+def probe_results(request):
+    selected = [item.obj.test_case for item in request.session.items if hasattr(item.obj, 'test_case')]
+    with instrumentation.stage('probe'):
+        results = run_probes(selected, timeout=TIMEOUT_SECONDS)
+    instrumentation.count('requests', len(results))
+    instrumentation.count('timeouts', sum(r.error == 'timeout' for r in results.values()))
+    instrumentation.count('failures', sum(not r.ok for r in results.values()))
+    if record_history:
+        # keyed by the address as written in chain.json, which is what remove-stale-endpoints looks up
+        now = time.time()
+        with instrumentation.stage('record_history'):
+            history = EndpointHistory()
+            history.append(
+                (now, r.test_case.chain, r.test_case.endpoint, chain_address(r.test_case), r.ok, r.status, r.elapsed)
+                for r in results.values()
+            )
+            history.compact(HISTORY_RETENTION_DAYS, now)
+    return results
+
 def generate_test_function(test_case):
-    def test(self):
-        try:
-            response = requests.get(test_case.address, timeout=2)
-            assert response.status_code == 200, f"{test_case.chain.upper()}-{test_case.endpoint.upper()}-{test_case.provider} endpoint not reachable"
-        except requests.exceptions.Timeout:
-            logging.error(f"{test_case.chain.upper()}-{test_case.endpoint.upper()}-{test_case.provider} endpoint timed out after 2 seconds")
-            pytest.fail(f"{test_case.chain.upper()}-{test_case.endpoint.upper()}-{test_case.provider} endpoint timed out after 2 seconds")
+    def test(self, probe_results):
+        result = probe_results[test_case]
+        if result.error == 'timeout':
+            logging.error(f"{test_case.chain.upper()}-{test_case.endpoint.upper()}-{test_case.provider} endpoint timed out after {TIMEOUT_SECONDS} seconds")
+            pytest.fail(f"{test_case.chain.upper()}-{test_case.endpoint.upper()}-{test_case.provider} endpoint timed out after {TIMEOUT_SECONDS} seconds")
+        assert result.ok, f"{test_case.chain.upper()}-{test_case.endpoint.upper()}-{test_case.provider} endpoint not reachable"
+    test.test_case = test_case
     return test
 
 class Test:
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+# Purpose:
+#   rank each chain's endpoints for production load balancing: latency percentiles (TTFB and
+#   total) over repeated keep-alive samples, and block-height freshness against the chain's
+#   best endpoint
+#
+# Usage (from the registry root):
+#   python .github/workflows/tests/benchmark_endpoints.py --samples 5 --output endpoint_report.json
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import sys
+import time
+import warnings
+from collections import defaultdict
+
+import aiohttp
+
+from apis import chain_address, generate_endpoint_tests
+from prober import LIMIT_PER_HOST, MAX_CONCURRENCY, RATE_PER_HOST, TIMEOUT_SECONDS, create_session, run_by_host
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'utility'))
+import instrumentation  # noqa: E402
+
+# /syncing only reports a boolean, so REST height comes from the latest block instead
+HEIGHT_PATHS = {
+    'rpc': '/status',
+    'rest': '/cosmos/base/tendermint/v1beta1/blocks/latest',
+}
+
+PERCENTILES = [50, 90, 99]
+
+
+def percentile(values, p):
+    # nearest-rank percentile of an already sorted list
+    if not values:
+        return None
+    return values[max(0, math.ceil(p / 100 * len(values)) - 1)]
+
+
+def parse_height(endpoint_type, payload):
+    # returns (height, catching_up) from a /status or blocks/latest payload, or (None, None)
+    try:
+        if endpoint_type == 'rpc':
+            sync_info = payload.get('result', payload)['sync_info']
+            return int(sync_info['latest_block_height']), bool(sync_info.get('catching_up', False))
+        block = payload.get('sdk_block') or payload['block']
+        return int(block['header']['height']), None
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None, None
+
+
+async def sample(session, url, timeout):
+    # returns (ttfb, total, status, payload) for one request; raises on network errors
+    start = time.perf_counter()
+    async with session.get(url, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+        ttfb = time.perf_counter() - start
+        body = await response.read()
+        total = time.perf_counter() - start
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        payload = None
+    return ttfb, total, response.status, payload
+
+
+async def benchmark_endpoint(session, test_case, samples, warmup, timeout, pace):
+    url = chain_address(test_case).rstrip('/') + HEIGHT_PATHS[test_case.endpoint]
+    ttfbs, totals, errors = [], [], []
+    height, catching_up = None, None
+    # samples run back to back on the same pooled connection; warm-up samples pay for the
+    # TCP/TLS handshake and are not measured
+    for i in range(warmup + samples):
+        await pace()
+        try:
+            ttfb, total, status, payload = await sample(session, url, timeout)
+        except asyncio.TimeoutError:
+            errors.append('timeout')
+            continue
+        except (aiohttp.ClientError, ValueError) as e:
+            errors.append(str(e) or type(e).__name__)
+            continue
+        if status != 200:
+            errors.append(f'status {status}')
+            continue
+        sample_height, sample_catching_up = parse_height(test_case.endpoint, payload)
+        if sample_height is not None and (height is None or sample_height >= height):
+            height, catching_up = sample_height, sample_catching_up
+        if i >= warmup:
+            ttfbs.append(ttfb)
+            totals.append(total)
+    return {
+        'test_case': test_case,
+        'url': url,
+        'success_rate': len(totals) / samples if samples else 0,
+        'ttfb': sorted(ttfbs),
+        'total': sorted(totals),
+        'height': height,
+        'catching_up': catching_up,
+        'errors': errors,
+    }
+
+
+async def benchmark_all(test_cases, samples=5, warmup=1, timeout=TIMEOUT_SECONDS, concurrency=MAX_CONCURRENCY, limit_per_host=LIMIT_PER_HOST, rate_per_host=RATE_PER_HOST):
+    unique_cases = [t for t in dict.fromkeys(test_cases) if t.endpoint in HEIGHT_PATHS]
+    async with create_session(concurrency, limit_per_host) as session:
+        return await run_by_host(
+            unique_cases,
+            lambda test_case, pace: benchmark_endpoint(session, test_case, samples, warmup, timeout, pace),
+            concurrency, limit_per_host, rate_per_host,
+        )
+
+
+def milliseconds(values):
+    return {f'p{p}': round(percentile(values, p) * 1000, 1) if values else None for p in PERCENTILES}
+
+
+def build_report(measurements, samples):
+    by_chain = defaultdict(list)
+    for m in measurements:
+        by_chain[m['test_case'].chain].append(m)
+
+    chains = {}
+    for chain, chain_measurements in sorted(by_chain.items()):
+        heights = [m['height'] for m in chain_measurements if m['height'] is not None]
+        best_height = max(heights) if heights else None
+        endpoints = []
+        for m in chain_measurements:
+            lag = best_height - m['height'] if best_height is not None and m['height'] is not None else None
+            endpoints.append({
+                'type': m['test_case'].endpoint,
+                'provider': m['test_case'].provider,
+                'address': chain_address(m['test_case']),
+                'success_rate': round(m['success_rate'], 3),
+                'ttfb_ms': milliseconds(m['ttfb']),
+                'total_ms': milliseconds(m['total']),
+                'height': m['height'],
+                'lag': lag,
+                'catching_up': m['catching_up'],
+                'errors': m['errors'],
+            })
+        # most reliable first, then freshest, then fastest; unknown lag and latency rank last
+        endpoints.sort(key=lambda e: (
+            -e['success_rate'],
+            e['lag'] if e['lag'] is not None else math.inf,
+            e['total_ms']['p50'] if e['total_ms']['p50'] is not None else math.inf,
+        ))
+        for rank, endpoint in enumerate(endpoints, start=1):
+            endpoint['rank'] = rank
+        chains[chain] = {'best_height': best_height, 'endpoints': endpoints}
+
+    return {
+        'generated_at': int(time.time()),
+        'samples': samples,
+        'chains': chains,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark registry endpoints and rank them per chain')
+    parser.add_argument('--samples', type=int, default=5, help='measured requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=1, help='unmeasured requests per endpoint before sampling')
+    parser.add_argument('--timeout', type=float, default=TIMEOUT_SECONDS, help='seconds per request')
+    parser.add_argument('--chains', nargs='*', default=[], help='only benchmark these chains')
+    parser.add_argument('--output', default='endpoint_report.json', help='where to write the JSON report')
+    args = parser.parse_args()
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        test_cases = generate_endpoint_tests()
+    if args.chains:
+        test_cases = [t for t in test_cases if t.chain in args.chains]
+
+    start = time.perf_counter()
+    with instrumentation.stage('benchmark'):
+        measurements = asyncio.run(benchmark_all(test_cases, args.samples, args.warmup, args.timeout))
+    instrumentation.count('requests', len(measurements) * (args.samples + args.warmup))
+    with instrumentation.stage('report'):
+        report = build_report(measurements, args.samples)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    logging.info(f"Benchmarked {len(measurements)} endpoints of {len(report['chains'])} chains in {time.perf_counter() - start:.1f}s, report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+
+
+def pytest_configure(config):
+    # Build the endpoint cache once in the controlling process, before any xdist worker
+    # starts collecting, so workers only load the precomputed list (see apis.py).
+    if not hasattr(config, 'workerinput'):
+        import apis  # noqa: F401
+        # names the trace written when REGISTRY_TRACE_DIR is set (see utility/instrumentation.py)
+        import instrumentation
+        instrumentation.start('test_endpoints')
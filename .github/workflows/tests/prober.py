@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+# Purpose:
+#   probe registry endpoints concurrently from a single process, so apis.py does
+#   not need one blocking request (and one xdist worker) per endpoint; rpc/rest are
+#   probed over HTTP, grpc with a health (or reflection) call, and wss with a
+#   Tendermint subscription, all from one event loop
+
+import asyncio
+import json
+import time
+from collections import defaultdict, deque, namedtuple
+from urllib.parse import urlsplit
+
+import aiohttp
+import grpc
+
+# `elapsed` is the time until the first response (for wss, the subscription's acknowledgement)
+ProbeResult = namedtuple('ProbeResult', ['test_case', 'ok', 'status', 'elapsed', 'error'])
+
+TIMEOUT_SECONDS = 2
+
+# Upper bound on requests in flight across every host
+MAX_CONCURRENCY = 256
+
+# Requests in flight (and so pooled keep-alive connections) per host
+LIMIT_PER_HOST = 8
+
+# Requests started per second per host; providers such as Polkachu or Lavender.Five serve
+# dozens of chains from one host, and our own checks must not trip their rate limits
+RATE_PER_HOST = 10
+
+KEEPALIVE_SECONDS = 30
+
+DNS_CACHE_SECONDS = 300
+
+# Raw protobuf messages, so no generated stubs are needed: an empty HealthCheckRequest (the
+# whole server), and a ServerReflectionRequest with list_services = "" (field 7)
+GRPC_HEALTH_METHOD = '/grpc.health.v1.Health/Check'
+GRPC_HEALTH_REQUEST = b''
+GRPC_REFLECTION_METHOD = '/grpc.reflection.v1alpha.ServerReflection/ServerReflectionInfo'
+GRPC_REFLECTION_REQUEST = b'\x3a\x00'
+
+# HealthCheckResponse.status (field 1, varint) SERVING
+GRPC_SERVING = b'\x08\x01'
+
+WEBSOCKET_SUBSCRIBE = json.dumps({'jsonrpc': '2.0', 'method': 'subscribe', 'id': 1, 'params': {'query': "tm.event='NewBlock'"}})
+
+
+def create_session(concurrency=MAX_CONCURRENCY, limit_per_host=LIMIT_PER_HOST):
+    # Connections are pooled per (host, port, TLS), so every chain served from the same
+    # provider host reuses the same handful of TLS connections, and each hostname is
+    # resolved once per run.
+    connector = aiohttp.TCPConnector(
+        limit=concurrency,
+        limit_per_host=limit_per_host,
+        keepalive_timeout=KEEPALIVE_SECONDS,
+        ttl_dns_cache=DNS_CACHE_SECONDS,
+    )
+    return aiohttp.ClientSession(connector=connector)
+
+
+def host_of(address):
+    # gRPC addresses are often written without a scheme ("grpc.example.com:9090")
+    if '://' not in address:
+        return address.split('/')[0].lower()
+    return urlsplit(address).netloc.lower()
+
+
+def grpc_target(address):
+    # (host:port, use TLS); without a scheme, port 443 (or no port) means TLS
+    parts = urlsplit(address if '://' in address else '//' + address)
+    secure = parts.scheme == 'https' or (parts.scheme == '' and parts.port in (None, 443))
+    port = parts.port or (443 if secure else 80)
+    return f'{parts.hostname}:{port}', secure
+
+
+class GrpcChannels:
+    # one channel (one HTTP/2 connection) per target, shared by every probe of that target
+
+    def __init__(self):
+        self.channels = {}
+
+    def get(self, address):
+        target, secure = grpc_target(address)
+        if target not in self.channels:
+            if secure:
+                self.channels[target] = grpc.aio.secure_channel(target, grpc.ssl_channel_credentials())
+            else:
+                self.channels[target] = grpc.aio.insecure_channel(target)
+        return self.channels[target]
+
+    async def close(self):
+        await asyncio.gather(*(channel.close() for channel in self.channels.values()))
+
+
+class HostPacer:
+    # spaces request starts to one host evenly, at most `rate` per second
+
+    def __init__(self, rate):
+        self.interval = 1 / rate if rate else 0
+        self.next_start = 0
+
+    async def __call__(self):
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        start = max(now, self.next_start)
+        self.next_start = start + self.interval
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+async def run_by_host(items, handler, concurrency=MAX_CONCURRENCY, limit_per_host=LIMIT_PER_HOST, rate_per_host=RATE_PER_HOST):
+    # Runs `await handler(item, pace)` for every item with an `address`. Items are grouped by
+    # host and drained by at most `limit_per_host` workers per host; handlers call
+    # `await pace()` before each request they make. One of the `concurrency` slots is taken
+    # only once the host's turn has come, and held until the next pace() or the handler's
+    # return, so workers waiting on a slow-paced host do not hold slots while they sleep.
+    by_host = defaultdict(deque)
+    for item in items:
+        by_host[host_of(item.address)].append(item)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    results = []
+
+    async def host_worker(queue, pacer):
+        held = False
+
+        async def pace():
+            nonlocal held
+            if held:
+                semaphore.release()
+                held = False
+            await pacer()
+            await semaphore.acquire()
+            held = True
+
+        while queue:
+            item = queue.popleft()
+            try:
+                results.append(await handler(item, pace))
+            finally:
+                if held:
+                    semaphore.release()
+                    held = False
+
+    # Busiest hosts start first, so their queues do not run alone at the end
+    workers = []
+    for queue in sorted(by_host.values(), key=len, reverse=True):
+        pacer = HostPacer(rate_per_host)
+        workers += [host_worker(queue, pacer) for _ in range(min(limit_per_host, len(queue)))]
+    await asyncio.gather(*workers)
+    return results
+
+
+async def probe_grpc(channels, test_case, timeout, pace):
+    # grpc.health.v1 Check; servers without the health service (most Cosmos nodes) are asked
+    # to list their services through reflection instead
+    await pace()
+    start = time.perf_counter()
+    try:
+        # inside the try: a malformed address ("host:abc") fails this probe, not the run
+        channel = channels.get(test_case.address)
+        try:
+            response = await channel.unary_unary(GRPC_HEALTH_METHOD)(GRPC_HEALTH_REQUEST, timeout=timeout)
+            return ProbeResult(test_case, response == GRPC_SERVING, grpc.StatusCode.OK.value[0], time.perf_counter() - start, None if response == GRPC_SERVING else 'not serving')
+        except grpc.aio.AioRpcError as e:
+            if e.code() != grpc.StatusCode.UNIMPLEMENTED:
+                raise
+        call = channel.stream_stream(GRPC_REFLECTION_METHOD)(iter([GRPC_REFLECTION_REQUEST]), timeout=max(timeout - (time.perf_counter() - start), 0.001))
+        async for _ in call:
+            call.cancel()
+            return ProbeResult(test_case, True, grpc.StatusCode.OK.value[0], time.perf_counter() - start, None)
+        return ProbeResult(test_case, False, None, time.perf_counter() - start, 'empty reflection response')
+    except grpc.aio.AioRpcError as e:
+        if e.code() == grpc.StatusCode.DEADLINE_EXCEEDED:
+            return ProbeResult(test_case, False, None, time.perf_counter() - start, 'timeout')
+        return ProbeResult(test_case, False, e.code().value[0], time.perf_counter() - start, e.code().name)
+    except ValueError as e:
+        return ProbeResult(test_case, False, None, time.perf_counter() - start, str(e) or type(e).__name__)
+
+
+async def probe_websocket(session, test_case, timeout, pace):
+    # connects, subscribes to new blocks and waits for the subscription's acknowledgement
+    await pace()
+    start = time.perf_counter()
+
+    async def subscribe():
+        async with session.ws_connect(test_case.address) as ws:
+            await ws.send_str(WEBSOCKET_SUBSCRIBE)
+            return await ws.receive()
+
+    try:
+        message = await asyncio.wait_for(subscribe(), timeout)
+        elapsed = time.perf_counter() - start
+        if message.type != aiohttp.WSMsgType.TEXT:
+            return ProbeResult(test_case, False, None, elapsed, f'unexpected {message.type.name} message')
+        response = json.loads(message.data)
+        error = response.get('error') if isinstance(response, dict) else 'not a JSON-RPC response'
+        return ProbeResult(test_case, not error, 101, elapsed, str(error) if error else None)
+    except asyncio.TimeoutError:
+        return ProbeResult(test_case, False, None, time.perf_counter() - start, 'timeout')
+    except aiohttp.WSServerHandshakeError as e:
+        return ProbeResult(test_case, False, e.status, time.perf_counter() - start, str(e) or type(e).__name__)
+    except (aiohttp.ClientError, ValueError) as e:
+        return ProbeResult(test_case, False, None, time.perf_counter() - start, str(e) or type(e).__name__)
+
+
+async def probe(session, test_case, timeout, pace):
+    await pace()
+    start = time.perf_counter()
+    try:
+        async with session.get(test_case.address, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            await response.read()
+            return ProbeResult(test_case, response.status == 200, response.status, time.perf_counter() - start, None)
+    except asyncio.TimeoutError:
+        return ProbeResult(test_case, False, None, time.perf_counter() - start, 'timeout')
+    except (aiohttp.ClientError, ValueError) as e:
+        return ProbeResult(test_case, False, None, time.perf_counter() - start, str(e) or type(e).__name__)
+
+
+async def probe_all(test_cases, concurrency=MAX_CONCURRENCY, limit_per_host=LIMIT_PER_HOST, rate_per_host=RATE_PER_HOST, timeout=TIMEOUT_SECONDS):
+    # Duplicate entries (same chain, type, provider and address) are probed once
+    unique_cases = list(dict.fromkeys(test_cases))
+    channels = GrpcChannels()
+
+    def handler(test_case, pace):
+        if test_case.endpoint == 'grpc':
+            return probe_grpc(channels, test_case, timeout, pace)
+        if test_case.endpoint == 'wss':
+            return probe_websocket(session, test_case, timeout, pace)
+        return probe(session, test_case, timeout, pace)
+
+    async with create_session(concurrency, limit_per_host) as session:
+        try:
+            results = await run_by_host(unique_cases, handler, concurrency, limit_per_host, rate_per_host)
+        finally:
+            await channels.close()
+    return {result.test_case: result for result in results}
+
+
+def run_probes(test_cases, **kwargs):
+    return asyncio.run(probe_all(test_cases, **kwargs))
@@ -0,0 +1,237 @@
+# Purpose:
+#   to verify the `?checksum=` of every binary URL in versions.json and chain.json codebases by
+#   downloading it: downloads run concurrently with bounded parallelism and are hashed as they
+#   stream to disk, interrupted downloads resume with Range requests (within a run and across
+#   runs), and every (URL, checksum) pair that verified is cached so it is never downloaded again
+#
+# Usage (from the registry root):
+#   python .github/workflows/utility/binary_checksums.py [--chains osmosis juno] [--concurrency 4]
+#
+# Checksums follow the go-getter convention the binaries are fetched with: "sha256:<hex>", or a
+# bare hex digest whose algorithm is implied by its length.
+
+
+# -- IMPORTS --
+
+import argparse
+import asyncio
+import contextlib
+import hashlib
+import json
+import os
+import sys
+import time
+from collections import namedtuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import aiohttp
+
+import instrumentation
+from chain_registry import getCachePath, getRegistry
+
+
+# -- VARIABLES --
+
+cacheFileName = "binary_checksums.json"
+
+# partial downloads, kept under .cache so an interrupted run resumes where it stopped
+partialDirectoryName = "binaries"
+
+cacheVersion = 1
+
+# downloads in flight; binaries are large, so this is bounded by bandwidth, not latency
+maxConcurrency = 4
+
+chunkSize = 1 << 20
+
+# attempts per URL within one run; each one resumes from the bytes already on disk
+attempts = 3
+
+# seconds without receiving any data before an attempt is abandoned
+readTimeoutSeconds = 60
+
+algorithmsByDigestLength = {
+    32: "md5",
+    40: "sha1",
+    64: "sha256",
+    128: "sha512",
+}
+
+BinaryReference = namedtuple('BinaryReference', ['chain_name', 'file', 'version', 'platform'])
+
+VerificationResult = namedtuple('VerificationResult', ['url', 'status', 'expected', 'actual', 'size', 'error'])
+
+
+# -- CHECKSUMS --
+
+def parseChecksumUrl(url):
+    # returns (download URL without the checksum parameter, algorithm, expected hex digest);
+    # (url, None, None) when there is no checksum, and algorithm None when it is unsupported
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    checksum = next((value for key, value in query if key == "checksum"), None)
+    if checksum is None:
+        return url, None, None
+    downloadUrl = urlunsplit(parts._replace(query=urlencode([(key, value) for key, value in query if key != "checksum"])))
+    algorithm, _, digest = checksum.rpartition(":")
+    algorithm = algorithm.lower() or algorithmsByDigestLength.get(len(digest))
+    if algorithm not in hashlib.algorithms_guaranteed:
+        algorithm = None
+    return downloadUrl, algorithm, digest.lower()
+
+
+def collectBinaries(registry, chainNames=None):
+    # URL -> [BinaryReference] for every binary URL that carries a checksum
+    binaries = {}
+
+    def add(chain, file, version, data):
+        for platform, url in (data or {}).get("binaries", {}).items():
+            if "checksum=" in url:
+                binaries.setdefault(url, []).append(BinaryReference(chain.chain_name, file, version, platform))
+
+    for chain in registry.chains:
+        if chainNames and chain.chain_name not in chainNames:
+            continue
+        codebase = (chain.chain or {}).get("codebase", {})
+        add(chain, "chain.json", codebase.get("recommended_version"), codebase)
+        for version in (chain.versions or {}).get("versions", []):
+            add(chain, "versions.json", version.get("name"), version)
+    return binaries
+
+
+# -- CACHE --
+
+def loadCache(root):
+    # {"version", "verified": {URL with checksum: {"size", "verified_at"}}}
+    try:
+        with open(getCachePath(cacheFileName, root), encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    if cache.get("version") != cacheVersion:
+        cache = {"version": cacheVersion, "verified": {}}
+    return cache
+
+
+def saveCache(root, cache):
+    path = getCachePath(cacheFileName, root)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def partialPath(root, url):
+    directory = getCachePath(partialDirectoryName, root)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, hashlib.sha256(url.encode("utf-8")).hexdigest()[:32] + ".part")
+
+
+# -- DOWNLOAD --
+
+def hashPartial(path, algorithm):
+    # (hash object over the bytes already downloaded, their count)
+    digest = hashlib.new(algorithm)
+    size = 0
+    with contextlib.suppress(FileNotFoundError), open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunkSize), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest, size
+
+
+async def downloadAndHash(session, url, algorithm, path):
+    # streams `url` to `path` while hashing it; returns (hex digest, size). Whatever arrived
+    # before a failure stays on disk and the next attempt asks only for the rest.
+    digest, offset = hashPartial(path, algorithm)
+    error = None
+    for attempt in range(attempts):
+        headers = {"Range": "bytes=" + str(offset) + "-"} if offset else {}
+        try:
+            async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(sock_read=readTimeoutSeconds)) as response:
+                if response.status == 416 and offset:
+                    # nothing after `offset`: the previous run got the whole file
+                    return digest.hexdigest(), offset
+                response.raise_for_status()
+                if offset and response.status != 206:
+                    # the server ignored the Range header and is sending the whole file
+                    digest, offset = hashlib.new(algorithm), 0
+                elif offset:
+                    instrumentation.count("resumed_downloads")
+                with open(path, "ab" if offset else "wb") as f:
+                    async for chunk in response.content.iter_chunked(chunkSize):
+                        f.write(chunk)
+                        digest.update(chunk)
+                        offset += len(chunk)
+                        instrumentation.count("bytes_downloaded", len(chunk))
+            return digest.hexdigest(), offset
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if isinstance(e, aiohttp.ClientResponseError) and 400 <= e.status < 500:
+                # the request itself is wrong (gone, forbidden); asking again will not help
+                raise
+            error = e
+            instrumentation.count("interrupted_downloads")
+    raise error
+
+
+async def verifyUrl(session, semaphore, url, root, cache):
+    downloadUrl, algorithm, expected = parseChecksumUrl(url)
+    if url in cache["verified"]:
+        return VerificationResult(url, "cached", expected, expected, cache["verified"][url]["size"], None)
+    if algorithm is None:
+        return VerificationResult(url, "unsupported", expected, None, None, "unsupported checksum")
+    async with semaphore:
+        try:
+            path = partialPath(root, url)
+            actual, size = await downloadAndHash(session, downloadUrl, algorithm, path)
+            os.remove(path)
+        except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+            # OSError: the partial file could not be written (disk full); only this URL fails
+            return VerificationResult(url, "error", expected, None, None, str(e) or type(e).__name__)
+    if actual != expected:
+        return VerificationResult(url, "mismatch", expected, actual, size, None)
+    cache["verified"][url] = {"size": size, "verified_at": int(time.time())}
+    return VerificationResult(url, "verified", expected, actual, size, None)
+
+
+async def verifyUrls(urls, root, concurrency=maxConcurrency):
+    cache = loadCache(root)
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    try:
+        async with aiohttp.ClientSession(connector=connector) as session:
+            return await asyncio.gather(*(verifyUrl(session, semaphore, url, root, cache) for url in urls))
+    finally:
+        # also on interruption, so the downloads that did verify are not repeated
+        saveCache(root, cache)
+
+
+@instrumentation.stage("verify_binaries")
+def verifyBinaries(urls, root, concurrency=maxConcurrency):
+    # returns [VerificationResult], one per URL, in order
+    results = asyncio.run(verifyUrls(list(urls), root, concurrency))
+    for result in results:
+        instrumentation.count("binaries_" + result.status)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download every binary with a checksum and verify it")
+    parser.add_argument("--chains", nargs="*", default=None, help="only these chains (default: all)")
+    parser.add_argument("--concurrency", type=int, default=maxConcurrency, help="downloads in flight")
+    args = parser.parse_args()
+    registry = getRegistry()
+    binaries = collectBinaries(registry, args.chains)
+    results = verifyBinaries(binaries, registry.root, args.concurrency)
+    failed = 0
+    for result in results:
+        if result.status in ("verified", "cached"):
+            continue
+        failed += 1
+        where = "; ".join(reference.chain_name + " " + reference.file + " " + str(reference.version) + " " + reference.platform for reference in binaries[result.url])
+        detail = "expected " + result.expected + ", got " + result.actual if result.status == "mismatch" else result.error
+        print("[FAILED] " + result.url + ": " + result.status + ": " + detail + " (" + where + ")")
+    counts = {}
+    for result in results:
+        counts[result.status] = counts.get(result.status, 0) + 1
+    print("Checked " + str(len(results)) + " binaries: " + ", ".join(status + " " + str(count) for status, count in sorted(counts.items())))
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,263 @@
+# Purpose:
+#   to provide chain registry lookup functionality to the Python tooling (see chain_registry.mjs),
+#   parsing every chain, assetlist, versions and _IBC file once per run
+
+
+# -- IMPORTS --
+
+import hashlib
+import json
+import os
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import instrumentation
+
+
+# -- VARIABLES --
+
+# .github/workflows/utility -> registry root
+chainRegistryRoot = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+networkTypeToDirectoryName = {
+    "mainnet": "",
+    "testnet": "testnets",
+}
+
+domainToDirectoryName = {
+    "cosmos": "",
+    "non-cosmos": "_non-cosmos",
+}
+
+fileToFileName = {
+    "chain": "chain.json",
+    "assetlist": "assetlist.json",
+    "versions": "versions.json",
+}
+
+ibcDirectoryName = "_IBC"
+
+traceTypesIbc = [
+    "ibc",
+    "ibc-cw20",
+]
+
+traceTypesAll = [
+    "ibc",
+    "ibc-cw20",
+    "ibc-bridge",
+    "bridge",
+    "liquid-stake",
+    "synthetic",
+    "wrapped",
+    "additional-mintage",
+    "test-mintage",
+    "legacy-mintage",
+]
+
+# local, git-ignored state kept between runs by the Python tooling
+cacheDirectoryName = ".cache"
+
+nonChainDirectories = {
+    ".git",
+    ".github",
+    ".vs",
+    ".mypy_cache",
+    ".pytest_cache",
+    "_IBC",
+    "_guides",
+    "_memo_keys",
+    "_non-cosmos",
+    "_providers",
+    "_scripts",
+    "_template",
+    "node_modules",
+    "testnets",
+}
+
+Chain = namedtuple('Chain', ['chain_name', 'directory', 'network_type', 'domain', 'chain', 'assetlist', 'versions'])
+
+IbcConnection = namedtuple('IbcConnection', ['file_name', 'path', 'network_type', 'data'])
+
+
+# -- GENERAL UTILITY FUNCTIONS --
+
+def readJsonFile(path):
+    # returns (data, error); a file that fails to parse is reported, not raised
+    data, error, _ = readJsonFileWithDigest(path)
+    return data, error
+
+
+def readFileWithDigest(path):
+    # returns (raw bytes, error, sha256 hex digest of the raw bytes)
+    try:
+        with open(path, "rb") as f:
+            content = f.read()
+    except OSError as e:
+        return None, str(e), None
+    instrumentation.count("files_read")
+    instrumentation.count("bytes_read", len(content))
+    return content, None, hashlib.sha256(content).hexdigest()
+
+
+def readJsonFileWithDigest(path):
+    # returns (data, error, sha256 hex digest of the raw bytes)
+    content, error, digest = readFileWithDigest(path)
+    if error:
+        return None, error, None
+    try:
+        return json.loads(content), None, digest
+    except ValueError as e:
+        return None, str(e), digest
+
+
+def calculateIbcHash(ibcHashInput):
+    # "transfer/channel-0/uatom" -> "ibc/27394FB0..."
+    return "ibc/" + hashlib.sha256(ibcHashInput.encode("utf-8")).hexdigest().upper()
+
+
+def getCachePath(fileName, root=chainRegistryRoot):
+    directory = os.path.join(root, cacheDirectoryName)
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, fileName)
+
+
+# -- CHAIN REGISTRY INDEX --
+
+class RegistryIndex:
+
+    def __init__(self, root, chains, ibc, errors, digests):
+        self.root = root
+        self.chains = chains
+        self.ibc = ibc
+        self.errors = errors
+        # relative path -> sha256 of the file as read
+        self.digests = digests
+
+        self.chainsByName = {}
+        self.chainsById = {}
+        self.chainsByPrefix = {}
+        self.assetsByBase = {}
+        self.assetsByChainAndBase = {}
+        self.ibcByChainPair = {}
+        for chain in chains:
+            self.chainsByName[chain.chain_name] = chain
+            chainJson = chain.chain or {}
+            if chainJson.get("chain_id"):
+                self.chainsById[chainJson["chain_id"]] = chain
+            if chainJson.get("bech32_prefix"):
+                self.chainsByPrefix.setdefault(chainJson["bech32_prefix"], []).append(chain)
+            for asset in (chain.assetlist or {}).get("assets", []):
+                if "base" not in asset:
+                    continue
+                self.assetsByBase.setdefault(asset["base"], []).append((chain, asset))
+                self.assetsByChainAndBase[(chain.chain_name, asset["base"])] = asset
+        for connection in ibc:
+            data = connection.data or {}
+            chain1 = data.get("chain_1", {}).get("chain_name")
+            chain2 = data.get("chain_2", {}).get("chain_name")
+            if chain1 and chain2:
+                self.ibcByChainPair[tuple(sorted((chain1, chain2)))] = connection
+
+    def getChain(self, chainName):
+        return self.chainsByName.get(chainName)
+
+    def getChainById(self, chainId):
+        return self.chainsById.get(chainId)
+
+    def getChainsByPrefix(self, prefix):
+        return self.chainsByPrefix.get(prefix, [])
+
+    def getAsset(self, chainName, baseDenom):
+        return self.assetsByChainAndBase.get((chainName, baseDenom))
+
+    def getAssetsByBase(self, baseDenom):
+        return self.assetsByBase.get(baseDenom, [])
+
+    def getIbcConnection(self, chainName1, chainName2):
+        return self.ibcByChainPair.get(tuple(sorted((chainName1, chainName2))))
+
+    def getChains(self, network_types=None, domains=None):
+        return [
+            chain for chain in self.chains
+            if (network_types is None or chain.network_type in network_types)
+            and (domains is None or chain.domain in domains)
+        ]
+
+
+def isChainDirectory(directory):
+    return os.path.isdir(directory) and any(
+        os.path.exists(os.path.join(directory, fileToFileName[file])) for file in ("chain", "assetlist")
+    )
+
+
+def listChainDirectories(root):
+    # yields (network_type, domain, directory name, absolute path)
+    for networkType, networkTypeDirectoryName in networkTypeToDirectoryName.items():
+        for domain, domainDirectoryName in domainToDirectoryName.items():
+            parent = os.path.join(root, networkTypeDirectoryName, domainDirectoryName)
+            if not os.path.isdir(parent):
+                continue
+            for name in sorted(os.listdir(parent)):
+                if name in nonChainDirectories or name.startswith("."):
+                    continue
+                directory = os.path.join(parent, name)
+                if isChainDirectory(directory):
+                    yield networkType, domain, name, directory
+
+
+def listIbcFiles(root):
+    # yields (network_type, file name, absolute path)
+    for networkType, networkTypeDirectoryName in networkTypeToDirectoryName.items():
+        ibcDirectory = os.path.join(root, networkTypeDirectoryName, ibcDirectoryName)
+        if not os.path.isdir(ibcDirectory):
+            continue
+        for fileName in sorted(os.listdir(ibcDirectory)):
+            path = os.path.join(ibcDirectory, fileName)
+            if os.path.isfile(path):
+                yield networkType, fileName, path
+
+
+@instrumentation.stage("load_registry")
+def loadRegistry(root=chainRegistryRoot, workers=None):
+    root = os.path.abspath(root)
+    chainDirectories = list(listChainDirectories(root))
+    ibcFiles = list(listIbcFiles(root))
+
+    # every file is read and parsed exactly once, in a single parallel pass
+    paths = [
+        os.path.join(directory, fileToFileName[file])
+        for _, _, _, directory in chainDirectories
+        for file in fileToFileName
+    ]
+    paths = [path for path in paths if os.path.exists(path)]
+    paths += [path for _, _, path in ibcFiles]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        loaded = dict(zip(paths, executor.map(readJsonFileWithDigest, paths)))
+
+    errors = {os.path.relpath(path, root): error for path, (_, error, _) in loaded.items() if error}
+    digests = {os.path.relpath(path, root): digest for path, (_, _, digest) in loaded.items() if digest}
+
+    def data(path):
+        return loaded.get(path, (None, None, None))[0]
+
+    chains = []
+    for networkType, domain, name, directory in chainDirectories:
+        files = {file: data(os.path.join(directory, fileName)) for file, fileName in fileToFileName.items()}
+        chainName = (files["chain"] or files["assetlist"] or {}).get("chain_name", name)
+        chains.append(Chain(chainName, directory, networkType, domain, files["chain"], files["assetlist"], files["versions"]))
+
+    ibc = [IbcConnection(fileName, path, networkType, data(path)) for networkType, fileName, path in ibcFiles]
+
+    return RegistryIndex(root, chains, ibc, errors, digests)
+
+
+@lru_cache(maxsize=None)
+def _getRegistry(root):
+    return loadRegistry(root)
+
+
+def getRegistry(root=chainRegistryRoot):
+    # shared, per-process registry; scripts that mutate files should call loadRegistry() instead
+    return _getRegistry(os.path.abspath(root))
@@ -0,0 +1,152 @@
+# Purpose:
+#   to resolve asset traces across chains back to their origin asset (see getAssetMetadata in
+#   chain_registry.mjs), and to verify that every ibc/<hash> base denom is the SHA-256 of its
+#   trace path, for all assets in one batch
+#
+# Usage (from the registry root):
+#   python .github/workflows/utility/denom_traces.py [--ibc-only]
+
+
+# -- IMPORTS --
+
+import argparse
+import sys
+
+from chain_registry import calculateIbcHash, chainRegistryRoot, getRegistry, traceTypesAll, traceTypesIbc
+
+
+# -- IBC DENOMS --
+
+def ibcDenomPath(asset):
+    # the path an ibc/<hash> denom is derived from, i.e. that of the most recent trace
+    traces = asset.get("traces")
+    if not traces:
+        return None
+    return traces[-1].get("chain", {}).get("path")
+
+
+def isIbcDenomAsset(asset):
+    return asset.get("base", "").startswith("ibc/") or asset.get("type_asset") == "ics20"
+
+
+def ibcDenomMismatches(assets):
+    # returns [(asset, path, expected denom)] for every IBC asset whose base is not the hash of
+    # its path (expected is None when there is no path); each distinct path is hashed once
+    ibcAssets = [(asset, ibcDenomPath(asset)) for asset in assets if isIbcDenomAsset(asset)]
+    hashes = {path: calculateIbcHash(path) for path in {path for _, path in ibcAssets if path}}
+    return [
+        (asset, path, hashes.get(path))
+        for asset, path in ibcAssets
+        if hashes.get(path) != asset.get("base")
+    ]
+
+
+def verifyIbcDenoms(registry):
+    # returns [(chain_name, asset, path, expected denom)] across every assetlist in the registry
+    return [
+        (chain.chain_name, asset, path, expected)
+        for chain in registry.chains
+        for asset, path, expected in ibcDenomMismatches((chain.assetlist or {}).get("assets", []))
+    ]
+
+
+# -- TRACE RESOLVER --
+
+class DenomTraceResolver:
+
+    def __init__(self, registry, traceTypes=traceTypesAll):
+        self.registry = registry
+        self.traceTypes = set(traceTypes)
+        # (chain_name, base_denom) -> origin (chain_name, base_denom); shared by every asset on
+        # the same trace, so each asset is walked at most once
+        self.origins = {}
+        # (chain_name, base_denom) -> traces from the origin to the asset
+        self.traces = {}
+
+    def getPreviousAsset(self, chainName, baseDenom):
+        # the asset the most recent trace points back to, if that trace is of a followed type
+        asset = self.registry.getAsset(chainName, baseDenom)
+        traces = asset.get("traces") if asset else None
+        if not traces or traces[-1].get("type") not in self.traceTypes:
+            return None
+        counterparty = traces[-1].get("counterparty", {})
+        if "chain_name" not in counterparty or "base_denom" not in counterparty:
+            return None
+        return (counterparty["chain_name"], counterparty["base_denom"])
+
+    def getOrigin(self, chainName, baseDenom):
+        # the first asset on the trace; it may be unregistered when a trace points outside the
+        # registry, and a circular trace stops at the asset where it loops
+        walked = []
+        seen = set()
+        key = (chainName, baseDenom)
+        while key not in self.origins:
+            if key in seen:
+                self.origins[key] = key
+                break
+            seen.add(key)
+            walked.append(key)
+            previous = self.getPreviousAsset(*key)
+            if previous is None:
+                self.origins[key] = key
+                break
+            key = previous
+        origin = self.origins[key]
+        for walkedKey in walked:
+            self.origins[walkedKey] = origin
+        return origin
+
+    def getTraces(self, chainName, baseDenom):
+        # every trace from the origin to the asset, in order
+        key = (chainName, baseDenom)
+        if key in self.traces:
+            return self.traces[key]
+        self.traces[key] = []  # guards against circular traces
+        previous = self.getPreviousAsset(chainName, baseDenom)
+        if previous is not None:
+            lastTrace = self.registry.getAsset(chainName, baseDenom)["traces"][-1]
+            self.traces[key] = self.getTraces(*previous) + [lastTrace]
+        return self.traces[key]
+
+    def getOriginAsset(self, chainName, baseDenom):
+        return self.registry.getAsset(*self.getOrigin(chainName, baseDenom))
+
+    def getOriginIndex(self):
+        # (chain_name, base_denom) -> origin (chain_name, base_denom), for every registered asset
+        return {key: self.getOrigin(*key) for key in self.registry.assetsByChainAndBase}
+
+    def getDenomsByOrigin(self):
+        # origin (chain_name, base_denom) -> [(chain_name, base_denom)] of its representations
+        denoms = {}
+        for key, origin in self.getOriginIndex().items():
+            if key != origin:
+                denoms.setdefault(origin, []).append(key)
+        return denoms
+
+    def getUnresolvedTraces(self):
+        # [(chain_name, base_denom, counterparty)] for traces that point to an unregistered asset
+        unresolved = []
+        for chainName, baseDenom in self.registry.assetsByChainAndBase:
+            previous = self.getPreviousAsset(chainName, baseDenom)
+            if previous is not None and self.registry.getAsset(*previous) is None:
+                unresolved.append((chainName, baseDenom, previous))
+        return unresolved
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verify ibc/<hash> denoms and resolve every asset to its origin")
+    parser.add_argument("--ibc-only", action="store_true", help="only follow ibc and ibc-cw20 traces")
+    args = parser.parse_args()
+    registry = getRegistry(chainRegistryRoot)
+    mismatches = verifyIbcDenoms(registry)
+    for chainName, asset, path, expected in mismatches:
+        if expected is None:
+            print("[FAILED] " + chainName + ", " + asset.get("base", "") + ": no trace path to derive the IBC denom from")
+        else:
+            print("[FAILED] " + chainName + ", " + asset.get("base", "") + ": hash of " + path + " is " + expected)
+    resolver = DenomTraceResolver(registry, traceTypesIbc if args.ibc_only else traceTypesAll)
+    originIndex = resolver.getOriginIndex()
+    for chainName, baseDenom, counterparty in resolver.getUnresolvedTraces():
+        print("[WARNING] " + chainName + ", " + baseDenom + " traces back to unregistered asset " + counterparty[0] + ", " + counterparty[1])
+    print("Resolved " + str(len(originIndex)) + " assets to " + str(len(set(originIndex.values()))) + " origins, " + str(len(mismatches)) + " IBC denom mismatch(es)")
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,113 @@
+# Purpose:
+#   to keep our own endpoint probe results in a compact, append-only local history, answer
+#   time-window questions about it ("last success per address", "uptime over N days"), and
+#   drop records past a retention window
+
+import bisect
+import json
+import os
+import time
+
+from chain_registry import chainRegistryRoot, getCachePath
+
+historyFileName = "endpoint_history.jsonl"
+
+# one JSON array per line: [timestamp (s), chain, type, address, ok (0/1), status, elapsed (ms)]
+TIMESTAMP, CHAIN, TYPE, ADDRESS, OK, STATUS, ELAPSED = range(7)
+
+
+class EndpointHistory:
+
+    def __init__(self, path=None, root=chainRegistryRoot):
+        self.path = path or getCachePath(historyFileName, root)
+        # address -> (timestamps, oks); appends are chronological, so both stay sorted by time
+        self.by_address = {}
+        self.last_success_at = {}
+
+    def append(self, records):
+        # records: iterable of (timestamp, chain, type, address, ok, status, elapsed seconds)
+        lines = []
+        for timestamp, chain, endpoint_type, address, ok, status, elapsed in records:
+            record = [int(timestamp), chain, endpoint_type, address, int(bool(ok)), status, round(elapsed * 1000)]
+            lines.append(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self._index(record)
+        with open(self.path, "a+b") as f:
+            # an interrupted write leaves a last line without its newline; end it, so the
+            # first new record is not glued onto it
+            if f.seek(0, os.SEEK_END):
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    lines.insert(0, "\n")
+            f.write("".join(lines).encode("utf-8"))
+
+    def load(self):
+        self.by_address = {}
+        self.last_success_at = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        self._index(json.loads(line))
+                    except (ValueError, IndexError):
+                        continue  # a partially written last line
+        except FileNotFoundError:
+            pass
+        return self
+
+    def _index(self, record):
+        timestamps, oks = self.by_address.setdefault(record[ADDRESS], ([], []))
+        timestamps.append(record[TIMESTAMP])
+        oks.append(record[OK])
+        if record[OK]:
+            self.last_success_at[record[ADDRESS]] = max(record[TIMESTAMP], self.last_success_at.get(record[ADDRESS], 0))
+
+    def __contains__(self, address):
+        return address in self.by_address
+
+    def last_success(self, address):
+        return self.last_success_at.get(address)
+
+    def first_seen(self, address):
+        timestamps, _ = self.by_address.get(address, ([], []))
+        return timestamps[0] if timestamps else None
+
+    def last_seen(self, address):
+        timestamps, _ = self.by_address.get(address, ([], []))
+        return timestamps[-1] if timestamps else None
+
+    def uptime(self, address, days, now=None):
+        # fraction of successful probes in the last `days` days, or None without any probe
+        if address not in self.by_address:
+            return None
+        timestamps, oks = self.by_address[address]
+        since = (now if now is not None else time.time()) - days * 24 * 60 * 60
+        start = bisect.bisect_left(timestamps, since)
+        window = oks[start:]
+        if not window:
+            return None
+        return sum(window) / len(window)
+
+    def compact(self, retention_days, now=None):
+        # rewrite the history without records older than the retention window (or unreadable);
+        # the file is left alone when there is nothing to drop. Call load() afterwards to query it.
+        since = (now if now is not None else time.time()) - retention_days * 24 * 60 * 60
+        kept = []
+        dropped = 0
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        if json.loads(line)[TIMESTAMP] >= since:
+                            kept.append(line if line.endswith("\n") else line + "\n")
+                            continue
+                    except (ValueError, IndexError):
+                        pass
+                    dropped += 1
+        except FileNotFoundError:
+            return self
+        if not dropped:
+            return self
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            f.writelines(kept)
+        os.replace(self.path + ".tmp", self.path)
+        return self
@@ -0,0 +1,206 @@
+# Purpose:
+#   to load every _IBC file (mainnet and testnet) into one in-memory graph of chains and channels,
+#   so tooling can look up a channel from either end and find multi-hop routes between chains
+#   without scanning JSON
+#
+# Usage (from the registry root):
+#   python .github/workflows/utility/ibc_graph.py osmosis cosmoshub [--port transfer] [--include-inactive]
+
+
+# -- IMPORTS --
+
+import argparse
+import heapq
+from collections import namedtuple
+from functools import lru_cache
+
+from chain_registry import chainRegistryRoot, getRegistry
+
+
+# -- VARIABLES --
+
+transferPort = "transfer"
+
+activeStatus = "ACTIVE"
+
+# routes kept per graph; enough for every pair of the busiest chains without growing with the
+# number of queries
+routeCacheSize = 4096
+
+# one direction of a channel: sent from chain_name through (port_id, channel_id), received on
+# the counterparty end; every channel is indexed once from each side
+Hop = namedtuple('Hop', [
+    'chain_name', 'port_id', 'channel_id', 'connection_id',
+    'counterparty_chain_name', 'counterparty_port_id', 'counterparty_channel_id', 'counterparty_connection_id',
+    'ordering', 'version', 'status', 'preferred', 'network_type', 'file_name',
+])
+
+
+# -- IBC GRAPH --
+
+def isUsable(hop, portId, includeInactive):
+    if portId is not None and (hop.port_id != portId or hop.counterparty_port_id != portId):
+        return False
+    # channels without a status tag are assumed to be live
+    return includeInactive or hop.status in (None, activeStatus)
+
+
+def hopRank(hop):
+    # preferred channels first, then channels not marked as non-preferred, then ACTIVE ones
+    return (hop.preferred is not True, hop.preferred is False, hop.status != activeStatus)
+
+
+class IbcGraph:
+
+    def __init__(self, hops):
+        # chain_name -> counterparty chain_name -> [Hop], best channel first
+        self.adjacency = {}
+        # (chain_name, channel_id) -> Hop; channel ids are unique per chain regardless of port
+        self.channels = {}
+        self.channelsByPort = {}
+        for hop in hops:
+            self.adjacency.setdefault(hop.chain_name, {}).setdefault(hop.counterparty_chain_name, []).append(hop)
+            self.adjacency.setdefault(hop.counterparty_chain_name, {})
+            self.channels[(hop.chain_name, hop.channel_id)] = hop
+            self.channelsByPort[(hop.chain_name, hop.port_id, hop.channel_id)] = hop
+        for neighbors in self.adjacency.values():
+            for channels in neighbors.values():
+                channels.sort(key=hopRank)
+        # the graph is immutable, so per-filter edges and routes are computed once and kept
+        # (port_id, includeInactive) -> chain_name -> [(counterparty chain_name, best Hop)]
+        self.edges = {}
+        # (source, destination, port_id, includeInactive, maxHops) -> route, least recently
+        # used first out; routes are tuples, so callers cannot change a cached one
+        self.routes = lru_cache(maxsize=routeCacheSize)(self._findRoute)
+
+    def getChains(self):
+        return sorted(self.adjacency)
+
+    def getNeighbors(self, chainName):
+        return sorted(self.adjacency.get(chainName, {}))
+
+    def getChannel(self, chainName, channelId, portId=None):
+        if portId is not None:
+            return self.channelsByPort.get((chainName, portId, channelId))
+        return self.channels.get((chainName, channelId))
+
+    def getCounterparty(self, chainName, channelId, portId=None):
+        # the same channel seen from the other end
+        hop = self.getChannel(chainName, channelId, portId)
+        if hop is None:
+            return None
+        return self.channelsByPort.get((hop.counterparty_chain_name, hop.counterparty_port_id, hop.counterparty_channel_id))
+
+    def getChannels(self, chainName, counterpartyChainName, portId=transferPort, includeInactive=False):
+        # direct channels between two chains, best first
+        return [
+            hop for hop in self.adjacency.get(chainName, {}).get(counterpartyChainName, [])
+            if isUsable(hop, portId, includeInactive)
+        ]
+
+    def getPreferredChannel(self, chainName, counterpartyChainName, portId=transferPort, includeInactive=False):
+        channels = self.getChannels(chainName, counterpartyChainName, portId, includeInactive)
+        return channels[0] if channels else None
+
+    def getEdges(self, portId=transferPort, includeInactive=False):
+        key = (portId, includeInactive)
+        if key not in self.edges:
+            edges = {}
+            for chainName, neighbors in self.adjacency.items():
+                edges[chainName] = []
+                for counterpartyChainName in neighbors:
+                    hop = self.getPreferredChannel(chainName, counterpartyChainName, portId, includeInactive)
+                    if hop is not None:
+                        edges[chainName].append((counterpartyChainName, hop))
+            self.edges[key] = edges
+        return self.edges[key]
+
+    def findRoute(self, source, destination, portId=transferPort, includeInactive=False, maxHops=None):
+        # returns the tuple of hops from source to destination, or None if there is no route;
+        # routes with fewer hops win, and among those the one using the fewest non-preferred
+        # channels
+        return self.routes(source, destination, portId, includeInactive, maxHops)
+
+    def _findRoute(self, source, destination, portId, includeInactive, maxHops):
+        if source not in self.adjacency or destination not in self.adjacency:
+            return None
+        if source == destination:
+            return ()
+        edges = self.getEdges(portId, includeInactive)
+        # Dijkstra over (hops, non-preferred hops), so cost comparisons are lexicographic
+        best = {source: (0, 0)}
+        previous = {}
+        queue = [(0, 0, source)]
+        while queue:
+            hops, penalty, chainName = heapq.heappop(queue)
+            if (hops, penalty) > best[chainName]:
+                continue
+            if chainName == destination:
+                break
+            if maxHops is not None and hops >= maxHops:
+                continue
+            for counterpartyChainName, hop in edges[chainName]:
+                cost = (hops + 1, penalty + (hop.preferred is not True))
+                if counterpartyChainName not in best or cost < best[counterpartyChainName]:
+                    best[counterpartyChainName] = cost
+                    previous[counterpartyChainName] = hop
+                    heapq.heappush(queue, (cost[0], cost[1], counterpartyChainName))
+        if destination not in previous:
+            return None
+        route = []
+        chainName = destination
+        while chainName != source:
+            hop = previous[chainName]
+            route.append(hop)
+            chainName = hop.chain_name
+        return tuple(reversed(route))
+
+
+def hopsFromConnection(connection):
+    # yields both directions of every concrete channel in an _IBC file; wildcard ("*") channels
+    # describe a family of channels and are not routable
+    data = connection.data or {}
+    chains = {side: data.get(side, {}) for side in ("chain_1", "chain_2")}
+    if not all(chains[side].get("chain_name") for side in chains):
+        return
+    for channel in data.get("channels", []):
+        tags = channel.get("tags", {})
+        for side, counterpartySide in (("chain_1", "chain_2"), ("chain_2", "chain_1")):
+            end = channel.get(side, {})
+            counterpartyEnd = channel.get(counterpartySide, {})
+            if "*" in (end.get("channel_id"), counterpartyEnd.get("channel_id")):
+                continue
+            yield Hop(
+                chains[side]["chain_name"], end.get("port_id"), end.get("channel_id"), chains[side].get("connection_id"),
+                chains[counterpartySide]["chain_name"], counterpartyEnd.get("port_id"), counterpartyEnd.get("channel_id"), chains[counterpartySide].get("connection_id"),
+                channel.get("ordering"), channel.get("version"), tags.get("status"), tags.get("preferred"),
+                connection.network_type, connection.file_name,
+            )
+
+
+def buildIbcGraph(registry, network_types=None):
+    return IbcGraph(
+        hop
+        for connection in registry.ibc
+        if network_types is None or connection.network_type in network_types
+        for hop in hopsFromConnection(connection)
+    )
+
+
+def getIbcGraph(root=chainRegistryRoot, network_types=None):
+    return buildIbcGraph(getRegistry(root), network_types)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find the IBC route between two chains")
+    parser.add_argument("source")
+    parser.add_argument("destination")
+    parser.add_argument("--port", default=transferPort, help="port both ends of every hop must use (default: transfer)")
+    parser.add_argument("--include-inactive", action="store_true", help="also route through channels tagged INACTIVE")
+    parser.add_argument("--max-hops", type=int, default=None)
+    args = parser.parse_args()
+    route = getIbcGraph().findRoute(args.source, args.destination, args.port, args.include_inactive, args.max_hops)
+    if route is None:
+        print("No route from " + args.source + " to " + args.destination)
+    for hop in route or []:
+        print(hop.chain_name + " " + hop.port_id + "/" + hop.channel_id + " -> " + hop.counterparty_chain_name + " " + hop.counterparty_port_id + "/" + hop.counterparty_channel_id + (" (preferred)" if hop.preferred else ""))
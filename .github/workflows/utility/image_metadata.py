@@ -0,0 +1,302 @@
+# Purpose:
+#   to audit every file in the registry's images/ directories against IMAGE-GUIDELINES.md (file
+#   size, square dimensions, authentic PNGs, SVG shape counts) without decoding any pixels: PNG
+#   dimensions come from the IHDR chunk and SVG dimensions from the root element's attributes;
+#   metadata is cached by content hash, and files whose size and mtime are unchanged since the
+#   last run are not read at all
+#
+# Usage (from the registry root):
+#   python .github/workflows/utility/image_metadata.py [--workers 8] [--json]
+
+
+# -- IMPORTS --
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import struct
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import instrumentation
+from chain_registry import cacheDirectoryName, chainRegistryRoot, getCachePath, getRegistry
+
+
+# -- VARIABLES --
+
+cacheFileName = "image_metadata.json"
+
+# bump when the metadata gathered per image changes, so old cache entries are dropped
+cacheVersion = 2
+
+imageDirectoryName = "images"
+
+imageURIs = ["png", "svg"]
+
+registryUriPrefix = "https://raw.githubusercontent.com/cosmos/chain-registry/master/"
+
+# _template holds empty placeholder images
+skippedDirectories = {".git", ".github", "node_modules", cacheDirectoryName, ".pytest_cache", ".mypy_cache", ".vs", "_template"}
+
+# the limits validate_data.mjs enforces
+maxFileSize = 251 * 1024
+maxSvgShapes = 1000
+squareTolerance = 1
+# an SVG with <image> elements and over this size likely wraps a raster image when it has
+# fewer than minSvgShapes shapes and fewer than minMaskCommas commas in its mask and clipPath
+# paths, or when it is larger than the PNG of the same image object
+embeddedRasterSize = 25000
+minSvgShapes = 3
+minMaskCommas = 3
+
+pngSignature = b"\x89PNG\r\n\x1a\n"
+
+svgRootPattern = re.compile(rb"<svg\b[^>]*>", re.IGNORECASE)
+svgWidthPattern = re.compile(rb"\swidth\s*=\s*[\"']([\d.]+)(?:px)?[\"']", re.IGNORECASE)
+svgHeightPattern = re.compile(rb"\sheight\s*=\s*[\"']([\d.]+)(?:px)?[\"']", re.IGNORECASE)
+svgViewBoxPattern = re.compile(rb"viewBox\s*=\s*[\"']([\d.\s-]+)[\"']", re.IGNORECASE)
+svgShapePattern = re.compile(rb"<(?:path|rect|circle|polygon|polyline)[\s>]", re.IGNORECASE)
+svgImagePattern = re.compile(rb"<image[\s>]", re.IGNORECASE)
+svgMaskPattern = re.compile(rb"<mask[\s\S]*?</mask>|<clipPath[\s\S]*?</clipPath>", re.IGNORECASE)
+# as in validate_data.mjs: the first d="..." of each matched <path> element is counted
+svgMaskPathPattern = re.compile(rb"<path[^>]*d=\"([^\"]+)\"", re.IGNORECASE)
+svgPathDataPattern = re.compile(rb"d=\"([^\"]+)\"", re.IGNORECASE)
+
+Issue = namedtuple('Issue', ['path', 'check', 'message', 'references'])
+
+
+# -- METADATA --
+
+def fileType(content):
+    # the format the leading bytes say the file is, whatever its extension; an SVG root may
+    # follow a long prolog (comments, DOCTYPE), so text is searched for it
+    header = content[:12]
+    if header.startswith(pngSignature):
+        return "png"
+    if header.startswith(b"\xff\xd8"):
+        return "jpeg"
+    if header.startswith(b"GIF8"):
+        return "gif"
+    if header.startswith(b"BM"):
+        return "bmp"
+    if header.startswith(b"%PDF"):
+        return "pdf"
+    if header.startswith(b"RIFF") and header[8:12] == b"WEBP":
+        return "webp"
+    if svgRootPattern.search(content):
+        return "svg"
+    return "unknown"
+
+
+def pngDimensions(content):
+    # IHDR is the first chunk: 8-byte signature, 4-byte length, "IHDR", then width and height
+    if len(content) < 24 or content[12:16] != b"IHDR":
+        return None, None
+    return struct.unpack(">II", content[16:24])
+
+
+def svgDimensions(root):
+    # width/height attributes of the root element, else its viewBox; (None, None) if neither
+    width = svgWidthPattern.search(root)
+    height = svgHeightPattern.search(root)
+    if width and height:
+        return float(width.group(1)), float(height.group(1))
+    viewBox = svgViewBoxPattern.search(root)
+    if viewBox:
+        parts = viewBox.group(1).split()
+        if len(parts) == 4:
+            return float(parts[2]), float(parts[3])
+    return None, None
+
+
+def imageMetadata(content):
+    # {"type", "size", "width", "height"}, plus shape and <image> counts for SVGs
+    metadata = {"type": fileType(content), "size": len(content), "width": None, "height": None}
+    if metadata["type"] == "png":
+        metadata["width"], metadata["height"] = pngDimensions(content)
+    elif metadata["type"] == "svg":
+        root = svgRootPattern.search(content)
+        metadata["width"], metadata["height"] = svgDimensions(root.group(0))
+        metadata["shapes"] = len(svgShapePattern.findall(content))
+        metadata["embedded_images"] = len(svgImagePattern.findall(content))
+        metadata["mask_commas"] = maskCommaCount(content)
+    return metadata
+
+
+def maskCommaCount(content):
+    # commas in the path data inside <mask> and <clipPath> elements
+    count = 0
+    for mask in svgMaskPattern.finditer(content):
+        for path in svgMaskPathPattern.finditer(mask.group(0)):
+            count += svgPathDataPattern.search(path.group(0)).group(1).count(b",")
+    return count
+
+
+def scanFile(path):
+    # returns (path, sha256 digest, metadata)
+    with open(path, "rb") as f:
+        content = f.read()
+    return path, hashlib.sha256(content).hexdigest(), imageMetadata(content)
+
+
+# -- CACHE --
+
+def loadCache(root):
+    try:
+        with open(getCachePath(cacheFileName, root), encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    if cache.get("version") != cacheVersion:
+        cache = {"version": cacheVersion, "files": {}, "images": {}}
+    return cache
+
+
+def saveCache(root, cache):
+    path = getCachePath(cacheFileName, root)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(cache, f, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
+
+
+# -- SCAN --
+
+def listImageFiles(root):
+    for directory, directoryNames, fileNames in os.walk(root):
+        directoryNames[:] = sorted(name for name in directoryNames if name not in skippedDirectories)
+        if os.path.basename(directory) == imageDirectoryName:
+            for fileName in sorted(fileNames):
+                yield os.path.join(directory, fileName)
+
+
+@instrumentation.stage("scan_images")
+def scanImages(root=chainRegistryRoot, workers=None):
+    # returns {relative path: metadata}; only new or modified files are read, and only content
+    # not seen before is parsed
+    cache = loadCache(root)
+    files = {}
+    toScan = []
+    for path in listImageFiles(root):
+        relativePath = os.path.relpath(path, root).replace(os.sep, "/")
+        stat = os.stat(path)
+        cached = cache["files"].get(relativePath)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns and cached[2] in cache["images"]:
+            files[relativePath] = cached
+        else:
+            files[relativePath] = [stat.st_size, stat.st_mtime_ns, None]
+            toScan.append(path)
+
+    instrumentation.count("images_scanned", len(toScan))
+    if toScan:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for path, digest, metadata in executor.map(scanFile, toScan, chunksize=32):
+                files[os.path.relpath(path, root).replace(os.sep, "/")][2] = digest
+                cache["images"].setdefault(digest, metadata)
+
+    changed = bool(toScan) or len(files) != len(cache["files"])
+    if changed:
+        cache["files"] = files
+        digests = {entry[2] for entry in files.values()}
+        cache["images"] = {digest: metadata for digest, metadata in cache["images"].items() if digest in digests}
+        saveCache(root, cache)
+    return {relativePath: cache["images"][entry[2]] for relativePath, entry in files.items()}
+
+
+# -- CHECKS --
+
+def imageObjects(registry):
+    # yields ({image URI type: relative path}, "<chain_name> <where>") for every logo_URIs and
+    # images entry in chain.json and assetlist.json, with the URIs that point into the registry
+    for chain in registry.chains:
+        for data, where in [(chain.chain, "chain.json")] + [
+            (asset, "asset " + str(asset.get("base"))) for asset in (chain.assetlist or {}).get("assets", [])
+        ]:
+            if not data:
+                continue
+            for image, field in [(data.get("logo_URIs", {}), "logo_URIs")] + [(image, "images") for image in data.get("images", [])]:
+                paths = {
+                    uriType: image[uriType][len(registryUriPrefix):]
+                    for uriType in imageURIs
+                    if isinstance(image.get(uriType), str) and image[uriType].startswith(registryUriPrefix)
+                }
+                yield paths, chain.chain_name + " " + where + " " + field
+
+
+def imageReferences(registry):
+    # (relative path -> ["<chain_name> <where>"] for every png/svg URI in chain.json and
+    # assetlist.json, svg relative path -> {png relative paths of the same image objects})
+    references = {}
+    pngCounterparts = {}
+    for paths, where in imageObjects(registry):
+        for path in paths.values():
+            references.setdefault(path, []).append(where)
+        if "svg" in paths and "png" in paths:
+            pngCounterparts.setdefault(paths["svg"], set()).add(paths["png"])
+    return references, pngCounterparts
+
+
+def isSquare(metadata):
+    # dimensions that cannot be determined are not reported, as in validate_data.mjs
+    if metadata["width"] is None or metadata["height"] is None:
+        return True
+    return abs(metadata["width"] - metadata["height"]) <= squareTolerance
+
+
+def checkImage(relativePath, metadata, pngSizes=()):
+    # returns [(check, message)] for one image; pngSizes are the sizes of the PNGs that share an
+    # image object with this SVG
+    issues = []
+    extension = os.path.splitext(relativePath)[1].lower().lstrip(".")
+    if metadata["size"] > maxFileSize:
+        issues.append(("file_size", "too large: " + str(metadata["size"]) + " bytes"))
+    if extension not in imageURIs:
+        issues.append(("format", "not a PNG or SVG file"))
+    elif extension == "png" and metadata["type"] != "png":
+        issues.append(("png_authenticity", "not an authentic PNG: " + metadata["type"]))
+    elif extension == "svg" and metadata["type"] != "svg":
+        issues.append(("svg_authenticity", "no <svg> root element: " + metadata["type"]))
+    if metadata["type"] in imageURIs and not isSquare(metadata):
+        issues.append(("square", "not square: " + str(metadata["width"]) + "x" + str(metadata["height"])))
+    if metadata["type"] == "svg":
+        if metadata["shapes"] > maxSvgShapes:
+            issues.append(("svg_shapes", "too many shapes: " + str(metadata["shapes"])))
+        if metadata["embedded_images"] and metadata["size"] > embeddedRasterSize:
+            largerThan = [size for size in pngSizes if metadata["size"] > size]
+            if largerThan:
+                issues.append(("svg_embedded_raster", "likely an embedded raster image: larger (" + str(metadata["size"]) + " bytes) than the corresponding PNG (" + str(min(largerThan)) + " bytes)"))
+            elif metadata["shapes"] < minSvgShapes and metadata["mask_commas"] < minMaskCommas:
+                issues.append(("svg_embedded_raster", "likely an embedded raster image: " + str(metadata["embedded_images"]) + " <image> element(s), " + str(metadata["shapes"]) + " shape(s), " + str(metadata["size"]) + " bytes"))
+    return issues
+
+
+@instrumentation.stage("audit_images")
+def auditImages(root=chainRegistryRoot, workers=None):
+    # returns (metadata by relative path, [Issue]) for every image file and every image reference
+    images = scanImages(root, workers)
+    references, pngCounterparts = imageReferences(getRegistry(root))
+    issues = []
+    for relativePath, metadata in images.items():
+        pngSizes = [images[png]["size"] for png in sorted(pngCounterparts.get(relativePath, ())) if png in images]
+        for check, message in checkImage(relativePath, metadata, pngSizes):
+            issues.append(Issue(relativePath, check, message, references.get(relativePath, [])))
+    for relativePath in sorted(set(references) - set(images)):
+        issues.append(Issue(relativePath, "existence", "referenced but does not exist", references[relativePath]))
+    return images, issues
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check every registry image against IMAGE-GUIDELINES.md from file headers")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes for new or modified images (default: one per CPU)")
+    parser.add_argument("--json", action="store_true", help="print the metadata of every image as JSON instead of checking")
+    args = parser.parse_args()
+    images, issues = auditImages(workers=args.workers)
+    if args.json:
+        print(json.dumps(images, indent=2, sort_keys=True))
+        sys.exit(0)
+    for issue in issues:
+        print("[FAILED] " + issue.path + ": " + issue.message + (" (referenced at: " + "; ".join(issue.references) + ")" if issue.references else ""))
+    print("Checked " + str(len(images)) + " images, " + str(len(issues)) + " issue(s)")
+    sys.exit(1 if issues else 0)
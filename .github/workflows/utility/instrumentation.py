@@ -0,0 +1,151 @@
+# Purpose:
+#   to time the stages of the Python tooling and count what they do (files parsed, bytes read,
+#   requests made), without editing code: set REGISTRY_TRACE_DIR and every instrumented script
+#   writes one Chrome-trace JSON file per run there (open it in chrome://tracing or Perfetto);
+#   with REGISTRY_PROFILE=1 each outermost stage is also captured with cProfile
+#
+# Usage:
+#   REGISTRY_TRACE_DIR=/tmp/traces REGISTRY_PROFILE=1 python .github/workflows/utility/validate_data.py
+#
+# In code:
+#   with instrumentation.stage("parse"):
+#       ...
+#   instrumentation.count("requests")
+
+
+# -- IMPORTS --
+
+import atexit
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+
+# -- VARIABLES --
+
+traceDirectory = os.environ.get("REGISTRY_TRACE_DIR")
+profileStages = os.environ.get("REGISTRY_PROFILE", "") not in ("", "0")
+
+# instrumentation is a no-op unless a trace directory is set
+enabled = bool(traceDirectory)
+
+
+# -- RECORDING --
+
+class Recorder:
+
+    def __init__(self, script):
+        self.script = script
+        self.pid = os.getpid()
+        self.startedAt = time.time()
+        self.origin = time.perf_counter()
+        self.events = []
+        self.counters = {}
+        # stage name -> total seconds, over every time the stage ran
+        self.totals = {}
+        self.lock = threading.Lock()
+        self.profiling = False
+        # stage name -> number of profiles written, so a repeated stage keeps every capture
+        self.profiles = {}
+
+    def timestamp(self, now=None):
+        # microseconds since the recorder started, as trace events expect
+        return ((now if now is not None else time.perf_counter()) - self.origin) * 1e6
+
+    def path(self, suffix):
+        return os.path.join(traceDirectory, self.script + "-" + time.strftime("%Y%m%dT%H%M%S", time.gmtime(self.startedAt)) + "-" + str(self.pid) + suffix)
+
+    def write(self):
+        if os.getpid() != self.pid:
+            return  # a forked worker; only the process that started the run writes
+        end = self.timestamp()
+        events = [
+            {"name": "process_name", "ph": "M", "pid": self.pid, "args": {"name": self.script}},
+        ] + self.events + [
+            {"name": name, "ph": "C", "ts": end, "pid": self.pid, "args": {name: value}}
+            for name, value in sorted(self.counters.items())
+        ]
+        trace = {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "script": self.script,
+                "argv": sys.argv,
+                "started_at": self.startedAt,
+                "seconds": round(end / 1e6, 6),
+                "stages": {name: round(seconds, 6) for name, seconds in self.totals.items()},
+                "counters": self.counters,
+            },
+        }
+        os.makedirs(traceDirectory, exist_ok=True)
+        with open(self.path(".json"), "w") as f:
+            json.dump(trace, f)
+
+
+recorder = None
+
+
+def scriptName():
+    # "validate_data" for .../validate_data.py, "pytest" for python -m pytest
+    path = os.path.abspath(sys.argv[0]) if sys.argv and sys.argv[0] else "python"
+    name = os.path.splitext(os.path.basename(path))[0]
+    return os.path.basename(os.path.dirname(path)) if name == "__main__" else name
+
+
+def start(script=None):
+    # called on import; scripts call it again only to name their trace (keeping what was
+    # already recorded)
+    global recorder
+    if not enabled:
+        return
+    if recorder is None:
+        recorder = Recorder(script or scriptName())
+        atexit.register(lambda: recorder.write())
+    elif script:
+        recorder.script = script
+
+
+@contextmanager
+def stage(name, **args):
+    # times the enclosed block as one trace event; usable as a decorator too
+    if recorder is None:
+        yield
+        return
+    profile = None
+    if profileStages and not recorder.profiling and threading.current_thread() is threading.main_thread():
+        recorder.profiling = True
+        profile = cProfile.Profile()
+        profile.enable()
+    began = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        if profile is not None:
+            profile.disable()
+            recorder.profiling = False
+            written = recorder.profiles.get(name, 0)
+            recorder.profiles[name] = written + 1
+            os.makedirs(traceDirectory, exist_ok=True)
+            profile.dump_stats(recorder.path("-" + name + ("-" + str(written + 1) if written else "") + ".prof"))
+        event = {"name": name, "cat": "stage", "ph": "X", "ts": recorder.timestamp(began), "dur": (end - began) * 1e6, "pid": recorder.pid, "tid": threading.get_ident()}
+        if args:
+            event["args"] = args
+        with recorder.lock:
+            recorder.events.append(event)
+            recorder.totals[name] = recorder.totals.get(name, 0) + end - began
+
+
+def count(name, value=1):
+    # adds to a named counter; safe to call from worker threads
+    if recorder is None:
+        return
+    with recorder.lock:
+        recorder.counters[name] = recorder.counters.get(name, 0) + value
+
+
+start()
@@ -0,0 +1,77 @@
+# Purpose:
+#   to write registry JSON files the way they are formatted in the repo (json.dumps with
+#   indent=2 and unescaped Unicode, no trailing newline), keeping the conventions of the file
+#   being replaced (trailing newlines, CRLF line endings, \u escapes), and to skip the write
+#   entirely when the data did not change, so maintenance scripts only touch files they edit
+
+
+# -- IMPORTS --
+
+import json
+import os
+import stat
+from collections import namedtuple
+
+import instrumentation
+
+
+# -- VARIABLES --
+
+JsonFormat = namedtuple('JsonFormat', ['ensure_ascii', 'newline', 'ending'])
+
+defaultFormat = JsonFormat(ensure_ascii=False, newline="\n", ending="")
+
+
+# -- WRITING --
+
+def detectFormat(raw):
+    # the formatting conventions of an existing file's text
+    return JsonFormat(
+        # a pure-ASCII file that escapes characters was written with ensure_ascii
+        ensure_ascii=raw.isascii() and "\\u" in raw,
+        newline="\r\n" if "\r\n" in raw else "\n",
+        # whatever line breaks follow the closing bracket
+        ending=raw[len(raw.rstrip("\r\n")):].replace("\r\n", "\n"),
+    )
+
+
+def serializeJson(data, jsonFormat=defaultFormat):
+    text = json.dumps(data, indent=2, ensure_ascii=jsonFormat.ensure_ascii)
+    text += jsonFormat.ending
+    if jsonFormat.newline != "\n":
+        text = text.replace("\n", jsonFormat.newline)
+    return text.encode("utf-8")
+
+
+def sameData(a, b):
+    # equal values in the same key order; unlike ==, 1, 1.0 and true are told apart
+    return json.dumps(a, ensure_ascii=False) == json.dumps(b, ensure_ascii=False)
+
+
+def writeJsonFile(path, data):
+    # returns True if the file was written; a file that already holds `data` is left as it is,
+    # whatever its formatting
+    jsonFormat = defaultFormat
+    mode = None
+    try:
+        with open(path, "rb") as f:
+            existing = f.read()
+    except FileNotFoundError:
+        existing = None
+    if existing is not None:
+        raw = existing.decode("utf-8", errors="replace")
+        try:
+            if sameData(json.loads(raw), data):
+                instrumentation.count("json_writes_skipped")
+                return False
+        except ValueError:
+            pass
+        jsonFormat = detectFormat(raw)
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    with open(path + ".tmp", "wb") as f:
+        f.write(serializeJson(data, jsonFormat))
+    if mode is not None:
+        os.chmod(path + ".tmp", mode)
+    os.replace(path + ".tmp", path)
+    instrumentation.count("json_writes")
+    return True
@@ -0,0 +1,275 @@
+# Purpose:
+#   to index every endpoint in chain.json `apis` by provider, so questions such as "which
+#   endpoints does Provider X run" or "which chains lose all REST if Provider X goes down" are
+#   answered from the index instead of a rescan of the registry; the index is kept in .cache and
+#   only chain.json files that changed since the last run are re-read. It also reports
+#   per-chain provider diversity and marks the providers in _providers/provider-allowlist.json.
+#   Chains are identified by their directory relative to the registry root, since a mainnet and
+#   a testnet (or a cosmos and a non-cosmos chain) may share a chain_name.
+#
+# Usage (from the registry root):
+#   python .github/workflows/utility/provider_index.py --provider Polkachu "Lavender.Five Nodes 🐝"
+#   python .github/workflows/utility/provider_index.py --chain osmosis
+#   python .github/workflows/utility/provider_index.py --least-diverse 20
+
+
+# -- IMPORTS --
+
+import argparse
+import json
+import os
+from collections import Counter, namedtuple
+
+import instrumentation
+from chain_registry import chainRegistryRoot, fileToFileName, getCachePath, listChainDirectories, readJsonFileWithDigest
+
+
+# -- VARIABLES --
+
+cacheFileName = "provider_index.json"
+
+# bump when what is stored per chain.json changes
+cacheVersion = 1
+
+providerAllowlistPath = os.path.join("_providers", "provider-allowlist.json")
+
+# the endpoint types failover cares about; the others are indexed but not part of the metrics
+defaultEndpointTypes = ("rpc", "rest", "grpc")
+
+# endpoints without a provider are grouped under this key
+unknownProvider = ""
+
+# directory: the chain's directory relative to the registry root ("osmosis", "testnets/osmosistestnet")
+Endpoint = namedtuple('Endpoint', ['chain_name', 'network_type', 'type', 'address', 'provider', 'directory'])
+
+
+# -- GENERAL UTILITY FUNCTIONS --
+
+def providerKey(name):
+    # the registry spells some providers several ways ("NodeStake", "nodeStake")
+    return (name or unknownProvider).strip().casefold()
+
+
+def chainEndpoints(data):
+    # [[type, address, provider]] from one chain.json
+    return [
+        [endpointType, endpoint["address"], endpoint.get("provider")]
+        for endpointType, endpoints in sorted((data.get("apis") or {}).items())
+        for endpoint in endpoints
+        if endpoint.get("address")
+    ]
+
+
+# -- INDEX FILE --
+
+def loadCache(root):
+    try:
+        with open(getCachePath(cacheFileName, root), encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    if cache.get("version") != cacheVersion:
+        cache = {"version": cacheVersion, "files": {}, "allowlist": None}
+    return cache
+
+
+def saveCache(root, cache):
+    path = getCachePath(cacheFileName, root)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
+
+
+def fileState(path):
+    # None when the file does not exist; taken before the file is read, so a write that lands
+    # during the read leaves a stale state behind and the file is read again next run
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+@instrumentation.stage("update_provider_index")
+def updateIndex(root=chainRegistryRoot):
+    # brings the cached index up to date and returns it; a chain.json is re-read only when its
+    # size or mtime changed, and re-indexed only when its content did
+    root = os.path.abspath(root)
+    cache = loadCache(root)
+    files = {}
+    changed = False
+    for networkType, _, name, directory in listChainDirectories(root):
+        path = os.path.join(directory, fileToFileName["chain"])
+        state = fileState(path)
+        if state is None:
+            continue
+        relativePath = os.path.relpath(path, root)
+        entry = cache["files"].get(relativePath)
+        if entry is None or entry["state"] != state:
+            data, error, digest = readJsonFileWithDigest(path)
+            instrumentation.count("chain_files_read")
+            if entry is None or entry["digest"] != digest:
+                data = data if isinstance(data, dict) else {}
+                entry = {
+                    "chain_name": data.get("chain_name", name),
+                    "network_type": networkType,
+                    "digest": digest,
+                    "endpoints": chainEndpoints(data),
+                }
+                instrumentation.count("chain_files_indexed")
+            entry = dict(entry, state=state)
+            changed = True
+        files[relativePath] = entry
+    changed = changed or len(files) != len(cache["files"])
+
+    path = os.path.join(root, providerAllowlistPath)
+    state = fileState(path)
+    if state is None and cache["allowlist"] is not None:
+        # the allowlist was deleted; its providers are no longer marked
+        cache["allowlist"] = None
+        changed = True
+    elif state is not None and (cache["allowlist"] or {}).get("state") != state:
+        data, _, _ = readJsonFileWithDigest(path)
+        cache["allowlist"] = {
+            "state": state,
+            "providers": {
+                provider["name"]: provider.get("status")
+                for provider in (data or {}).get("providers", []) if provider.get("name")
+            },
+        }
+        changed = True
+
+    if changed:
+        cache["files"] = files
+        saveCache(root, cache)
+    return ProviderIndex(cache)
+
+
+# -- PROVIDER INDEX --
+
+class ProviderIndex:
+
+    def __init__(self, cache):
+        # chain directory -> [Endpoint]
+        self.endpointsByChain = {}
+        self.endpointsByProvider = {}
+        # chain name -> [chain directory]
+        self.chainDirectories = {}
+        spellings = {}
+        for relativePath, entry in sorted(cache["files"].items()):
+            directory = os.path.dirname(relativePath).replace(os.sep, "/")
+            endpoints = [Endpoint(entry["chain_name"], entry["network_type"], *endpoint, directory) for endpoint in entry["endpoints"]]
+            self.endpointsByChain[directory] = endpoints
+            self.chainDirectories.setdefault(entry["chain_name"], []).append(directory)
+            for endpoint in endpoints:
+                key = providerKey(endpoint.provider)
+                self.endpointsByProvider.setdefault(key, []).append(endpoint)
+                spellings.setdefault(key, Counter())[endpoint.provider] += 1
+        # provider key -> the most common spelling of the name
+        self.providerNames = {key: counter.most_common(1)[0][0] for key, counter in spellings.items()}
+        # provider key -> allowlist status, for providers that publish a manifest
+        self.allowlist = {providerKey(name): status for name, status in ((cache["allowlist"] or {}).get("providers") or {}).items()}
+
+    def getProviders(self):
+        # [(provider name, endpoint count)], most endpoints first
+        return sorted(
+            ((self.providerNames[key], len(endpoints)) for key, endpoints in self.endpointsByProvider.items() if key != unknownProvider),
+            key=lambda item: (-item[1], item[0]),
+        )
+
+    def getEndpoints(self, provider, endpointTypes=None):
+        return [
+            endpoint for endpoint in self.endpointsByProvider.get(providerKey(provider), [])
+            if endpointTypes is None or endpoint.type in endpointTypes
+        ]
+
+    def getChains(self, provider):
+        return sorted({endpoint.chain_name for endpoint in self.endpointsByProvider.get(providerKey(provider), [])})
+
+    def getChainDirectories(self, chain):
+        # the directories of the chains named `chain`, or `chain` itself when it is a directory
+        if chain in self.chainDirectories:
+            return self.chainDirectories[chain]
+        return [chain] if chain in self.endpointsByChain else []
+
+    def getAllowlistStatus(self, provider):
+        return self.allowlist.get(providerKey(provider))
+
+    def blastRadius(self, providers, endpointTypes=defaultEndpointTypes):
+        # chain directory -> endpoint types for which every endpoint is run by one of
+        # `providers`, i.e. what those chains lose entirely if the providers go down
+        keys = {providerKey(provider) for provider in providers}
+        affected = {}
+        for directory in sorted({endpoint.directory for key in keys for endpoint in self.endpointsByProvider.get(key, [])}):
+            endpoints = self.endpointsByChain[directory]
+            for endpointType in endpointTypes:
+                ofType = [endpoint for endpoint in endpoints if endpoint.type == endpointType]
+                if ofType and all(providerKey(endpoint.provider) in keys for endpoint in ofType):
+                    affected.setdefault(directory, []).append(endpointType)
+        return affected
+
+    def diversity(self, directory, endpointTypes=defaultEndpointTypes):
+        # for the chain in `directory`, endpoint type -> {"endpoints", "providers", "top_provider", "top_share", "effective_providers"};
+        # effective_providers is the inverse Herfindahl index of the providers' shares, so two
+        # providers with one endpoint each count as 2 and a 9:1 split as about 1.2. Endpoints
+        # without a provider count as a single unknown provider.
+        metrics = {}
+        for endpointType in endpointTypes:
+            counts = Counter(providerKey(endpoint.provider) for endpoint in self.endpointsByChain.get(directory, []) if endpoint.type == endpointType)
+            total = sum(counts.values())
+            if not total:
+                metrics[endpointType] = {"endpoints": 0, "providers": 0, "top_provider": None, "top_share": 0, "effective_providers": 0}
+                continue
+            topKey, topCount = counts.most_common(1)[0]
+            metrics[endpointType] = {
+                "endpoints": total,
+                "providers": len(counts),
+                "top_provider": self.providerNames[topKey],
+                "top_share": round(topCount / total, 3),
+                "effective_providers": round(1 / sum((count / total) ** 2 for count in counts.values()), 2),
+            }
+        return metrics
+
+    def leastDiverse(self, endpointType="rpc", networkTypes=("mainnet",)):
+        # [(chain directory, metrics)] for chains with at least one endpoint of the type, by
+        # effective providers, fewest first
+        chains = [
+            (directory, self.diversity(directory, [endpointType])[endpointType])
+            for directory, endpoints in self.endpointsByChain.items()
+            if endpoints and endpoints[0].network_type in networkTypes
+        ]
+        return sorted(
+            ((directory, metrics) for directory, metrics in chains if metrics["endpoints"]),
+            key=lambda item: (item[1]["effective_providers"], item[0]),
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query registry endpoints by provider")
+    parser.add_argument("--provider", nargs="*", default=None, help="list these providers' endpoints and the chains that lose an endpoint type entirely without them")
+    parser.add_argument("--chain", nargs="*", default=None, help="show provider diversity for these chains (chain names or directories such as testnets/osmosistestnet)")
+    parser.add_argument("--least-diverse", type=int, default=None, metavar="N", help="list the N mainnet chains with the least diverse RPC providers")
+    args = parser.parse_args()
+    index = updateIndex()
+
+    if args.provider:
+        for provider in args.provider:
+            status = index.getAllowlistStatus(provider)
+            endpoints = index.getEndpoints(provider)
+            print(provider + (" (allowlist: " + status + ")" if status else "") + ": " + str(len(endpoints)) + " endpoints on " + str(len(index.getChains(provider))) + " chains")
+            for endpoint in endpoints:
+                print("  " + endpoint.chain_name + " " + endpoint.type + " " + endpoint.address)
+        affected = index.blastRadius(args.provider)
+        print("Without " + ", ".join(args.provider) + ", " + str(len(affected)) + " chain(s) lose every endpoint of a type:")
+        for directory, endpointTypes in affected.items():
+            print("  " + directory + ": " + ", ".join(endpointTypes))
+    if args.chain:
+        for chain in args.chain:
+            for directory in index.getChainDirectories(chain) or [chain]:
+                print(directory + ": " + json.dumps(index.diversity(directory), ensure_ascii=False))
+    if args.least_diverse:
+        for directory, metrics in index.leastDiverse()[:args.least_diverse]:
+            print(directory + ": " + json.dumps(metrics, ensure_ascii=False))
+    if not (args.provider or args.chain or args.least_diverse):
+        for name, count in index.getProviders()[:20]:
+            print(str(count).rjust(5) + "  " + name)
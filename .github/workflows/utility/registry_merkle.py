@@ -0,0 +1,243 @@
+# Purpose:
+#   to describe the registry as a Merkle tree of content hashes (chains, their chain.json,
+#   assetlist.json and versions.json, and _IBC files, down to individual endpoints, assets,
+#   versions and channels) and to diff two such trees semantically ("asset added", "endpoint
+#   removed", "channel tags.status changed"); the diff only descends into subtrees whose hashes
+#   differ, so its cost follows the size of the change, not of the registry
+#
+# Usage (from the registry root):
+#   python .github/workflows/utility/registry_merkle.py build [--output registry.merkle]
+#   python .github/workflows/utility/registry_merkle.py diff old.merkle [new.merkle] [--json]
+#
+# Trees are stored in the registry_snapshot.py format, so a diff reads only the nodes it visits.
+# Node layout: {"hash": hex, "children": {key: node}} or, for leaves, {"hash": hex, "value": json}.
+
+
+# -- IMPORTS --
+
+import argparse
+import hashlib
+import json
+import os
+from collections import namedtuple
+
+import instrumentation
+from chain_registry import chainRegistryRoot, fileToFileName, getCachePath, loadRegistry
+from registry_snapshot import LazyObject, SnapshotReader, SnapshotWriter, materialize
+
+
+# -- VARIABLES --
+
+merkleFileName = "registry.merkle"
+
+merkleFormat = "registry-merkle"
+merkleVersion = 1
+
+# how far the tree follows the JSON of each file; below these paths values are leaves.
+# Objects listed here get one child per key, lists one child per item, keyed by `keyedLists`.
+expandedPaths = {
+    ("chain",),
+    ("chain", "apis"),
+    ("chain", "peers"),
+    ("assetlist",),
+    ("versions",),
+    ("ibc",),
+}
+
+
+def channelKey(channel):
+    return "/".join(
+        channel.get(side, {}).get("port_id", "") + "/" + channel.get(side, {}).get("channel_id", "")
+        for side in ("chain_1", "chain_2")
+    )
+
+
+keyedLists = {
+    ("chain", "apis", "*"): lambda endpoint: endpoint.get("address"),
+    ("chain", "peers", "*"): lambda peer: str(peer.get("id")) + "@" + str(peer.get("address")),
+    ("chain", "explorers"): lambda explorer: explorer.get("url"),
+    ("assetlist", "assets"): lambda asset: asset.get("base"),
+    ("versions", "versions"): lambda version: version.get("name"),
+    ("ibc", "channels"): channelKey,
+}
+
+# what a keyed item is called in a diff
+itemNames = {
+    ("chain", "apis", "*"): "endpoint",
+    ("chain", "peers", "*"): "peer",
+    ("chain", "explorers"): "explorer",
+    ("assetlist", "assets"): "asset",
+    ("versions", "versions"): "version",
+    ("ibc", "channels"): "channel",
+}
+
+Change = namedtuple('Change', ['kind', 'path', 'old', 'new'])
+
+
+# -- BUILDING --
+
+def hashLeaf(value):
+    return hashlib.sha256(json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def hashChildren(children):
+    digest = hashlib.sha256()
+    for key in sorted(children):
+        digest.update(key.encode("utf-8") + b"\x00" + children[key]["hash"].encode("ascii") + b"\x00")
+    return digest.hexdigest()
+
+
+def interior(children):
+    return {"hash": hashChildren(children), "children": children}
+
+
+def layoutPath(path):
+    # ("chain", "apis", "rpc") -> ("chain", "apis", "*") when only the wildcard form is known
+    if path in expandedPaths or path in keyedLists or len(path) < 2:
+        return path
+    return path[:-1] + ("*",)
+
+
+def buildNode(value, path):
+    layout = layoutPath(path)
+    if isinstance(value, list) and layout in keyedLists:
+        children = {}
+        for item in value:
+            key = str(keyedLists[layout](item) if isinstance(item, dict) else item)
+            # duplicates are kept apart, in file order
+            unique = key
+            while unique in children:
+                unique += "#"
+            children[unique] = {"hash": hashLeaf(item), "value": item}
+        return interior(children)
+    if isinstance(value, dict) and layout in expandedPaths:
+        return interior({key: buildNode(item, path + (key,)) for key, item in value.items()})
+    return {"hash": hashLeaf(value), "value": value}
+
+
+@instrumentation.stage("build_merkle")
+def buildTree(registry):
+    # chains/<chain_name>/<chain|assetlist|versions>/..., ibc/<network_type>/<file name>/...
+    chains = {}
+    for chain in registry.chains:
+        files = {file: buildNode(getattr(chain, file), (file,)) for file in fileToFileName if getattr(chain, file) is not None}
+        chains[chain.chain_name] = interior(files)
+    ibc = {}
+    for connection in registry.ibc:
+        ibc.setdefault(connection.network_type, {})[connection.file_name] = buildNode(connection.data, ("ibc",))
+    return interior({
+        "chains": interior(chains),
+        "ibc": interior({networkType: interior(files) for networkType, files in ibc.items()}),
+    })
+
+
+def writeTree(tree, path):
+    content = SnapshotWriter().finish({"format": merkleFormat, "version": merkleVersion, "tree": tree})
+    with open(path + ".tmp", "wb") as f:
+        f.write(content)
+    os.replace(path + ".tmp", path)
+    return len(content)
+
+
+class MerkleSnapshot(SnapshotReader):
+
+    def __init__(self, path):
+        super().__init__(path)
+        if self.root.get("format") != merkleFormat or self.root.get("version") != merkleVersion:
+            self.close()
+            raise Exception(path + " is not a version " + str(merkleVersion) + " registry Merkle tree")
+        self.tree = self.root["tree"]
+
+
+# -- DIFF --
+
+def nodeValue(node):
+    # the JSON a node stands for; subtrees come back as objects keyed like the tree
+    if "children" in node:
+        return {key: nodeValue(child) for key, child in node["children"].items()}
+    return materialize(node["value"])
+
+
+def diffTrees(old, new, path=()):
+    # yields a Change for every leaf or subtree that was added, removed or changed, visiting
+    # only nodes whose hashes differ
+    if old["hash"] == new["hash"]:
+        return
+    oldChildren = old.get("children")
+    newChildren = new.get("children")
+    if not isinstance(oldChildren, LazyObject) or not isinstance(newChildren, LazyObject):
+        yield Change("changed", path, nodeValue(old), nodeValue(new))
+        return
+    for key in oldChildren:
+        if key not in newChildren:
+            yield Change("removed", path + (key,), nodeValue(oldChildren[key]), None)
+    for key in newChildren:
+        if key not in oldChildren:
+            yield Change("added", path + (key,), None, nodeValue(newChildren[key]))
+        else:
+            yield from diffTrees(oldChildren[key], newChildren[key], path + (key,))
+
+
+def fieldChanges(old, new, prefix=""):
+    # [(dotted field, old, new)] between two versions of a leaf
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return [(prefix, old, new)] if old != new else []
+    changes = []
+    for key in sorted(set(old) | set(new), key=str):
+        changes += fieldChanges(old.get(key), new.get(key), prefix + "." + key if prefix else key)
+    return changes
+
+
+def describe(change):
+    # "osmosis assetlist: asset uion removed", "mainnet osmosis-cosmoshub.json: channel ... tags.status 'ACTIVE' -> 'INACTIVE'"
+    if change.path[:1] == ("chains",):
+        owner = change.path[1:3]
+        jsonPath = change.path[2:]
+    else:
+        # the network type too, as mainnet and testnet IBC files may share a name
+        owner = change.path[1:3]
+        jsonPath = ("ibc",) + change.path[3:]
+    name = "field " + ".".join(jsonPath[1:]) if len(jsonPath) > 1 else "file"
+    for length in (3, 2):
+        if len(jsonPath) == length + 1 and layoutPath(jsonPath[:length]) in itemNames:
+            name = itemNames[layoutPath(jsonPath[:length])] + " " + jsonPath[length]
+    if len(change.path) == 2:
+        name = "chain" if change.path[0] == "chains" else "network type"
+        owner = change.path[1:]
+    text = " ".join(owner) + ": " + name + " " + change.kind
+    if change.kind == "changed":
+        text += ": " + "; ".join((field or "value") + " " + json.dumps(old, ensure_ascii=False) + " -> " + json.dumps(new, ensure_ascii=False) for field, old, new in fieldChanges(change.old, change.new))
+    return text
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build registry Merkle trees and diff them")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    buildParser = subparsers.add_parser("build", help="hash the current registry")
+    buildParser.add_argument("--output", default=None, help="tree path (default: .cache/" + merkleFileName + ")")
+    diffParser = subparsers.add_parser("diff", help="list what changed between two trees")
+    diffParser.add_argument("old", help="the earlier tree")
+    diffParser.add_argument("new", nargs="?", default=None, help="the later tree (default: the current registry)")
+    diffParser.add_argument("--json", action="store_true", help="print changes as JSON lines")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        output = args.output or getCachePath(merkleFileName, chainRegistryRoot)
+        tree = buildTree(loadRegistry(chainRegistryRoot))
+        size = writeTree(tree, output)
+        print("Root " + tree["hash"] + ", wrote " + str(size) + " bytes to " + output)
+    else:
+        newPath = args.new
+        if newPath is None:
+            newPath = getCachePath(merkleFileName + ".current", chainRegistryRoot)
+            writeTree(buildTree(loadRegistry(chainRegistryRoot)), newPath)
+        with MerkleSnapshot(args.old) as old, MerkleSnapshot(newPath) as new, instrumentation.stage("diff_merkle"):
+            changes = 0
+            for change in diffTrees(old.tree, new.tree):
+                changes += 1
+                if args.json:
+                    print(json.dumps(dict(change._asdict(), path=list(change.path)), ensure_ascii=False))
+                else:
+                    print(describe(change))
+        if not args.json:
+            print(str(changes) + " change(s)")
@@ -0,0 +1,429 @@
+# Purpose:
+#   to write the parsed registry into one compact binary snapshot, and read it back through a
+#   memory map, materializing only the records that are accessed; worker processes that open
+#   the same snapshot share a single page-cached copy instead of each parsing the JSON
+#
+# Usage (from the registry root):
+#   python .github/workflows/utility/registry_snapshot.py [--output registry.snap]
+#
+# A snapshot records the size and mtime of every file it was built from; loadSnapshot()
+# rebuilds one that no longer matches the working tree instead of reading stale data.
+#
+# Format (little-endian):
+#   header   magic, version, string count, string offsets, string data, root value
+#   values   one tagged record per distinct value; equal scalars and shared objects are
+#            written once, and containers only hold the offsets of their items
+#   strings  every distinct string (values and keys) once, as offsets into a UTF-8 blob
+# Objects keep their entries in file order plus a key-sorted permutation, so a key lookup is a
+# binary search that decodes only the keys it compares.
+
+
+# -- IMPORTS --
+
+import argparse
+import hashlib
+import mmap
+import os
+import struct
+from collections.abc import Mapping, Sequence
+from functools import cached_property
+
+from chain_registry import Chain, IbcConnection, chainRegistryRoot, fileToFileName, getCachePath, listChainDirectories, listIbcFiles, loadRegistry
+
+
+# -- VARIABLES --
+
+snapshotMagic = b"CRSNAP\x00\x00"
+snapshotVersion = 1
+
+snapshotFileName = "registry.snap"
+
+header = struct.Struct("<8sIIIII")
+u32 = struct.Struct("<I")
+i64 = struct.Struct("<q")
+f64 = struct.Struct("<d")
+
+NULL, FALSE, TRUE, INT, FLOAT, STRING, ARRAY, OBJECT, BIGINT = range(9)
+
+
+# -- WRITING --
+
+class SnapshotWriter:
+
+    def __init__(self):
+        self.data = bytearray(header.size)
+        self.strings = {}
+        # (tag, payload) -> offset of an already written scalar
+        self.scalars = {}
+        # id(container) -> offset; containers referenced twice (e.g. assets in both an
+        # assetlist and the base index) are written once
+        self.containers = {}
+        self.keepAlive = []
+
+    def intern(self, string):
+        if string not in self.strings:
+            self.strings[string] = len(self.strings)
+        return self.strings[string]
+
+    def writeScalar(self, tag, payload=b""):
+        key = (tag, payload)
+        if key not in self.scalars:
+            self.scalars[key] = len(self.data)
+            self.data.append(tag)
+            self.data += payload
+        return self.scalars[key]
+
+    def write(self, value):
+        # returns the offset of value's record, writing its items first
+        if value is None:
+            return self.writeScalar(NULL)
+        if value is True or value is False:
+            return self.writeScalar(TRUE if value else FALSE)
+        if isinstance(value, int):
+            if -2 ** 63 <= value < 2 ** 63:
+                return self.writeScalar(INT, i64.pack(value))
+            return self.writeScalar(BIGINT, u32.pack(self.intern(str(value))))
+        if isinstance(value, float):
+            return self.writeScalar(FLOAT, f64.pack(value))
+        if isinstance(value, str):
+            return self.writeScalar(STRING, u32.pack(self.intern(value)))
+        if id(value) in self.containers:
+            return self.containers[id(value)]
+        if isinstance(value, dict):
+            keys = list(value)
+            entries = [(self.intern(key), self.write(value[key])) for key in keys]
+            order = sorted(range(len(keys)), key=keys.__getitem__)
+            offset = len(self.data)
+            self.data.append(OBJECT)
+            self.data += u32.pack(len(entries))
+            for key, item in entries:
+                self.data += u32.pack(key) + u32.pack(item)
+            for i in order:
+                self.data += u32.pack(i)
+        elif isinstance(value, (list, tuple)):
+            items = [self.write(item) for item in value]
+            offset = len(self.data)
+            self.data.append(ARRAY)
+            self.data += u32.pack(len(items))
+            for item in items:
+                self.data += u32.pack(item)
+        else:
+            raise TypeError("cannot snapshot " + type(value).__name__)
+        self.containers[id(value)] = offset
+        self.keepAlive.append(value)
+        return offset
+
+    def finish(self, root):
+        rootOffset = self.write(root)
+        strings = [string.encode("utf-8") for string in self.strings]
+        stringOffsetsOffset = len(self.data)
+        position = 0
+        for string in strings:
+            self.data += u32.pack(position)
+            position += len(string)
+        self.data += u32.pack(position)
+        stringDataOffset = len(self.data)
+        for string in strings:
+            self.data += string
+        header.pack_into(self.data, 0, snapshotMagic, snapshotVersion, len(strings), stringOffsetsOffset, stringDataOffset, rootOffset)
+        return bytes(self.data)
+
+
+def fileStates(root):
+    # relative path -> [size, mtime_ns] of every file loadRegistry() reads
+    paths = [
+        os.path.join(directory, fileName)
+        for _, _, _, directory in listChainDirectories(root)
+        for fileName in fileToFileName.values()
+    ]
+    paths += [path for _, _, path in listIbcFiles(root)]
+    states = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        states[os.path.relpath(path, root)] = [stat.st_size, stat.st_mtime_ns]
+    return states
+
+
+def snapshotRoot(registry):
+    # the record layout readers rely on; every index is an object keyed for binary search
+    chains = {}
+    assets = {}
+    assetsByBase = {}
+    for chain in registry.chains:
+        chains[chain.chain_name] = {
+            "directory": os.path.relpath(chain.directory, registry.root),
+            "network_type": chain.network_type,
+            "domain": chain.domain,
+            "chain": chain.chain,
+            "assetlist": chain.assetlist,
+            "versions": chain.versions,
+        }
+        for asset in (chain.assetlist or {}).get("assets", []):
+            if "base" in asset:
+                assets.setdefault(chain.chain_name, {})[asset["base"]] = asset
+                assetsByBase.setdefault(asset["base"], []).append([chain.chain_name, asset])
+    return {
+        "chains": chains,
+        "chainsById": {chainId: chain.chain_name for chainId, chain in registry.chainsById.items()},
+        "chainsByPrefix": {prefix: [chain.chain_name for chain in prefixChains] for prefix, prefixChains in registry.chainsByPrefix.items()},
+        "assets": assets,
+        "assetsByBase": assetsByBase,
+        "digests": registry.digests,
+        "errors": registry.errors,
+        "files": fileStates(registry.root),
+        "ibc": [
+            {"file_name": connection.file_name, "path": os.path.relpath(connection.path, registry.root), "network_type": connection.network_type, "data": connection.data}
+            for connection in registry.ibc
+        ],
+    }
+
+
+def writeSnapshot(registry, path=None):
+    path = path or getCachePath(snapshotFileName, registry.root)
+    content = SnapshotWriter().finish(snapshotRoot(registry))
+    with open(path + ".tmp", "wb") as f:
+        f.write(content)
+    # replacing (not rewriting) the file keeps readers that still map the old one valid
+    os.replace(path + ".tmp", path)
+    return path, len(content)
+
+
+# -- READING --
+
+def materialize(value):
+    # a plain dict/list copy of a lazy value
+    if isinstance(value, LazyObject):
+        return {key: materialize(item) for key, item in value.items()}
+    if isinstance(value, LazyArray):
+        return [materialize(item) for item in value]
+    return value
+
+
+class LazyObject(Mapping):
+
+    def __init__(self, snapshot, offset):
+        self.snapshot = snapshot
+        self.offset = offset
+        self.count = u32.unpack_from(snapshot.buffer, offset + 1)[0]
+
+    def entry(self, i):
+        # (key string index, value offset) of the i-th entry in file order
+        return struct.unpack_from("<II", self.snapshot.buffer, self.offset + 5 + 8 * i)
+
+    def __getitem__(self, key):
+        buffer = self.snapshot.buffer
+        order = self.offset + 5 + 8 * self.count
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            i = u32.unpack_from(buffer, order + 4 * middle)[0]
+            keyIndex, valueOffset = self.entry(i)
+            candidate = self.snapshot.string(keyIndex)
+            if candidate == key:
+                return self.snapshot.value(valueOffset)
+            if candidate < key:
+                low = middle + 1
+            else:
+                high = middle
+        raise KeyError(key)
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self.snapshot.string(self.entry(i)[0])
+
+    def __len__(self):
+        return self.count
+
+    def __repr__(self):
+        return "LazyObject(" + str(self.count) + " keys)"
+
+
+class LazyArray(Sequence):
+
+    def __init__(self, snapshot, offset):
+        self.snapshot = snapshot
+        self.offset = offset
+        self.count = u32.unpack_from(snapshot.buffer, offset + 1)[0]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(self.count))]
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        return self.snapshot.value(u32.unpack_from(self.snapshot.buffer, self.offset + 5 + 4 * i)[0])
+
+    def __len__(self):
+        return self.count
+
+    def __repr__(self):
+        return "LazyArray(" + str(self.count) + " items)"
+
+
+class SnapshotReader:
+    # any value written by SnapshotWriter, read lazily through a memory map
+
+    def __init__(self, path):
+        self.path = path
+        with open(self.path, "rb") as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.stringCount, self.stringOffsetsOffset, self.stringDataOffset, rootOffset = header.unpack_from(self.buffer, 0)
+        if magic != snapshotMagic or version != snapshotVersion:
+            self.buffer.close()
+            raise Exception(self.path + " is not a version " + str(snapshotVersion) + " snapshot")
+        # only strings that were actually read are decoded, and each of them once
+        self.strings = {}
+        self.root = self.value(rootOffset)
+
+    def close(self):
+        self.buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def string(self, index):
+        if index not in self.strings:
+            start, end = struct.unpack_from("<II", self.buffer, self.stringOffsetsOffset + 4 * index)
+            self.strings[index] = self.buffer[self.stringDataOffset + start:self.stringDataOffset + end].decode("utf-8")
+        return self.strings[index]
+
+    def value(self, offset):
+        tag = self.buffer[offset]
+        if tag == OBJECT:
+            return LazyObject(self, offset)
+        if tag == ARRAY:
+            return LazyArray(self, offset)
+        if tag == STRING:
+            return self.string(u32.unpack_from(self.buffer, offset + 1)[0])
+        if tag == INT:
+            return i64.unpack_from(self.buffer, offset + 1)[0]
+        if tag == NULL:
+            return None
+        if tag == TRUE:
+            return True
+        if tag == FALSE:
+            return False
+        if tag == FLOAT:
+            return f64.unpack_from(self.buffer, offset + 1)[0]
+        if tag == BIGINT:
+            return int(self.string(u32.unpack_from(self.buffer, offset + 1)[0]))
+        raise Exception("corrupt snapshot: unknown tag " + str(tag) + " at " + str(offset))
+
+
+class RegistrySnapshot(SnapshotReader):
+
+    def __init__(self, path=None, root=chainRegistryRoot):
+        super().__init__(path or getCachePath(snapshotFileName, root))
+        # paths are stored relative to the registry root and resolved against it, so they are
+        # absolute as in RegistryIndex (self.root is the snapshot's root record)
+        self.registryRoot = os.path.abspath(root)
+        # relative path -> sha256 / parse error, as in RegistryIndex
+        self.digests = self.root["digests"]
+        self.errors = self.root["errors"]
+
+    # the attributes and lookups mirror RegistryIndex, returning lazy objects instead of parsed
+    # JSON
+
+    @cached_property
+    def chains(self):
+        return [self.getChain(chainName) for chainName in self.root["chains"]]
+
+    @cached_property
+    def ibc(self):
+        return self.getIbcConnections()
+
+    @cached_property
+    def ibcByChainPair(self):
+        pairs = {}
+        for connection in self.ibc:
+            data = connection.data or {}
+            chain1 = data.get("chain_1", {}).get("chain_name")
+            chain2 = data.get("chain_2", {}).get("chain_name")
+            if chain1 and chain2:
+                pairs[tuple(sorted((chain1, chain2)))] = connection
+        return pairs
+
+    def getChain(self, chainName):
+        entry = self.root["chains"].get(chainName)
+        if entry is None:
+            return None
+        directory = os.path.join(self.registryRoot, entry["directory"])
+        return Chain(chainName, directory, entry["network_type"], entry["domain"], entry["chain"], entry["assetlist"], entry["versions"])
+
+    def getChainById(self, chainId):
+        chainName = self.root["chainsById"].get(chainId)
+        return self.getChain(chainName) if chainName is not None else None
+
+    def getChainsByPrefix(self, prefix):
+        return [self.getChain(chainName) for chainName in self.root["chainsByPrefix"].get(prefix, [])]
+
+    def getAsset(self, chainName, baseDenom):
+        return self.root["assets"].get(chainName, {}).get(baseDenom)
+
+    def getAssetsByBase(self, baseDenom):
+        return [(self.getChain(chainName), asset) for chainName, asset in self.root["assetsByBase"].get(baseDenom, [])]
+
+    def getIbcConnection(self, chainName1, chainName2):
+        return self.ibcByChainPair.get(tuple(sorted((chainName1, chainName2))))
+
+    def getChains(self, network_types=None, domains=None):
+        return [
+            chain for chain in self.chains
+            if (network_types is None or chain.network_type in network_types)
+            and (domains is None or chain.domain in domains)
+        ]
+
+    def getIbcConnections(self):
+        return [
+            IbcConnection(entry["file_name"], os.path.join(self.registryRoot, entry["path"]), entry["network_type"], entry["data"])
+            for entry in self.root["ibc"]
+        ]
+
+    def changedFiles(self, root=chainRegistryRoot):
+        # relative paths added, removed or modified in `root` since the snapshot was written;
+        # files whose size or mtime changed are hashed, so a fresh checkout of the same content
+        # still matches
+        if "files" not in self.root:
+            return ["(snapshot without file states)"]
+        recorded = self.root["files"]
+        current = fileStates(os.path.abspath(root))
+        changed = [path for path in recorded if path not in current]
+        for path, state in current.items():
+            if path not in recorded:
+                changed.append(path)
+            elif list(recorded[path]) != state:
+                with open(os.path.join(root, path), "rb") as f:
+                    if hashlib.sha256(f.read()).hexdigest() != self.digests.get(path):
+                        changed.append(path)
+        return sorted(changed)
+
+
+def loadSnapshot(path=None, root=chainRegistryRoot):
+    # a RegistrySnapshot that matches the working tree; a missing or out-of-date snapshot is
+    # rewritten from the JSON files first
+    root = os.path.abspath(root)
+    path = path or getCachePath(snapshotFileName, root)
+    if os.path.exists(path):
+        snapshot = RegistrySnapshot(path, root)
+        changed = snapshot.changedFiles(root)
+        if not changed:
+            return snapshot
+        snapshot.close()
+        print(path + " is out of date (" + str(len(changed)) + " file(s) changed, e.g. " + changed[0] + "), rebuilding it")
+    writeSnapshot(loadRegistry(root), path)
+    return RegistrySnapshot(path, root)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a memory-mappable binary snapshot of the chain registry")
+    parser.add_argument("--output", default=None, help="snapshot path (default: .cache/" + snapshotFileName + ")")
+    args = parser.parse_args()
+    path, size = writeSnapshot(loadRegistry(chainRegistryRoot), args.output)
+    print("Wrote " + str(size) + " bytes to " + path)
@@ -0,0 +1,402 @@
+# Purpose:
+#   to export the whole registry (chains, assets, denom units, endpoints, providers, IBC channels
+#   and versions) into one indexed SQLite database that services can open read-only, instead of
+#   parsing every JSON file at startup; an existing database is updated in place, parsing and
+#   rewriting only the files of chain directories that changed since it was built
+#
+#   rows are keyed by the file they come from, so a chain, asset or provider defined by more than
+#   one file is kept once per file and reported as a collision rather than silently replaced
+#
+# Usage (from the registry root):
+#   python .github/workflows/utility/registry_sqlite.py [--output registry.sqlite] [--full]
+#
+# Reading:
+#   sqlite3.connect("file:registry.sqlite?mode=ro", uri=True)
+
+
+# -- IMPORTS --
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from chain_registry import (
+    Chain, IbcConnection, chainRegistryRoot, fileToFileName, getCachePath, listChainDirectories,
+    listIbcFiles, readFileWithDigest,
+)
+
+
+# -- VARIABLES --
+
+# bump when the schema or the row mapping changes; a database of another version is rebuilt
+schemaVersion = 2
+
+databaseFileName = "registry.sqlite"
+
+providerAllowlistPath = os.path.join("_providers", "provider-allowlist.json")
+
+# every row records the file (path relative to the registry root) it was built from, so a
+# changed file is replaced by deleting its rows and inserting them again
+schema = """
+CREATE TABLE files (
+    source TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE chains (
+    chain_name TEXT NOT NULL,
+    chain_id TEXT,
+    network_type TEXT,
+    domain TEXT,
+    status TEXT,
+    pretty_name TEXT,
+    bech32_prefix TEXT,
+    slip44 INTEGER,
+    daemon_name TEXT,
+    directory TEXT,
+    json TEXT NOT NULL,
+    source TEXT NOT NULL,
+    PRIMARY KEY (chain_name, source)
+);
+CREATE TABLE assets (
+    chain_name TEXT NOT NULL,
+    base TEXT NOT NULL,
+    display TEXT,
+    symbol TEXT,
+    name TEXT,
+    type_asset TEXT,
+    coingecko_id TEXT,
+    json TEXT NOT NULL,
+    source TEXT NOT NULL,
+    PRIMARY KEY (chain_name, base, source)
+);
+CREATE TABLE denom_units (
+    chain_name TEXT NOT NULL,
+    base TEXT NOT NULL,
+    denom TEXT NOT NULL,
+    exponent INTEGER,
+    aliases TEXT,
+    source TEXT NOT NULL
+);
+CREATE TABLE endpoints (
+    chain_name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    address TEXT NOT NULL,
+    provider TEXT,
+    archive INTEGER,
+    source TEXT NOT NULL
+);
+CREATE TABLE providers (
+    name TEXT NOT NULL,
+    manifest_url TEXT,
+    status TEXT,
+    json TEXT NOT NULL,
+    source TEXT NOT NULL,
+    PRIMARY KEY (name, source)
+);
+CREATE TABLE ibc_channels (
+    network_type TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    chain_1 TEXT NOT NULL,
+    chain_1_connection_id TEXT,
+    chain_1_port_id TEXT,
+    chain_1_channel_id TEXT,
+    chain_2 TEXT NOT NULL,
+    chain_2_connection_id TEXT,
+    chain_2_port_id TEXT,
+    chain_2_channel_id TEXT,
+    ordering TEXT,
+    version TEXT,
+    status TEXT,
+    preferred INTEGER,
+    source TEXT NOT NULL
+);
+CREATE TABLE versions (
+    chain_name TEXT NOT NULL,
+    name TEXT,
+    tag TEXT,
+    recommended_version TEXT,
+    height INTEGER,
+    json TEXT NOT NULL,
+    source TEXT NOT NULL
+);
+CREATE INDEX chains_chain_name ON chains (chain_name);
+CREATE INDEX chains_chain_id ON chains (chain_id);
+CREATE INDEX chains_bech32_prefix ON chains (bech32_prefix);
+CREATE INDEX chains_source ON chains (source);
+CREATE INDEX assets_base ON assets (base);
+CREATE INDEX assets_source ON assets (source);
+CREATE INDEX denom_units_denom ON denom_units (denom);
+CREATE INDEX denom_units_asset ON denom_units (chain_name, base);
+CREATE INDEX denom_units_source ON denom_units (source);
+CREATE INDEX endpoints_chain ON endpoints (chain_name, type);
+CREATE INDEX endpoints_provider ON endpoints (provider);
+CREATE INDEX endpoints_source ON endpoints (source);
+CREATE INDEX providers_name ON providers (name);
+CREATE INDEX providers_source ON providers (source);
+CREATE INDEX ibc_channels_chain_1 ON ibc_channels (chain_1, chain_1_channel_id);
+CREATE INDEX ibc_channels_chain_2 ON ibc_channels (chain_2, chain_2_channel_id);
+CREATE INDEX ibc_channels_source ON ibc_channels (source);
+CREATE INDEX versions_chain ON versions (chain_name);
+CREATE INDEX versions_source ON versions (source);
+"""
+
+tables = ["chains", "assets", "denom_units", "endpoints", "providers", "ibc_channels", "versions"]
+
+# table -> the columns that should identify one row across the whole registry
+keyColumns = {
+    "chains": ("chain_name",),
+    "assets": ("chain_name", "base"),
+    "providers": ("name",),
+}
+
+
+# -- ROWS --
+
+def dumps(data):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+
+def chainRows(chain, source):
+    data = chain.chain
+    yield "chains", (
+        data.get("chain_name", chain.chain_name), data.get("chain_id"), chain.network_type, chain.domain,
+        data.get("status"), data.get("pretty_name"), data.get("bech32_prefix"), data.get("slip44"),
+        data.get("daemon_name"), os.path.basename(chain.directory), dumps(data), source,
+    )
+    for endpointType, endpoints in data.get("apis", {}).items():
+        for endpoint in endpoints:
+            if "address" not in endpoint:
+                continue
+            archive = endpoint.get("archive")
+            yield "endpoints", (
+                chain.chain_name, endpointType, endpoint["address"], endpoint.get("provider"),
+                None if archive is None else int(bool(archive)), source,
+            )
+
+
+def assetlistRows(chain, source):
+    chainName = chain.assetlist.get("chain_name", chain.chain_name)
+    for asset in chain.assetlist.get("assets", []):
+        if "base" not in asset:
+            continue
+        yield "assets", (
+            chainName, asset["base"], asset.get("display"), asset.get("symbol"), asset.get("name"),
+            asset.get("type_asset"), asset.get("coingecko_id"), dumps(asset), source,
+        )
+        for unit in asset.get("denom_units", []):
+            if "denom" not in unit:
+                continue
+            yield "denom_units", (
+                chainName, asset["base"], unit["denom"], unit.get("exponent"),
+                dumps(unit["aliases"]) if "aliases" in unit else None, source,
+            )
+
+
+def versionsRows(chain, source):
+    chainName = chain.versions.get("chain_name", chain.chain_name)
+    for version in chain.versions.get("versions", []):
+        yield "versions", (
+            chainName, version.get("name"), version.get("tag"), version.get("recommended_version"),
+            version.get("height"), dumps(version), source,
+        )
+
+
+def ibcRows(connection, source):
+    data = connection.data
+    chain1 = data.get("chain_1", {})
+    chain2 = data.get("chain_2", {})
+    for channel in data.get("channels", []):
+        tags = channel.get("tags", {})
+        preferred = tags.get("preferred")
+        yield "ibc_channels", (
+            connection.network_type, connection.file_name,
+            chain1.get("chain_name"), chain1.get("connection_id"), channel.get("chain_1", {}).get("port_id"), channel.get("chain_1", {}).get("channel_id"),
+            chain2.get("chain_name"), chain2.get("connection_id"), channel.get("chain_2", {}).get("port_id"), channel.get("chain_2", {}).get("channel_id"),
+            channel.get("ordering"), channel.get("version"), tags.get("status"),
+            None if preferred is None else int(bool(preferred)), source,
+        )
+
+
+def providerRows(data, source):
+    for provider in data.get("providers", []):
+        if "name" not in provider:
+            continue
+        yield "providers", (provider["name"], provider.get("manifest_url"), provider.get("status"), dumps(provider), source)
+
+
+def parseJson(content):
+    try:
+        return json.loads(content)
+    except ValueError:
+        return None
+
+
+def collectSources(root, previous):
+    # source (relative path) -> (sha256, generator of (table, row), or None when unchanged) for
+    # every file in the registry; every file is hashed, but only the files of chain directories
+    # with a digest differing from `previous` (source -> sha256) are parsed. A chain directory is
+    # parsed as a whole, since the rows of one file can depend on another (e.g. the chain name).
+    chainDirectories = list(listChainDirectories(root))
+    ibcFiles = list(listIbcFiles(root))
+    paths = [
+        os.path.join(directory, fileName)
+        for _, _, _, directory in chainDirectories
+        for fileName in fileToFileName.values()
+    ]
+    paths = [path for path in paths if os.path.exists(path)]
+    paths += [path for _, _, path in ibcFiles]
+    paths.append(os.path.join(root, providerAllowlistPath))
+    with ThreadPoolExecutor() as executor:
+        read = dict(zip(paths, executor.map(readFileWithDigest, paths)))
+
+    def relative(path):
+        return os.path.relpath(path, root)
+
+    def changed(path):
+        content, _, digest = read.get(path, (None, None, None))
+        return content is not None and previous.get(relative(path)) != digest
+
+    sources = {}
+
+    def add(path, rows):
+        # parsed files without data (unreadable or invalid JSON) are left out, as in loadRegistry
+        source = relative(path)
+        content, _, digest = read.get(path, (None, None, None))
+        if content is not None and rows is None and source in previous:
+            sources[source] = (digest, None)
+        elif content is not None and rows is not None:
+            sources[source] = (digest, rows(source))
+
+    for networkType, domain, name, directory in chainDirectories:
+        files = {file: os.path.join(directory, fileName) for file, fileName in fileToFileName.items()}
+        if not any(changed(path) for path in files.values()):
+            for path in files.values():
+                add(path, None)
+            continue
+        data = {file: parseJson(read[path][0]) if path in read else None for file, path in files.items()}
+        chainName = (data["chain"] or data["assetlist"] or {}).get("chain_name", name)
+        chain = Chain(chainName, directory, networkType, domain, data["chain"], data["assetlist"], data["versions"])
+        for file, rows in (("chain", chainRows), ("assetlist", assetlistRows), ("versions", versionsRows)):
+            if data[file] is not None:
+                add(files[file], lambda source, rows=rows: rows(chain, source))
+    for networkType, fileName, path in ibcFiles:
+        if not changed(path):
+            add(path, None)
+            continue
+        connection = IbcConnection(fileName, path, networkType, parseJson(read[path][0]))
+        if connection.data is not None:
+            add(path, lambda source, connection=connection: ibcRows(connection, source))
+    path = os.path.join(root, providerAllowlistPath)
+    if not changed(path):
+        add(path, None)
+    else:
+        data = parseJson(read[path][0])
+        if data is not None:
+            add(path, lambda source: providerRows(data, source))
+    return sources
+
+
+# -- DATABASE --
+
+def insertRows(connection, rows):
+    byTable = {}
+    for table, row in rows:
+        byTable.setdefault(table, []).append(row)
+    for table, tableRows in byTable.items():
+        placeholders = ", ".join("?" * len(tableRows[0]))
+        # a file can repeat a key (e.g. the same base twice); the last occurrence wins. Keys are
+        # per source, so a row of another file is never replaced
+        connection.executemany("INSERT OR REPLACE INTO " + table + " VALUES (" + placeholders + ")", tableRows)
+
+
+def findCollisions(connection):
+    # returns [(table, key, [sources])] for the keys defined by more than one file
+    collisions = []
+    for table, columns in keyColumns.items():
+        names = ", ".join(columns)
+        query = (
+            "SELECT " + names + ", group_concat(source, char(10)) FROM " + table
+            + " GROUP BY " + names + " HAVING count(*) > 1 ORDER BY " + names
+        )
+        for row in connection.execute(query):
+            collisions.append((table, tuple(row[:-1]), sorted(row[-1].split("\n"))))
+    return collisions
+
+
+def openDatabase(path):
+    # returns (connection, whether the database is usable for an incremental update)
+    if os.path.exists(path):
+        connection = sqlite3.connect(path)
+        try:
+            if connection.execute("PRAGMA user_version").fetchone()[0] == schemaVersion:
+                return connection, True
+        except sqlite3.DatabaseError:
+            pass
+        connection.close()
+    return None, False
+
+
+def buildDatabase(path, sources):
+    # a full build goes to a temporary file first, so readers never see a half-written database
+    temporaryPath = path + ".tmp"
+    if os.path.exists(temporaryPath):
+        os.remove(temporaryPath)
+    connection = sqlite3.connect(temporaryPath)
+    with connection:
+        connection.executescript(schema)
+        connection.execute("PRAGMA user_version = " + str(schemaVersion))
+        for source, (digest, rows) in sorted(sources.items()):
+            insertRows(connection, rows)
+            connection.execute("INSERT INTO files VALUES (?, ?)", (source, digest))
+    connection.execute("ANALYZE")
+    collisions = findCollisions(connection)
+    connection.close()
+    os.replace(temporaryPath, path)
+    return len(sources), collisions
+
+
+def updateDatabase(connection, sources):
+    # replaces the rows of added, changed and removed files in a single transaction
+    previous = dict(connection.execute("SELECT source, sha256 FROM files"))
+    changed = [source for source, (_, rows) in sources.items() if rows is not None]
+    removed = [source for source in previous if source not in sources]
+    with connection:
+        for source in changed + removed:
+            for table in tables:
+                connection.execute("DELETE FROM " + table + " WHERE source = ?", (source,))
+            connection.execute("DELETE FROM files WHERE source = ?", (source,))
+        for source in changed:
+            digest, rows = sources[source]
+            insertRows(connection, rows)
+            connection.execute("INSERT INTO files VALUES (?, ?)", (source, digest))
+    collisions = findCollisions(connection)
+    connection.close()
+    return len(changed) + len(removed), collisions
+
+
+def exportRegistry(root=chainRegistryRoot, path=None, full=False):
+    # returns (number of files written, [(table, key, [sources])] of the keys defined by more than
+    # one file, whether the database was rebuilt from scratch)
+    root = os.path.abspath(root)
+    path = path or getCachePath(databaseFileName, root)
+    connection, incremental = (None, False) if full else openDatabase(path)
+    previous = dict(connection.execute("SELECT source, sha256 FROM files")) if incremental else {}
+    sources = collectSources(root, previous)
+    if incremental:
+        return updateDatabase(connection, sources) + (False,)
+    return buildDatabase(path, sources) + (True,)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the chain registry into an indexed SQLite database")
+    parser.add_argument("--output", default=None, help="database path (default: .cache/" + databaseFileName + ")")
+    parser.add_argument("--full", action="store_true", help="rebuild from scratch instead of updating changed files")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    count, collisions, rebuilt = exportRegistry(path=args.output, full=args.full)
+    for table, key, sources in collisions:
+        print("Key collision in " + table + ": " + "/".join(key) + " is defined by " + ", ".join(sources))
+    print(("Built database from " if rebuilt else "Updated rows of ") + str(count) + " file(s) in " + str(round(time.perf_counter() - start, 2)) + "s")
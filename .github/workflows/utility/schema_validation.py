@@ -0,0 +1,166 @@
+# Purpose:
+#   to validate every registry file that declares a "$schema" (chain, assetlist, versions, _IBC,
+#   memo keys, provider files) against that schema, in a process pool, reporting every violation
+#   of every failing file at once; each schema is compiled to Python code once and the generated
+#   code is cached by schema content, so workers only load it. The compiled code stops at the
+#   first violation, so a failing file is validated again with jsonschema to collect them all
+#
+# Usage (from the registry root):
+#   python .github/workflows/utility/schema_validation.py [--workers 8]
+
+
+# -- IMPORTS --
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import fastjsonschema
+import jsonschema
+from fastjsonschema.ref_resolver import RefResolver
+
+import instrumentation
+from chain_registry import cacheDirectoryName, chainRegistryRoot, getCachePath, readJsonFile
+
+
+# -- VARIABLES --
+
+schemaCacheDirectoryName = "schemas"
+
+# directories never scanned for registry files; _template holds placeholders, not data
+skippedDirectories = {".git", ".github", "node_modules", cacheDirectoryName, ".pytest_cache", ".mypy_cache", ".vs", "_template"}
+
+# files validated per task; large enough that pool overhead does not dominate
+chunkSize = 64
+
+
+# -- COMPILATION --
+
+def listSchemas(root):
+    # schema file name -> path, for the *.schema.json files at the registry root
+    return {
+        fileName: os.path.join(root, fileName)
+        for fileName in sorted(os.listdir(root))
+        if fileName.endswith(".schema.json")
+    }
+
+
+def compileSchema(path, root):
+    # returns the path of the generated validator module, generating it only when the schema
+    # content has no cached code yet
+    with open(path, "rb") as f:
+        content = f.read()
+    digest = hashlib.sha256(content + fastjsonschema.VERSION.encode("utf-8")).hexdigest()
+    codePath = os.path.join(getCachePath(schemaCacheDirectoryName, root), os.path.basename(path) + "-" + digest[:16] + ".py")
+    if not os.path.exists(codePath):
+        schema = json.loads(content)
+        # the generated functions are named after the schema's $id; alias the entry point
+        code = fastjsonschema.compile_to_code(schema) + "\n\nvalidate = " + RefResolver.from_schema(schema).get_scope_name() + "\n"
+        os.makedirs(os.path.dirname(codePath), exist_ok=True)
+        with open(codePath + ".tmp", "w", encoding="utf-8") as f:
+            f.write(code)
+        os.replace(codePath + ".tmp", codePath)
+    return codePath
+
+
+def loadValidator(codePath):
+    # validate(data) raises on the first violation in the file
+    namespace = {}
+    with open(codePath, encoding="utf-8") as f:
+        exec(compile(f.read(), codePath, "exec"), namespace)
+    return namespace["validate"]
+
+
+# -- VALIDATION --
+
+validators = {}
+
+# schema file name -> path, and the jsonschema validators built from them on first failure
+schemaPaths = {}
+collectingValidators = {}
+
+
+def initWorker(codePaths, paths):
+    for schemaFileName, codePath in codePaths.items():
+        validators[schemaFileName] = loadValidator(codePath)
+    schemaPaths.update(paths)
+
+
+def collectErrors(schemaFileName, data):
+    # returns every violation of `data`, as "data.path: message" in document order
+    if schemaFileName not in collectingValidators:
+        with open(schemaPaths[schemaFileName], "rb") as f:
+            schema = json.loads(f.read())
+        collectingValidators[schemaFileName] = jsonschema.validators.validator_for(schema)(schema)
+    errors = sorted(collectingValidators[schemaFileName].iter_errors(data), key=lambda error: list(map(str, error.absolute_path)))
+    return [error.json_path.replace("$", "data", 1) + ": " + error.message for error in errors]
+
+
+def validateFiles(paths):
+    # returns (number of files validated, [(path, error)] with every violation of the files among
+    # `paths` that fail their schema); files that do not declare "$schema" (package.json) are
+    # not registry data and are skipped
+    validated = 0
+    errors = []
+    for path in paths:
+        data, error = readJsonFile(path)
+        if error:
+            errors.append((path, "could not be parsed: " + error))
+            continue
+        if not isinstance(data, dict) or data.get("$schema") is None:
+            continue
+        validated += 1
+        if not isinstance(data["$schema"], str):
+            errors.append((path, "\"$schema\" is not a string"))
+            continue
+        schemaFileName = os.path.basename(data["$schema"])
+        if schemaFileName not in validators:
+            errors.append((path, "unknown schema " + data["$schema"]))
+            continue
+        try:
+            validators[schemaFileName](data)
+        except fastjsonschema.JsonSchemaValueException as e:
+            # both libraries implement the same drafts; should they ever disagree, the first
+            # violation found is still reported
+            errors += [(path, message) for message in collectErrors(schemaFileName, data) or [e.message]]
+    return validated, errors
+
+
+def listRegistryFiles(root):
+    for directory, directoryNames, fileNames in os.walk(root):
+        directoryNames[:] = sorted(name for name in directoryNames if name not in skippedDirectories)
+        for fileName in sorted(fileNames):
+            if fileName.endswith(".json") and not fileName.endswith(".schema.json"):
+                yield os.path.join(directory, fileName)
+
+
+@instrumentation.stage("validate_schemas")
+def validateRegistry(root=chainRegistryRoot, workers=None):
+    # returns (number of files validated, [(relative path, error)])
+    with instrumentation.stage("compile_schemas"):
+        schemas = listSchemas(root)
+        codePaths = {fileName: compileSchema(path, root) for fileName, path in schemas.items()}
+    paths = list(listRegistryFiles(root))
+    chunks = [paths[i:i + chunkSize] for i in range(0, len(paths), chunkSize)]
+    validated = 0
+    errors = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=initWorker, initargs=(codePaths, schemas)) as executor:
+        for chunkValidated, chunkErrors in executor.map(validateFiles, chunks):
+            validated += chunkValidated
+            errors += chunkErrors
+    instrumentation.count("files_validated", validated)
+    return validated, [(os.path.relpath(path, root), error) for path, error in errors]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validate every registry file against the schema it declares")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    args = parser.parse_args()
+    count, errors = validateRegistry(workers=args.workers)
+    for path, error in errors:
+        print("[FAILED] " + path + ": " + error)
+    print("Validated " + str(count) + " files, " + str(len(errors)) + " failed")
+    sys.exit(1 if errors else 0)
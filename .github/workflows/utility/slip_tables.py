@@ -0,0 +1,236 @@
+# Purpose:
+#   to keep a versioned snapshot of the SLIP-0044 (coin types) and SLIP-0173 (bech32 prefixes)
+#   tables next to this script, committed with the registry, so validation starts from the
+#   parsed index without any network access; the snapshot is refreshed with a conditional
+#   (ETag/If-Modified-Since) GET when asked to, or when this checkout last checked it more
+#   than maxAgeDays ago, and a failed refresh falls back to the committed snapshot. Without a
+#   snapshot and without network access, SLIPTablesUnavailable is raised.
+#
+# Usage (from the registry root, then commit .github/workflows/utility/slip_tables.json):
+#   python .github/workflows/utility/slip_tables.py
+
+import argparse
+import hashlib
+import http.client
+import json
+import os
+import time
+import urllib.error
+import urllib.request
+
+import instrumentation
+from chain_registry import chainRegistryRoot, getCachePath
+
+snapshotVersion = 2
+snapshotPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), "slip_tables.json")
+
+# when the tables were last checked, and the validators to send with the next request;
+# local to each checkout, so the committed snapshot only changes when the tables do
+refreshStateFileName = "slip_tables_refresh.json"
+
+# a snapshot this checkout has not checked for this long is refreshed before use; a checkout
+# that never refreshed (CI, a fresh clone) uses the committed snapshot as it is
+maxAgeDays = 30
+
+defaultBaseURL = "https://raw.githubusercontent.com/satoshilabs/slips/master"
+# point this at a local stand-in server to refresh without GitHub; tables fetched from
+# anywhere else are used for that run only and never written to the snapshot
+slipBaseURL = os.environ.get("SLIP_BASE_URL", defaultBaseURL)
+slip173FileName = "slip-0173.md"
+slip44FileName = "slip-0044.md"
+
+# what a failed refresh can raise: no network, an HTTP error, a cut-off response, or content
+# that does not parse as a SLIP table
+refreshErrors = (OSError, ValueError, http.client.HTTPException)
+
+
+class SLIPTablesUnavailable(Exception):
+    pass
+
+
+# -- PARSING --
+
+def parseSLIP173(lines):
+    websites = {}
+    mainnetPrefixes = {}
+    testnetPrefixes = {}
+    lines = [line for line in lines if len(line) > 2 and line[0] == "|" and line[2] == "["]
+    if not lines:
+        raise ValueError("no SLIP-0173 entries recorded")
+    for line in lines:
+        pretty = line[3:line.find("]")]
+        website = line[line.find("(")+1:line.find(")")]
+        websites[pretty] = website
+        secondPipe = line.find("|", 1)
+        thirdPipe = line.find("|", secondPipe + 1)
+        mainnetArea = line[secondPipe:thirdPipe]
+        firstQuote = mainnetArea.find("`")
+        if(firstQuote > 0):
+            secondQuote = mainnetArea.find("`", firstQuote + 1)
+            if(secondQuote > 0):
+                mainnetPrefixes[pretty] = mainnetArea[firstQuote + 1:secondQuote]
+            else:
+                print("Mainnet Bech32 Prefix undefined - missing second quote")
+        else:
+            print("Mainnet Bech32 Prefix undefined")
+        fourthPipe = line.find("|", thirdPipe + 1)
+        testnetArea = line[thirdPipe:fourthPipe]
+        firstQuote = testnetArea.find("`")
+        if(firstQuote > 0):
+            secondQuote = testnetArea.find("`", firstQuote + 1)
+            if(secondQuote > 0):
+                testnetPrefixes[pretty] = testnetArea[firstQuote + 1:secondQuote]
+            else:
+                print("Testnet Bech32 Prefix undefined - missing second quote")
+    return {
+        "websites": websites,
+        "mainnet_prefixes": mainnetPrefixes,
+        "testnet_prefixes": testnetPrefixes,
+        "names_by_mainnet_prefix": {prefix: name for name, prefix in mainnetPrefixes.items()},
+        "names_by_testnet_prefix": {prefix: name for name, prefix in testnetPrefixes.items()},
+    }
+
+
+def parseSLIP44(lines):
+    websites = {}
+    coinTypesByNum = {}
+    coinTypesByName = {}
+    lines = [
+        line for line in lines
+        if len(line) > 6 and line[0] != "-" and line[0] != "C" and "|" in line[5:12]
+    ]
+    if not lines:
+        raise ValueError("no SLIP-0044 entries recorded")
+    for line in lines:
+        coinNumber = int(line[0:line.find(" ")])
+        if(line.find("[") > 0):
+            pretty = line[line.find("[")+1:line.find("]")]
+            website = line[line.find("(")+1:line.find(")")]
+            websites[pretty] = website
+        else:
+            firstPipe = line.find("|")
+            secondPipe = line.find("|", firstPipe + 1)
+            thirdPipe = line.find("|", secondPipe + 1)
+            pretty = line[thirdPipe+2:len(line)-1]
+        coinTypesByNum[coinNumber] = pretty
+        coinTypesByName[pretty] = coinNumber
+    return {
+        "websites": websites,
+        # JSON object keys are strings; loadSLIPTables() restores the integers
+        "coin_types_by_num": {str(num): name for num, name in coinTypesByNum.items()},
+        "coin_types_by_name": coinTypesByName,
+    }
+
+
+# -- SNAPSHOT --
+
+def readJson(path, version):
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != version:
+        return None
+    return data
+
+
+def writeJson(path, data):
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, sort_keys=True, ensure_ascii=False)
+        f.write("\n")
+    os.replace(path + ".tmp", path)
+
+
+def fetchTable(url, previous, state, parse):
+    # returns (table entry, refresh state entry); the previous table on 304 Not Modified or
+    # when the content is unchanged, else the freshly parsed one
+    request = urllib.request.Request(url)
+    if previous and state:
+        if state.get("etag"):
+            request.add_header("If-None-Match", state["etag"])
+        if state.get("last_modified"):
+            request.add_header("If-Modified-Since", state["last_modified"])
+    instrumentation.count("requests")
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            content = response.read()
+            headers = response.headers
+    except urllib.error.HTTPError as e:
+        if e.code == 304 and previous:
+            instrumentation.count("not_modified")
+            return previous, dict(state, checked_at=int(time.time()))
+        raise
+    state = {"etag": headers.get("ETag"), "last_modified": headers.get("Last-Modified"), "checked_at": int(time.time())}
+    digest = hashlib.sha256(content).hexdigest()
+    if previous and previous.get("sha256") == digest:
+        return previous, state
+    table = {
+        "url": url,
+        "fetched_at": int(time.time()),
+        "sha256": digest,
+        "index": parse(content.decode("utf-8").splitlines(keepends=True)),
+    }
+    return table, state
+
+
+def refreshSnapshot(root=chainRegistryRoot, baseURL=None):
+    # returns the refreshed snapshot; only tables from the default URL are written back
+    baseURL = (baseURL or slipBaseURL).rstrip("/")
+    persist = baseURL == defaultBaseURL
+    previous = readJson(snapshotPath, snapshotVersion) if persist else None
+    previous = previous or {}
+    statePath = getCachePath(refreshStateFileName, root)
+    state = (readJson(statePath, snapshotVersion) if persist else None) or {}
+    snapshot = {"version": snapshotVersion}
+    newState = {"version": snapshotVersion}
+    for name, fileName, parse in (("slip173", slip173FileName, parseSLIP173), ("slip44", slip44FileName, parseSLIP44)):
+        snapshot[name], newState[name] = fetchTable(baseURL + "/" + fileName, previous.get(name), state.get(name), parse)
+    if persist:
+        if snapshot != previous:
+            writeJson(snapshotPath, snapshot)
+        writeJson(statePath, newState)
+    return snapshot
+
+
+def lastChecked(root):
+    # seconds since the epoch of this checkout's last successful refresh, unchanged tables
+    # included; None when it never refreshed
+    state = readJson(getCachePath(refreshStateFileName, root), snapshotVersion)
+    if not state:
+        return None
+    return min(state.get(name, {}).get("checked_at", 0) for name in ("slip173", "slip44"))
+
+
+def fetchedOn(snapshot):
+    return time.strftime("%Y-%m-%d", time.gmtime(min(snapshot[name]["fetched_at"] for name in ("slip173", "slip44"))))
+
+
+@instrumentation.stage("slip_tables")
+def loadSLIPTables(root=chainRegistryRoot, refresh=False, baseURL=None):
+    # returns (slip173 index, slip44 index); the network is only used when a refresh is
+    # requested, this checkout's last check is older than maxAgeDays, or there is no snapshot
+    snapshot = readJson(snapshotPath, snapshotVersion)
+    checked = lastChecked(root)
+    stale = snapshot is not None and checked is not None and time.time() - checked > maxAgeDays * 86400
+    if refresh or stale or snapshot is None or (baseURL or slipBaseURL).rstrip("/") != defaultBaseURL:
+        try:
+            snapshot = refreshSnapshot(root, baseURL)
+        except refreshErrors as e:
+            if snapshot is None:
+                raise SLIPTablesUnavailable("no SLIP snapshot at " + snapshotPath + " and refresh failed: " + str(e))
+            print("SLIP refresh failed, using the snapshot fetched " + fetchedOn(snapshot) + ": " + str(e))
+    elif checked is None and time.time() - snapshot["slip173"]["fetched_at"] > maxAgeDays * 86400:
+        print("Using the SLIP snapshot fetched " + fetchedOn(snapshot) + "; run slip_tables.py to refresh it")
+    slip173 = snapshot["slip173"]["index"]
+    slip44 = dict(snapshot["slip44"]["index"])
+    slip44["coin_types_by_num"] = {int(num): name for num, name in slip44["coin_types_by_num"].items()}
+    return slip173, slip44
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh the SLIP-0044/SLIP-0173 snapshot")
+    parser.add_argument("--base-url", default=None, help="where slip-0044.md and slip-0173.md are served from (default: " + slipBaseURL + "); other URLs are not written to the snapshot")
+    args = parser.parse_args()
+    snapshot = refreshSnapshot(baseURL=args.base_url)
+    print("SLIP-0173: " + str(len(snapshot["slip173"]["index"]["websites"])) + " entries, SLIP-0044: " + str(len(snapshot["slip44"]["index"]["coin_types_by_num"])) + " coin types")
@@ -0,0 +1,158 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("grpc")
+
+from aiohttp import web  # noqa: E402
+
+import binary_checksums  # noqa: E402
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "benchmarks"))
+import mock_server  # noqa: E402
+
+# -- MOCK SERVER --
+# mock_server's /binaries/ endpoint is served in-process on a free port, and every request it
+# receives is recorded, so the tests can check which ranges were asked for.
+
+size = 1 << 16
+
+def serveAndVerify(root, prepare, **options):
+    # returns ([VerificationResult], [(path, Range header)]); prepare(host) returns the URLs to
+    # verify and may leave partial downloads behind first
+    requests = []
+
+    @web.middleware
+    async def record(request, handler):
+        requests.append((request.path, request.headers.get("Range")))
+        if request.path.startswith(mock_server.binaryPrefix + "missing"):
+            return web.Response(status=404)
+        return await handler(request)
+
+    async def main():
+        app = mock_server.createApp(**options)
+        app.middlewares.append(record)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        try:
+            urls = prepare("127.0.0.1:" + str(runner.addresses[0][1]))
+            return await binary_checksums.verifyUrls(urls, root)
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(main()), requests
+
+def writePartial(root, url, content):
+    with open(binary_checksums.partialPath(root, url), "wb") as f:
+        f.write(content)
+
+def test_verified(tmp_path):
+    # validates that a complete download verifies, is cached, and leaves no partial file behind
+    root = str(tmp_path)
+    urls = []
+    results, requests = serveAndVerify(root, lambda host: urls.append(mock_server.binaryUrl(host, "app", size)) or urls)
+    assert [result.status for result in results] == ["verified"]
+    assert results[0].size == size
+    assert urls[0] in binary_checksums.loadCache(root)["verified"]
+    assert not os.path.exists(binary_checksums.partialPath(root, urls[0]))
+    assert requests == [(mock_server.binaryPrefix + "app", None)]
+
+def test_resumesPartialDownload(tmp_path):
+    # validates that the bytes left by an earlier run are kept and only the rest is requested
+    root = str(tmp_path)
+
+    def prepare(host):
+        url = mock_server.binaryUrl(host, "app", size)
+        writePartial(root, url, mock_server.binaryContent("app", size)[:size // 2])
+        return [url]
+
+    results, requests = serveAndVerify(root, prepare)
+    assert [result.status for result in results] == ["verified"]
+    assert requests == [(mock_server.binaryPrefix + "app", "bytes=" + str(size // 2) + "-")]
+
+def test_resumeKeepsBytesOnDisk(tmp_path):
+    # validates that resumed bytes are hashed from disk, so a corrupt partial file is a mismatch
+    # rather than being silently replaced
+    root = str(tmp_path)
+
+    def prepare(host):
+        url = mock_server.binaryUrl(host, "app", size)
+        writePartial(root, url, bytes(size // 2))
+        return [url]
+
+    results, _ = serveAndVerify(root, prepare)
+    assert [result.status for result in results] == ["mismatch"]
+
+def test_interruptedDownloadResumes(tmp_path):
+    # validates that a download cut off halfway is completed by a Range request in the same run
+    root = str(tmp_path)
+    results, requests = serveAndVerify(root, lambda host: [mock_server.binaryUrl(host, "app", size)], interruptRate=1)
+    assert [result.status for result in results] == ["verified"]
+    assert [header for _, header in requests] == [None, "bytes=" + str(size // 2) + "-"]
+
+def test_completePartialDownload(tmp_path):
+    # validates that a partial file holding the whole binary verifies on the server's 416
+    root = str(tmp_path)
+
+    def prepare(host):
+        url = mock_server.binaryUrl(host, "app", size)
+        writePartial(root, url, mock_server.binaryContent("app", size))
+        return [url]
+
+    results, requests = serveAndVerify(root, prepare)
+    assert [result.status for result in results] == ["verified"]
+    assert results[0].size == size
+    assert requests == [(mock_server.binaryPrefix + "app", "bytes=" + str(size) + "-")]
+
+def test_serverIgnoringRange(tmp_path):
+    # validates that the download restarts from the first byte when the server answers a Range
+    # request with the whole file
+    root = str(tmp_path)
+
+    def prepare(host):
+        url = mock_server.binaryUrl(host, "app", size)
+        writePartial(root, url, bytes(size // 2))
+        return [url]
+
+    results, _ = serveAndVerify(root, prepare, honourRange=False)
+    assert [result.status for result in results] == ["verified"]
+    assert results[0].size == size
+
+def test_checksumMismatch(tmp_path):
+    # validates that a wrong checksum is reported with the actual digest and is not cached
+    root = str(tmp_path)
+    urls = []
+
+    def prepare(host):
+        urls.append(mock_server.binaryUrl(host, "app", size).rsplit(":", 1)[0] + ":" + "0" * 64)
+        return urls
+
+    results, _ = serveAndVerify(root, prepare)
+    assert [result.status for result in results] == ["mismatch"]
+    assert results[0].expected == "0" * 64
+    assert results[0].actual == mock_server.binaryUrl("", "app", size).rsplit(":", 1)[1]
+    assert urls[0] not in binary_checksums.loadCache(root)["verified"]
+
+def test_clientErrorNotRetried(tmp_path):
+    # validates that a 4xx answer is reported after a single request
+    root = str(tmp_path)
+    results, requests = serveAndVerify(root, lambda host: [mock_server.binaryUrl(host, "missing", size)])
+    assert [result.status for result in results] == ["error"]
+    assert "404" in results[0].error
+    assert len(requests) == 1
+
+def test_writeErrorReportedPerUrl(tmp_path):
+    # validates that a partial file that cannot be written fails only its own URL
+    root = str(tmp_path)
+
+    def prepare(host):
+        urls = [mock_server.binaryUrl(host, "unwritable", size), mock_server.binaryUrl(host, "app", size)]
+        os.makedirs(binary_checksums.partialPath(root, urls[0]))
+        return urls
+
+    results, _ = serveAndVerify(root, prepare)
+    assert [result.status for result in results] == ["error", "verified"]
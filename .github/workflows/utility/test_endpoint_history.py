@@ -0,0 +1,63 @@
+from endpoint_history import EndpointHistory
+
+# -- HISTORY --
+# Records are appended to a history in a temporary directory and queried after load(), as
+# apis.py and remove-stale-endpoints.py do.
+
+day = 24 * 60 * 60
+now = 100 * day
+
+def historyOf(tmp_path, records):
+    history = EndpointHistory(path=str(tmp_path / "endpoint_history.jsonl"))
+    history.append(records)
+    return EndpointHistory(path=history.path).load()
+
+def record(daysAgo, address, ok):
+    return (now - daysAgo * day, "osmosis", "rpc", address, ok, 200 if ok else None, 0.1)
+
+def test_queries(tmp_path):
+    # validates first/last seen, last success and uptime over a window of days
+    history = historyOf(tmp_path, [
+        record(20, "https://a", True),
+        record(5, "https://a", False),
+        record(3, "https://a", True),
+        record(1, "https://a", False),
+        record(2, "https://b", False),
+    ])
+    assert history.first_seen("https://a") == now - 20 * day
+    assert history.last_seen("https://a") == now - 1 * day
+    assert history.last_success("https://a") == now - 3 * day
+    assert history.uptime("https://a", 7, now) == 1 / 3
+    assert history.uptime("https://a", 30, now) == 0.5
+    assert history.last_success("https://b") is None
+    assert history.uptime("https://b", 7, now) == 0
+    assert history.uptime("https://b", 1, now) is None
+    assert "https://c" not in history
+    assert history.first_seen("https://c") is None
+    assert history.uptime("https://c", 7, now) is None
+
+def test_appendAfterPartialLine(tmp_path):
+    # validates that a record appended after an interrupted write is kept intact
+    path = tmp_path / "endpoint_history.jsonl"
+    history = EndpointHistory(path=str(path))
+    history.append([record(3, "https://a", True)])
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('[8640000,"osmosis","rpc","https://a"')
+    history.append([record(1, "https://b", True)])
+    loaded = EndpointHistory(path=str(path)).load()
+    assert loaded.last_success("https://a") == now - 3 * day
+    assert loaded.last_success("https://b") == now - 1 * day
+
+def test_compact(tmp_path):
+    # validates that records past the retention window and unreadable lines are dropped
+    path = tmp_path / "endpoint_history.jsonl"
+    history = EndpointHistory(path=str(path))
+    history.append([record(50, "https://a", True), record(5, "https://a", False)])
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("not json\n")
+    history.compact(30, now)
+    loaded = EndpointHistory(path=str(path)).load()
+    assert loaded.first_seen("https://a") == now - 5 * day
+    assert loaded.last_success("https://a") is None
+    with open(path, encoding="utf-8") as f:
+        assert len(f.readlines()) == 1
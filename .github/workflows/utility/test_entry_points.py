@@ -0,0 +1,51 @@
+import os
+import re
+import subprocess
+import sys
+from glob import glob
+
+import pytest
+
+# -- ENTRY POINTS --
+# Every script meant to be run directly is loaded in its own interpreter, the way it is run
+# (its directory first on sys.path, the registry root as the working directory), so imports
+# that only work from another script's path fail here instead of in CI. main() is not run.
+
+registryRoot = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, os.pardir, os.pardir))
+
+scriptDirectories = [
+    os.path.join(".github", "workflows", "utility"),
+    os.path.join(".github", "workflows", "tests"),
+    os.path.join(".github", "workflows", "benchmarks"),
+    "_scripts",
+]
+
+def isEntryPoint(path):
+    with open(path, encoding="utf-8") as f:
+        return re.search(r'^if __name__ == ["\']__main__["\']:', f.read(), re.MULTILINE) is not None
+
+entryPoints = sorted(
+    os.path.relpath(path, registryRoot)
+    for directory in scriptDirectories
+    for path in glob(os.path.join(registryRoot, directory, "*.py"))
+    if isEntryPoint(path)
+)
+
+# modules of our own; any other missing module is a dependency this environment lacks
+localModules = {
+    os.path.splitext(os.path.basename(path))[0]
+    for directory in scriptDirectories
+    for path in glob(os.path.join(registryRoot, directory, "*.py"))
+}
+
+loader = "import runpy, sys; sys.path[0] = sys.argv[1]; runpy.run_path(sys.argv[2], run_name='entry_point_smoke_test')"
+
+@pytest.mark.parametrize("script", entryPoints)
+def test_entryPointImports(script):
+    # validates that the script's module-level code, imports included, runs without errors
+    path = os.path.join(registryRoot, script)
+    process = subprocess.run([sys.executable, "-c", loader, os.path.dirname(path), path], cwd=registryRoot, capture_output=True, text=True, timeout=300)
+    missing = re.search(r"ModuleNotFoundError: No module named '([^'.]+)", process.stderr)
+    if process.returncode and missing and missing.group(1) not in localModules:
+        pytest.skip(missing.group(1) + " is not installed")
+    assert process.returncode == 0, process.stderr[-2000:]
@@ -0,0 +1,39 @@
+import ibc_graph
+from chain_registry import IbcConnection, RegistryIndex
+from ibc_graph import buildIbcGraph
+
+# -- ROUTES --
+# A chain of three IBC connections (a - b - c - d) is built in memory and routed over.
+
+def connection(chain1, chain2, channel1, channel2):
+    return IbcConnection(chain1 + "-" + chain2 + ".json", "", "mainnet", {
+        "chain_1": {"chain_name": chain1},
+        "chain_2": {"chain_name": chain2},
+        "channels": [{
+            "chain_1": {"port_id": "transfer", "channel_id": channel1},
+            "chain_2": {"port_id": "transfer", "channel_id": channel2},
+            "tags": {"preferred": True},
+        }],
+    })
+
+def graph():
+    ibc = [connection("a", "b", "channel-0", "channel-1"), connection("b", "c", "channel-2", "channel-3"), connection("c", "d", "channel-4", "channel-5")]
+    return buildIbcGraph(RegistryIndex("", [], ibc, {}, {}))
+
+def test_route():
+    # validates the hops of a multi-hop route, and that a cached route is returned immutable
+    ibcGraph = graph()
+    route = ibcGraph.findRoute("a", "d")
+    assert [(hop.chain_name, hop.channel_id) for hop in route] == [("a", "channel-0"), ("b", "channel-2"), ("c", "channel-4")]
+    assert isinstance(route, tuple)
+    assert ibcGraph.findRoute("a", "d") is route
+    assert ibcGraph.findRoute("a", "a") == ()
+    assert ibcGraph.findRoute("a", "d", maxHops=2) is None
+
+def test_routeCacheBounded(monkeypatch):
+    # validates that the route cache keeps at most routeCacheSize routes
+    monkeypatch.setattr(ibc_graph, "routeCacheSize", 2)
+    ibcGraph = graph()
+    for source in ("a", "b", "c", "d"):
+        ibcGraph.findRoute(source, "d")
+    assert ibcGraph.routes.cache_info().currsize == 2
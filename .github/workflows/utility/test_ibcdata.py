@@ -1,28 +1,70 @@
 import re
-import json
-from os import getcwd, listdir
-from os.path import isfile, isdir, join
+from collections import defaultdict
+from os import getcwd
 
 import pytest
 
-mypathMainnets = join(getcwd(),"_IBC")
-mypathTestnets = join(getcwd(),"testnets","_IBC")
-ibcData_files_mainnet = [f for f in listdir(mypathMainnets) if isfile(join(mypathMainnets, f))]
-ibcData_files_testnet = [f for f in listdir(mypathTestnets) if isfile(join(mypathTestnets, f))]
+import instrumentation
+from chain_registry import getRegistry, listChainDirectories
+
+instrumentation.start("test_ibcdata")
+
+# -- SINGLE PASS --
+# Every file name is matched once and every file is parsed once (by the registry loader), and
+# the chain directories are listed once; the tests below only look the results up.
+
+pattern = re.compile(r'(.*)-(.*).json$')
+
+registry = getRegistry(getcwd())
+ibcData_by_file = {(connection.network_type, connection.file_name): connection.data for connection in registry.ibc}
+ibcData_files_mainnet = [fileName for networkType, fileName in ibcData_by_file if networkType == "mainnet"]
+ibcData_files_testnet = [fileName for networkType, fileName in ibcData_by_file if networkType == "testnet"]
 ibcData_files = ibcData_files_mainnet + ibcData_files_testnet
+# (network_type, file name) of every file, since a testnet file may share a mainnet file's name
+ibcData_keys = list(ibcData_by_file)
+ibcData_ids = [networkType + "/" + fileName for networkType, fileName in ibcData_keys]
+
+fileName_matches = {fileName: pattern.match(fileName) for fileName in ibcData_files}
+
+# chain directories at the root, in _non-cosmos, in testnets and in testnets/_non-cosmos;
+# _IBC, _template and the like are not chains
+chainReg_directories = {name for _, _, name, _ in listChainDirectories(getcwd())}
+
+# (chain_name, connection_id) and (chain_name, channel_id) -> (network_type, file name) of the
+# files using it; channel ids are unique per chain regardless of port, and "*" is a wildcard
+files_by_connection = defaultdict(set)
+files_by_channel = defaultdict(set)
+with instrumentation.stage("index_ids"):
+    for key, json_file in ibcData_by_file.items():
+        if not json_file:
+            continue
+        for side in ("chain_1", "chain_2"):
+            chain_name = json_file.get(side, {}).get("chain_name")
+            connection_id = json_file.get(side, {}).get("connection_id")
+            if chain_name and connection_id:
+                files_by_connection[(chain_name, connection_id)].add(key)
+            for channel in json_file.get("channels", []):
+                channel_id = channel.get(side, {}).get("channel_id")
+                if chain_name and channel_id and channel_id != "*":
+                    files_by_channel[(chain_name, channel_id)].add(key)
+
+# pre-existing duplicates that need correcting in the data; do not add to this list, and remove
+# entries once the data is fixed (test_knownDuplicateConnections fails until then). Entries for
+# chains the registry does not have (a synthetic registry) are skipped.
+known_duplicate_connections = {
+    ("osmosis", "connection-1"),  # cosmoshub-osmosis.json, cudos-osmosis.json
+    ("teritori", "connection-0"),  # cosmoshub-teritori.json, osmosis-teritori.json
+}
 
 @pytest.mark.parametrize("input", ibcData_files)
 def test_fileName(input):
     # validates that the json file name has two "strings" separated by a hyphen (-) and ends with ".json"
-    pattern = re.compile(r'.*-.*.json$')
-    result = re.match(pattern, input)
-    assert result
+    assert fileName_matches[input]
 
 @pytest.mark.parametrize("input", ibcData_files)
 def test_alphabeticalOrder(input):
     # validates that chain_1 and chain_2 in file name are in alphabetical order
-    pattern = re.compile(r'(.*)-(.*).json$')
-    m = pattern.match(input)
+    m = fileName_matches[input]
     toSort = [(m.group(1)), (m.group(2))]
     toSort.sort(key=str.lower)
     assert (m.group(1) == toSort[0]) and (m.group(2) == toSort[1])
@@ -30,38 +72,67 @@ def test_alphabeticalOrder(input):
 @pytest.mark.parametrize("input", ibcData_files_mainnet)
 def test_chainNameMatchFileNameMainnets(input):
     # validates for mainnet connections that the chain-name for chain-1 and chain-2 inside the json file match the order used in the file name.
-    pattern = re.compile(r'(.*)-(.*).json$')
-    m = pattern.match(input)
+    m = fileName_matches[input]
     fileName_chain1 = m.group(1).lower()
     fileName_chain2 = m.group(2).lower()
-    with open(join(mypathMainnets,input), "r") as read_file:
-        json_file = json.load(read_file)
-        chain_1 = str(json_file["chain_1"]["chain_name"]).lower()
-        chain_2 = str(json_file["chain_2"]["chain_name"]).lower()
+    json_file = ibcData_by_file[("mainnet", input)]
+    chain_1 = str(json_file["chain_1"]["chain_name"]).lower()
+    chain_2 = str(json_file["chain_2"]["chain_name"]).lower()
     assert fileName_chain1 == chain_1 and fileName_chain2 == chain_2
 
 @pytest.mark.parametrize("input", ibcData_files_testnet)
 def test_chainNameMatchFileNameTestnets(input):
     # validates for testnet connections that the chain-name for chain-1 and chain-2 inside the json file match the order used in the file name.
-    pattern = re.compile(r'(.*)-(.*).json$')
-    m = pattern.match(input)
+    m = fileName_matches[input]
     fileName_chain1 = m.group(1).lower()
     fileName_chain2 = m.group(2).lower()
-    with open(join(mypathTestnets,input), "r") as read_file:
-        json_file = json.load(read_file)
-        chain_1 = str(json_file["chain_1"]["chain_name"]).lower()
-        chain_2 = str(json_file["chain_2"]["chain_name"]).lower()
+    json_file = ibcData_by_file[("testnet", input)]
+    chain_1 = str(json_file["chain_1"]["chain_name"]).lower()
+    chain_2 = str(json_file["chain_2"]["chain_name"]).lower()
     assert fileName_chain1 == chain_1 and fileName_chain2 == chain_2
 
 @pytest.mark.parametrize("input", ibcData_files)
     # validates that the chain-name's used exist as root folders on the chain-registry
 def test_existstsOnChainReg(input):
-    pattern = re.compile(r'(.*)-(.*).json$')
-    m = pattern.match(input)
+    m = fileName_matches[input]
     chain1 = m.group(1).lower()
     chain2 = m.group(2).lower()
-    non_cosmos = join('_non-cosmos')
-    testnets = join('testnets')
-    nc_testnets = join('testnets','_non-cosmos')
-    assert ((isdir(join(getcwd(),chain1)) or isdir(join(getcwd(),non_cosmos,chain1)) or isdir(join(getcwd(),testnets,chain1)) or isdir(join(getcwd(),nc_testnets,chain1))) and
-        (isdir(join(getcwd(),chain2)) or isdir(join(getcwd(),non_cosmos,chain2)) or isdir(join(getcwd(),testnets,chain1)) or isdir(join(getcwd(),nc_testnets,chain2))))
+    assert chain1 in chainReg_directories and chain2 in chainReg_directories
+
+@pytest.mark.parametrize("key", ibcData_keys, ids=ibcData_ids)
+def test_chainIdMatchesChainReg(key):
+    # validates that the chain_id of each side matches the chain_id in that chain's chain.json
+    json_file = ibcData_by_file[key]
+    for side in ("chain_1", "chain_2"):
+        chain = registry.getChain(json_file[side]["chain_name"])
+        if chain is None or not chain.chain or "chain_id" not in chain.chain:
+            continue
+        assert json_file[side].get("chain_id") == chain.chain["chain_id"], side + " chain_id does not match " + chain.chain_name + "'s chain.json"
+
+@pytest.mark.parametrize("key", ibcData_keys, ids=ibcData_ids)
+def test_uniqueConnectionIds(key):
+    # validates that no other IBC file uses the same connection_id on the same chain
+    json_file = ibcData_by_file[key]
+    for side in ("chain_1", "chain_2"):
+        connection = (json_file[side]["chain_name"], json_file[side]["connection_id"])
+        if connection in known_duplicate_connections:
+            continue
+        assert files_by_connection[connection] == {key}, str(connection) + " is also used by " + str(sorted(files_by_connection[connection] - {key}))
+
+@pytest.mark.parametrize("connection", sorted(known_duplicate_connections))
+def test_knownDuplicateConnections(connection):
+    # validates that every whitelisted duplicate still exists, so fixed ones leave the list
+    if registry.getChain(connection[0]) is None:
+        pytest.skip(connection[0] + " is not in this registry")
+    assert len(files_by_connection[connection]) > 1, str(connection) + " is no longer duplicated; remove it from known_duplicate_connections"
+
+@pytest.mark.parametrize("key", ibcData_keys, ids=ibcData_ids)
+def test_uniqueChannelIds(key):
+    # validates that no other IBC file (or channel in this file) uses the same channel_id on the same chain
+    json_file = ibcData_by_file[key]
+    for side in ("chain_1", "chain_2"):
+        channel_ids = [channel[side]["channel_id"] for channel in json_file["channels"] if channel[side]["channel_id"] != "*"]
+        assert len(channel_ids) == len(set(channel_ids)), side + " lists a channel_id twice"
+        for channel_id in channel_ids:
+            channel = (json_file[side]["chain_name"], channel_id)
+            assert files_by_channel[channel] == {key}, str(channel) + " is also used by " + str(sorted(files_by_channel[channel] - {key}))
@@ -0,0 +1,35 @@
+from image_metadata import checkImage, imageMetadata
+
+# -- CHECKS --
+# The SVG rules mirror checkSVGEmbeddedRasterImage in validate_data.mjs.
+
+def svg(body, padding=0):
+    return b'<svg width="100" height="100">' + body + b"<!--" + b" " * padding + b"--></svg>"
+
+raster = b'<image href="data:image/png;base64,AAAA"/>'
+
+def checks(content, pngSizes=()):
+    return [check for check, _ in checkImage("images/logo.svg", imageMetadata(content), pngSizes)]
+
+def test_maskCommas():
+    # validates that commas are counted in the path data of masks and clip paths only
+    content = svg(b'<mask id="m"><path d="M0,0 L1,1"/></mask><clipPath><path fill="x" d="M0,0"/></clipPath><path d="M1,1,1"/>')
+    assert imageMetadata(content)["mask_commas"] == 3
+
+def test_embeddedRaster():
+    # validates that a large SVG with an <image> and next to no shapes or masks is reported
+    assert checks(svg(raster, 30000)) == ["svg_embedded_raster"]
+    assert checks(svg(raster, 20000)) == []
+    assert checks(svg(raster + b'<path d="M0 0"/>' * 3, 30000)) == []
+    assert checks(svg(raster + b'<mask><path d="M0,0,0,0"/></mask>', 30000)) == []
+
+def test_embeddedRasterLargerThanPng():
+    # validates that a large SVG with an <image> is reported when larger than its PNG, whatever
+    # its shapes
+    content = svg(raster + b'<path d="M0 0"/>' * 3, 30000)
+    assert checks(content, [10000]) == ["svg_embedded_raster"]
+    assert checks(content, [40000]) == []
+
+def test_largeSvgAllowed():
+    # validates that size alone is not reported, as the 50 kB rule is disabled in validate_data.mjs
+    assert checks(svg(raster + b'<path d="M0 0"/>' * 3, 60000)) == []
@@ -0,0 +1,115 @@
+import asyncio
+import os
+import sys
+from collections import namedtuple
+
+import pytest
+
+pytest.importorskip("aiohttp")
+pytest.importorskip("grpc")
+
+from aiohttp import web  # noqa: E402
+
+workflowsDirectory = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.append(os.path.join(workflowsDirectory, "tests"))
+sys.path.append(os.path.join(workflowsDirectory, "benchmarks"))
+import mock_server  # noqa: E402
+from prober import probe_all  # noqa: E402
+
+# -- MOCK SERVER --
+# mock_server's HTTP app and gRPC servers are started in-process on free ports, and probe_all()
+# is run against them from the same event loop. Test cases have the fields of apis.py's.
+
+EndpointTest = namedtuple('EndpointTest', ['chain', 'endpoint', 'provider', 'address'])
+
+timeout = 0.5
+
+def probeMock(makeCases, grpcServers=(), **options):
+    # returns probe_all()'s {test case: ProbeResult}; makeCases(host, grpcHosts) returns the
+    # test cases, grpcServers holds startGrpcServer() keyword arguments, one server each
+    async def main():
+        runner = web.AppRunner(mock_server.createApp(**options), access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        servers = [await mock_server.startGrpcServer(0, **server) for server in grpcServers]
+        try:
+            host = "127.0.0.1:" + str(runner.addresses[0][1])
+            testCases = makeCases(host, ["127.0.0.1:" + str(port) for _, port in servers])
+            # not paced: every case is served by the same host
+            return await probe_all(testCases, rate_per_host=0, timeout=timeout)
+        finally:
+            await asyncio.gather(*(server.stop(None) for server, _ in servers))
+            await runner.cleanup()
+
+    return asyncio.run(main())
+
+def grpcCase(host):
+    return EndpointTest("mock", "grpc", None, host)
+
+def test_http():
+    # validates that a 200 is ok and a failing endpoint's 503 is not
+    cases = []
+
+    def makeCases(host, _):
+        cases.extend(EndpointTest("mock", "rpc", None, "http://" + host + "/mock/rpc/" + str(i)) for i in range(20))
+        return cases
+
+    results = probeMock(makeCases, failureRate=0.5)
+    statuses = {result.status for result in results.values()}
+    assert statuses == {200, 503}
+    assert all(result.ok == (result.status == 200) for result in results.values())
+
+def test_grpcHealth():
+    # validates that the health service's SERVING and NOT_SERVING decide the result
+    cases = []
+    results = probeMock(lambda _, grpcHosts: cases.extend(grpcCase(grpcHost) for grpcHost in grpcHosts) or cases, grpcServers=[{}, {"serving": False}])
+    serving, notServing = (results[case] for case in cases)
+    assert (serving.ok, serving.status, serving.error) == (True, 0, None)
+    assert (notServing.ok, notServing.status, notServing.error) == (False, 0, "not serving")
+
+def test_grpcReflectionFallback():
+    # validates that a server without the health service is probed through reflection
+    results = probeMock(lambda _, grpcHosts: [grpcCase(grpcHosts[0])], grpcServers=[{"health": False}])
+    [result] = results.values()
+    assert (result.ok, result.status, result.error) == (True, 0, None)
+
+def test_grpcFailure():
+    # validates that an aborted call is reported with its status code
+    results = probeMock(lambda _, grpcHosts: [grpcCase(grpcHosts[0])], grpcServers=[{"failing": True}])
+    [result] = results.values()
+    assert (result.ok, result.error) == (False, "UNAVAILABLE")
+
+def test_malformedGrpcAddress():
+    # validates that an address without a valid port fails its own probe and no other
+    cases = []
+    results = probeMock(lambda _, grpcHosts: cases.extend([grpcCase("mock.example:abc"), grpcCase(grpcHosts[0])]) or cases, grpcServers=[{}])
+    malformed, valid = (results[case] for case in cases)
+    assert not malformed.ok
+    assert "port" in malformed.error.lower()
+    assert valid.ok
+
+def test_websocket():
+    # validates that the subscription's acknowledgement is ok
+    results = probeMock(lambda host, _: [EndpointTest("mock", "wss", None, "ws://" + host + "/mock/wss/0/websocket")])
+    [result] = results.values()
+    assert (result.ok, result.status, result.error) == (True, 101, None)
+
+def test_websocketError():
+    # validates that a JSON-RPC error in place of the acknowledgement fails the probe
+    error = {"code": -32603, "message": "max_subscriptions_per_client 5 reached"}
+    results = probeMock(lambda host, _: [EndpointTest("mock", "wss", None, "ws://" + host + "/mock/wss/0/websocket")], websocketError=error)
+    [result] = results.values()
+    assert not result.ok
+    assert "max_subscriptions_per_client" in result.error
+
+def test_timeouts():
+    # validates that endpoints answering after the timeout are reported as timeouts, for every
+    # kind of probe
+    results = probeMock(lambda host, grpcHosts: [
+        EndpointTest("mock", "rpc", None, "http://" + host + "/mock/rpc/0"),
+        EndpointTest("mock", "wss", None, "ws://" + host + "/mock/wss/0/websocket"),
+        grpcCase(grpcHosts[0]),
+        grpcCase(grpcHosts[1]),
+    ], grpcServers=[{"latency": timeout * 2}, {"health": False, "latency": timeout * 2}], latency=timeout * 2)
+    assert len(results) == 4
+    assert [(result.ok, result.error) for result in results.values()] == [(False, "timeout")] * 4
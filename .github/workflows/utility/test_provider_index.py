@@ -0,0 +1,83 @@
+import json
+import os
+
+import pytest
+
+from provider_index import ProviderIndex, providerAllowlistPath, updateIndex
+
+# -- INDEX --
+# The metrics are computed from a hand-made cache, as updateIndex() would store it. "osmosis"
+# is named by a mainnet and a testnet chain, which must stay apart.
+
+def chainEntry(chainName, networkType, endpoints):
+    return {"chain_name": chainName, "network_type": networkType, "digest": "", "state": [0, 0], "endpoints": endpoints}
+
+cache = {
+    "version": 1,
+    "files": {
+        "osmosis/chain.json": chainEntry("osmosis", "mainnet", [
+            ["rpc", "https://rpc-1", "Polkachu"],
+            ["rpc", "https://rpc-2", "polkachu"],
+            ["rpc", "https://rpc-3", "Lavender"],
+            ["rest", "https://rest-1", "Polkachu"],
+        ]),
+        "testnets/osmosis/chain.json": chainEntry("osmosis", "testnet", [
+            ["rpc", "https://testnet-rpc-1", "Lavender"],
+        ]),
+        "juno/chain.json": chainEntry("juno", "mainnet", [
+            ["rpc", "https://juno-rpc-1", "Lavender"],
+            ["rpc", "https://juno-rpc-2", None],
+            ["grpc", "juno-grpc:443", "Lavender"],
+        ]),
+    },
+    "allowlist": {"state": [0, 0], "providers": {"Polkachu": "active"}},
+}
+
+@pytest.fixture
+def index():
+    return ProviderIndex(cache)
+
+def test_chainsWithTheSameName(index):
+    # validates that chains sharing a chain_name are indexed under their own directories
+    assert index.getChainDirectories("osmosis") == ["osmosis", "testnets/osmosis"]
+    assert [endpoint.address for endpoint in index.endpointsByChain["testnets/osmosis"]] == ["https://testnet-rpc-1"]
+    assert index.getChains("Lavender") == ["juno", "osmosis"]
+
+def test_providerSpellings(index):
+    # validates that spellings of one provider are merged under the most common one
+    assert index.getProviders() == [("Lavender", 4), ("Polkachu", 3)]
+    assert len(index.getEndpoints("POLKACHU", ["rpc"])) == 2
+    assert index.getAllowlistStatus("polkachu") == "active"
+    assert index.getAllowlistStatus("Lavender") is None
+
+def test_blastRadius(index):
+    # validates that a chain is affected only for the types where every endpoint is lost
+    assert index.blastRadius(["Polkachu"]) == {"osmosis": ["rest"]}
+    assert index.blastRadius(["Polkachu", "Lavender"]) == {"juno": ["grpc"], "osmosis": ["rpc", "rest"], "testnets/osmosis": ["rpc"]}
+
+def test_diversity(index):
+    # validates the per-type metrics, with endpoints without a provider as one unknown provider
+    metrics = index.diversity("osmosis")
+    assert metrics["rpc"] == {"endpoints": 3, "providers": 2, "top_provider": "Polkachu", "top_share": 0.667, "effective_providers": 1.8}
+    assert metrics["grpc"] == {"endpoints": 0, "providers": 0, "top_provider": None, "top_share": 0, "effective_providers": 0}
+    assert index.diversity("juno", ["rpc"])["rpc"]["effective_providers"] == 2.0
+
+def test_leastDiverse(index):
+    # validates the order, fewest effective providers first, and the network type filter
+    assert [directory for directory, _ in index.leastDiverse()] == ["osmosis", "juno"]
+    assert [directory for directory, _ in index.leastDiverse(networkTypes=("testnet",))] == ["testnets/osmosis"]
+    assert index.leastDiverse("grpc") == [("juno", index.diversity("juno", ["grpc"])["grpc"])]
+
+def test_deletedAllowlist(tmp_path):
+    # validates that providers are no longer marked once the allowlist is deleted
+    root = str(tmp_path)
+    os.makedirs(os.path.join(root, "osmosis"))
+    with open(os.path.join(root, "osmosis", "chain.json"), "w", encoding="utf-8") as f:
+        json.dump({"chain_name": "osmosis", "apis": {"rpc": [{"address": "https://rpc-1", "provider": "Polkachu"}]}}, f)
+    allowlistPath = os.path.join(root, providerAllowlistPath)
+    os.makedirs(os.path.dirname(allowlistPath))
+    with open(allowlistPath, "w", encoding="utf-8") as f:
+        json.dump({"providers": [{"name": "Polkachu", "status": "active"}]}, f)
+    assert updateIndex(root).getAllowlistStatus("Polkachu") == "active"
+    os.remove(allowlistPath)
+    assert updateIndex(root).getAllowlistStatus("Polkachu") is None
@@ -0,0 +1,82 @@
+import copy
+import os
+
+from chain_registry import Chain, IbcConnection, RegistryIndex
+from registry_merkle import MerkleSnapshot, buildTree, describe, diffTrees, writeTree
+
+# -- DIFF --
+# Two small registries are built in memory, hashed, written and read back the way the CLI
+# does, and the description of every change between them is checked.
+
+osmosis = {
+    "chain": {
+        "chain_name": "osmosis",
+        "chain_id": "osmosis-1",
+        "apis": {"rpc": [{"address": "https://rpc.osmosis.zone", "provider": "Osmosis"}]},
+    },
+    "assetlist": {"chain_name": "osmosis", "assets": [{"base": "uosmo", "symbol": "OSMO"}, {"base": "uion", "symbol": "ION"}]},
+}
+
+channel = {
+    "chain_1": {"channel_id": "channel-0", "port_id": "transfer"},
+    "chain_2": {"channel_id": "channel-141", "port_id": "transfer"},
+    "tags": {"status": "ACTIVE"},
+}
+
+connection = {
+    "chain_1": {"chain_name": "cosmoshub", "connection_id": "connection-257"},
+    "chain_2": {"chain_name": "osmosis", "connection_id": "connection-1"},
+    "channels": [channel],
+}
+
+def registryOf(osmosis, connections):
+    # connections: [(network type, file name, data)]
+    chains = [Chain("osmosis", "osmosis", "mainnet", "cosmos", osmosis["chain"], osmosis["assetlist"], None)]
+    ibc = [IbcConnection(fileName, os.path.join(networkType, fileName), networkType, data) for networkType, fileName, data in connections]
+    return RegistryIndex("", chains, ibc, [], {})
+
+def describeChanges(tmp_path, old, new):
+    oldPath = os.path.join(str(tmp_path), "old.merkle")
+    newPath = os.path.join(str(tmp_path), "new.merkle")
+    writeTree(buildTree(old), oldPath)
+    writeTree(buildTree(new), newPath)
+    with MerkleSnapshot(oldPath) as oldTree, MerkleSnapshot(newPath) as newTree:
+        return [describe(change) for change in diffTrees(oldTree.tree, newTree.tree)]
+
+def test_unchanged(tmp_path):
+    # validates that identical registries hash alike and have no changes
+    old = registryOf(osmosis, [("mainnet", "cosmoshub-osmosis.json", connection)])
+    new = registryOf(copy.deepcopy(osmosis), [("mainnet", "cosmoshub-osmosis.json", copy.deepcopy(connection))])
+    assert buildTree(old)["hash"] == buildTree(new)["hash"]
+    assert describeChanges(tmp_path, old, new) == []
+
+def test_describe(tmp_path):
+    # validates the description of added, removed and changed items, fields and files
+    newOsmosis = copy.deepcopy(osmosis)
+    newOsmosis["chain"]["chain_id"] = "osmosis-2"
+    newOsmosis["chain"]["apis"]["rpc"].append({"address": "https://osmosis-rpc.polkachu.com", "provider": "Polkachu"})
+    newOsmosis["assetlist"]["assets"].pop()
+    newConnection = copy.deepcopy(connection)
+    newConnection["channels"][0]["tags"]["status"] = "INACTIVE"
+    old = registryOf(osmosis, [("mainnet", "cosmoshub-osmosis.json", connection)])
+    new = registryOf(newOsmosis, [
+        ("mainnet", "cosmoshub-osmosis.json", newConnection),
+        ("testnet", "cosmoshub-osmosis.json", connection),
+    ])
+    assert describeChanges(tmp_path, old, new) == [
+        'osmosis chain: field chain_id changed: value "osmosis-1" -> "osmosis-2"',
+        "osmosis chain: endpoint https://osmosis-rpc.polkachu.com added",
+        "osmosis assetlist: asset uion removed",
+        'mainnet cosmoshub-osmosis.json: channel transfer/channel-0/transfer/channel-141 changed: tags.status "ACTIVE" -> "INACTIVE"',
+        "testnet: network type added",
+    ]
+
+def test_describeIbcFile(tmp_path):
+    # validates that an IBC file added in one network type is named with that network type
+    old = registryOf(osmosis, [("mainnet", "cosmoshub-osmosis.json", connection), ("testnet", "cosmoshub-osmosis.json", connection)])
+    new = registryOf(osmosis, [
+        ("mainnet", "cosmoshub-osmosis.json", connection),
+        ("testnet", "cosmoshub-osmosis.json", connection),
+        ("testnet", "juno-osmosis.json", connection),
+    ])
+    assert describeChanges(tmp_path, old, new) == ["testnet juno-osmosis.json: file added"]
@@ -0,0 +1,39 @@
+import json
+import os
+
+from chain_registry import loadRegistry
+from registry_snapshot import RegistrySnapshot, materialize, writeSnapshot
+
+# -- SNAPSHOT --
+# A small registry is written to a temporary directory, snapshotted and read back, and the
+# snapshot is compared with the RegistryIndex it was built from.
+
+def writeJson(root, path, data):
+    path = os.path.join(str(root), path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+def test_matchesRegistryIndex(tmp_path):
+    # validates that chains and IBC connections have the same absolute paths and data as in
+    # RegistryIndex, through both the attributes and the lookups
+    root = tmp_path / "registry"
+    writeJson(root, "osmosis/chain.json", {"chain_name": "osmosis", "chain_id": "osmosis-1"})
+    writeJson(root, "cosmoshub/chain.json", {"chain_name": "cosmoshub", "chain_id": "cosmoshub-4"})
+    writeJson(root, "testnets/osmosistestnet/chain.json", {"chain_name": "osmosistestnet", "chain_id": "osmo-test-5"})
+    writeJson(root, "_IBC/cosmoshub-osmosis.json", {"chain_1": {"chain_name": "cosmoshub"}, "chain_2": {"chain_name": "osmosis"}, "channels": []})
+    registry = loadRegistry(str(root))
+    path, _ = writeSnapshot(registry, str(tmp_path / "registry.snap"))
+    with RegistrySnapshot(path, str(root)) as snapshot:
+        assert [(chain.chain_name, chain.directory, chain.network_type) for chain in snapshot.chains] == [
+            (chain.chain_name, chain.directory, chain.network_type) for chain in registry.chains
+        ]
+        assert snapshot.getChain("osmosis").directory == registry.getChain("osmosis").directory
+        assert os.path.isabs(snapshot.getChain("osmosis").directory)
+        assert [(connection.file_name, connection.path, connection.network_type) for connection in snapshot.ibc] == [
+            (connection.file_name, connection.path, connection.network_type) for connection in registry.ibc
+        ]
+        connection = snapshot.getIbcConnection("osmosis", "cosmoshub")
+        assert connection.path == registry.getIbcConnection("osmosis", "cosmoshub").path
+        assert materialize(connection.data) == registry.getIbcConnection("osmosis", "cosmoshub").data
+        assert snapshot.getIbcConnection("osmosis", "juno") is None
@@ -0,0 +1,60 @@
+import json
+import os
+import sqlite3
+
+import registry_sqlite
+from registry_sqlite import exportRegistry
+
+# -- EXPORT --
+# A small registry is written to a temporary directory and exported, then changed and exported
+# again incrementally, as the CLI does.
+
+def writeJson(root, path, data):
+    path = os.path.join(str(root), path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+def writeRegistry(root):
+    writeJson(root, "osmosis/chain.json", {"chain_name": "osmosis", "chain_id": "osmosis-1"})
+    writeJson(root, "osmosis/assetlist.json", {"chain_name": "osmosis", "assets": [{"base": "uosmo"}]})
+    writeJson(root, "cosmoshub/chain.json", {"chain_name": "cosmoshub", "chain_id": "cosmoshub-4"})
+
+def rows(path, query):
+    connection = sqlite3.connect(path)
+    try:
+        return sorted(connection.execute(query))
+    finally:
+        connection.close()
+
+def test_incremental(tmp_path, monkeypatch):
+    # validates that an unchanged registry is not parsed again and that only the changed chain
+    # directory is rewritten
+    root = tmp_path / "registry"
+    path = str(tmp_path / "registry.sqlite")
+    parsed = []
+    parseJson = registry_sqlite.parseJson
+    monkeypatch.setattr(registry_sqlite, "parseJson", lambda content: parsed.append(content) or parseJson(content))
+    writeRegistry(root)
+    assert exportRegistry(str(root), path) == (3, [], True)
+    parsed.clear()
+    assert exportRegistry(str(root), path) == (0, [], False)
+    assert parsed == []
+    writeJson(root, "osmosis/chain.json", {"chain_name": "osmosis", "chain_id": "osmosis-2"})
+    assert exportRegistry(str(root), path) == (2, [], False)
+    assert len(parsed) == 2
+    assert rows(path, "SELECT chain_name, chain_id FROM chains") == [("cosmoshub", "cosmoshub-4"), ("osmosis", "osmosis-2")]
+    assert rows(path, "SELECT chain_name, base FROM assets") == [("osmosis", "uosmo")]
+
+def test_collisions(tmp_path):
+    # validates that a chain defined by two files keeps both rows and is reported, whichever file
+    # is rewritten last
+    root = tmp_path / "registry"
+    path = str(tmp_path / "registry.sqlite")
+    writeRegistry(root)
+    writeJson(root, "testnets/osmosis/chain.json", {"chain_name": "osmosis", "chain_id": "osmo-test-5"})
+    collision = ("chains", ("osmosis",), [os.path.join("osmosis", "chain.json"), os.path.join("testnets", "osmosis", "chain.json")])
+    assert exportRegistry(str(root), path)[:2] == (4, [collision])
+    writeJson(root, "osmosis/chain.json", {"chain_name": "osmosis", "chain_id": "osmosis-2"})
+    assert exportRegistry(str(root), path)[:2] == (2, [collision])
+    assert rows(path, "SELECT chain_id FROM chains WHERE chain_name = 'osmosis'") == [("osmo-test-5",), ("osmosis-2",)]
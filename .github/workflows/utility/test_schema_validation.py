@@ -0,0 +1,42 @@
+import json
+import os
+
+from schema_validation import validateRegistry
+
+# -- VALIDATION --
+# A registry root with one schema is written to a temporary directory and validated in a
+# process pool, as the CLI does.
+
+schema = {
+    "$schema": "http://json-schema.org/draft-07/schema#",
+    "$id": "https://example.com/chain.schema.json",
+    "type": "object",
+    "required": ["chain_name", "status"],
+    "properties": {
+        "$schema": {"type": "string"},
+        "chain_name": {"type": "string"},
+        "status": {"enum": ["live", "upcoming", "killed"]},
+        "slip44": {"type": "number"},
+    },
+}
+
+def writeJson(root, path, data):
+    path = os.path.join(str(root), path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+def test_everyError(tmp_path):
+    # validates that every violation of a failing file is reported, and that files without a
+    # top-level "$schema" are skipped
+    writeJson(tmp_path, "chain.schema.json", schema)
+    writeJson(tmp_path, "osmosis/chain.json", {"$schema": "../chain.schema.json", "chain_name": "osmosis", "status": "live"})
+    writeJson(tmp_path, "broken/chain.json", {"$schema": "../chain.schema.json", "chain_name": 1, "slip44": "118"})
+    writeJson(tmp_path, "package.json", {"name": "registry", "config": {"$schema": "x"}})
+    count, errors = validateRegistry(str(tmp_path), workers=1)
+    assert count == 2
+    assert errors == [
+        (os.path.join("broken", "chain.json"), "data: 'status' is a required property"),
+        (os.path.join("broken", "chain.json"), "data.chain_name: 1 is not of type 'string'"),
+        (os.path.join("broken", "chain.json"), "data.slip44: '118' is not of type 'number'"),
+    ]
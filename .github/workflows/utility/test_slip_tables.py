@@ -0,0 +1,121 @@
+import functools
+import json
+import os
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import slip_tables
+
+# -- REFRESH --
+# The tables are served from a temporary directory by a local HTTP server that stands in for
+# GitHub; it is made the default URL, so refreshes are written to a temporary snapshot.
+
+slip173 = """# SLIP-0173 : Registered human-readable parts for BIP-0173
+
+| Coin                                       | Mainnet   | Testnet   | Regtest   |
+| ------------------------------------------ | --------- | --------- | --------- |
+| [Osmosis](https://osmosis.zone/)           | `osmo`    |           |           |
+| [Cosmos Hub](https://cosmos.network/)      | `cosmos`  |           |           |
+"""
+
+slip44 = """# SLIP-0044 : Registered coin types for BIP-0044
+
+Coin type  | Path component (`coin_type'`) | Symbol  | Coin
+-----------|-------------------------------|---------|-----------------------------------
+118        | 0x80000076                    | ATOM    | [Atom](https://cosmos.network/)
+"""
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    # (served directory, [request paths]); the registry root and snapshot live in tmp_path too
+    served = tmp_path / "served"
+    served.mkdir()
+    (served / slip_tables.slip173FileName).write_text(slip173, encoding="utf-8")
+    (served / slip_tables.slip44FileName).write_text(slip44, encoding="utf-8")
+    requests = []
+
+    class Handler(SimpleHTTPRequestHandler):
+        def do_GET(self):
+            requests.append(self.path)
+            super().do_GET()
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), functools.partial(Handler, directory=str(served)))
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    url = "http://127.0.0.1:" + str(httpd.server_address[1])
+    monkeypatch.setattr(slip_tables, "defaultBaseURL", url)
+    monkeypatch.setattr(slip_tables, "slipBaseURL", url)
+    monkeypatch.setattr(slip_tables, "snapshotPath", str(tmp_path / "slip_tables.json"))
+    yield served, requests
+    httpd.shutdown()
+    httpd.server_close()
+
+def setCheckedAt(root, checkedAt):
+    path = slip_tables.getCachePath(slip_tables.refreshStateFileName, root)
+    with open(path, encoding="utf-8") as f:
+        state = json.load(f)
+    for name in ("slip173", "slip44"):
+        state[name]["checked_at"] = checkedAt
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+
+def test_snapshotUsedOffline(tmp_path, server):
+    # validates that once a snapshot exists, loading it makes no request
+    _, requests = server
+    root = str(tmp_path)
+    slip173Index, slip44Index = slip_tables.loadSLIPTables(root)
+    assert slip173Index["mainnet_prefixes"] == {"Osmosis": "osmo", "Cosmos Hub": "cosmos"}
+    assert slip44Index["coin_types_by_num"] == {118: "Atom"}
+    requests.clear()
+    assert slip_tables.loadSLIPTables(root) == (slip173Index, slip44Index)
+    assert requests == []
+
+def test_unchangedRefreshCountsAsFresh(tmp_path, server):
+    # validates that a stale check refreshes once, leaves an unchanged snapshot as it was, and
+    # counts as a check, so the next load stays offline
+    _, requests = server
+    root = str(tmp_path)
+    slip_tables.loadSLIPTables(root)
+    with open(slip_tables.snapshotPath, "rb") as f:
+        content = f.read()
+    setCheckedAt(root, time.time() - (slip_tables.maxAgeDays + 1) * 86400)
+    requests.clear()
+    slip_tables.loadSLIPTables(root)
+    assert len(requests) == 2
+    with open(slip_tables.snapshotPath, "rb") as f:
+        assert f.read() == content
+    requests.clear()
+    slip_tables.loadSLIPTables(root)
+    assert requests == []
+
+def test_committedSnapshotNotRefreshedByAge(tmp_path, server):
+    # validates that a checkout without refresh state (CI) uses an old committed snapshot as is
+    _, requests = server
+    root = str(tmp_path)
+    slip_tables.loadSLIPTables(root)
+    os.remove(slip_tables.getCachePath(slip_tables.refreshStateFileName, root))
+    requests.clear()
+    slip_tables.loadSLIPTables(root)
+    assert requests == []
+
+@pytest.mark.parametrize("content", [b"not a table\n", b"abc    | 0x80000076 | X | [X](x)\n", b"\xff\xfe\n"])
+def test_unparsableRefreshFallsBack(tmp_path, server, content):
+    # validates that a refresh returning something that is not a SLIP table keeps the snapshot
+    served, _ = server
+    root = str(tmp_path)
+    tables = slip_tables.loadSLIPTables(root)
+    (served / slip_tables.slip44FileName).write_bytes(content)
+    assert slip_tables.loadSLIPTables(root, refresh=True) == tables
+
+def test_unavailable(tmp_path, server):
+    # validates that without a snapshot a failed refresh raises SLIPTablesUnavailable
+    served, _ = server
+    root = str(tmp_path)
+    os.remove(served / slip_tables.slip173FileName)
+    with pytest.raises(slip_tables.SLIPTablesUnavailable):
+        slip_tables.loadSLIPTables(root)
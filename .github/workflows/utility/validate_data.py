@@ -1,8 +1,16 @@
+import argparse
+import hashlib
 import json
-import urllib.request
 import os
 from os import getcwd
 
+import instrumentation
+from chain_registry import getCachePath, getRegistry
+from denom_traces import ibcDenomMismatches
+from registry_snapshot import loadSnapshot
+from schema_validation import validateRegistry
+from slip_tables import SLIPTablesUnavailable, loadSLIPTables
+
 rootdir = getcwd()
 
 checkSlip173 = 1
@@ -10,200 +18,253 @@ slipWebsites = {}
 slipMainnetPrefixes = {}
 slipTestnetPrefixes = {}
 
-def readSLIP173():
-    slip173URL = "https://raw.githubusercontent.com/satoshilabs/slips/master/slip-0173.md"
-    lines = []
-    for line in urllib.request.urlopen(slip173URL):
-      line = line.decode('utf-8')
-      if (len(line) > 2):
-        if (line[0] == "|" and line[2] == "["):
-          lines.append(line)
-    if lines:
-      for line in lines:
-        pretty = line[3:line.find("]")]
-        website = line[line.find("(")+1:line.find(")")]
-        slipWebsites[pretty] = website
-        secondPipe = line.find("|", 1)
-        thirdPipe = line.find("|", secondPipe + 1)
-        mainnetArea = line[secondPipe:thirdPipe]
-        firstQuote = mainnetArea.find("`")
-        if(firstQuote > 0):
-          secondQuote = mainnetArea.find("`", firstQuote + 1)
-          if(secondQuote > 0):
-            mainnetPrefix = mainnetArea[firstQuote + 1:secondQuote]
-            slipMainnetPrefixes[pretty] = mainnetPrefix
-          else:
-            print("Mainnet Bech32 Prefix undefined - missing second quote")
-        else:
-          print("Mainnet Bech32 Prefix undefined")
-        fourthPipe = line.find("|", thirdPipe + 1)
-        testnetArea = line[thirdPipe:fourthPipe]
-        firstQuote = testnetArea.find("`")
-        if(firstQuote > 0):
-          secondQuote = testnetArea.find("`", firstQuote + 1)
-          if(secondQuote > 0):
-            testnetPrefix = testnetArea[firstQuote + 1:testnetArea.find("`", firstQuote + 1)]
-            slipTestnetPrefixes[pretty] = testnetPrefix
-          else:
-            print("Mainnet Bech32 Prefix undefined - missing second quote")
-    else:
-      raise Exception("no SLIP-0173 entries recorded")
-
 checkSlip44 = 1
 slipCoinTypesByNum = {}
 slipCoinTypesByName = {}
 slip44Websites = {}
 
-def readSLIP44():
-    slip44URL = "https://raw.githubusercontent.com/satoshilabs/slips/master/slip-0044.md"
-    lines = []
-    for line in urllib.request.urlopen(slip44URL):
-      line = line.decode('utf-8')
-      if(len(line) > 6):
-        if(line[0] != "-" and line[0] != "C" and (line[5] == "|" or line[6] == "|" or line[7] == "|" or line[8] == "|" or line[9] == "|" or line[10] == "|" or line[11] == "|")):
-          lines.append(line)
-    if lines:
-      for line in lines:
-        coinNumber = int(line[0:line.find(" ")])
-        if(line.find("[") > 0):
-          pretty = line[line.find("[")+1:line.find("]")]
-          website = line[line.find("(")+1:line.find(")")]
-          slip44Websites[pretty] = website
-        else:
-          firstPipe = line.find("|")
-          secondPipe = line.find("|", firstPipe + 1)
-          thirdPipe = line.find("|", secondPipe + 1)
-          pretty = line[thirdPipe+2:len(line)-1]
-        slipCoinTypesByNum[coinNumber] = pretty
-        slipCoinTypesByName[pretty] = coinNumber
-    else:
-      raise Exception("no SLIP-0044 entries recorded")
+# The snapshot is loaded once for both tables; without one (and offline) the SLIP checks are
+# skipped, so the rest of the validation still runs
+def readSLIPTables(refresh=False):
+    global checkSlip173, checkSlip44
+    try:
+      slip173, slip44 = loadSLIPTables(rootdir, refresh)
+    except SLIPTablesUnavailable as e:
+      print("[WARNING] skipping the SLIP-0173 and SLIP-0044 checks: " + str(e))
+      checkSlip173 = checkSlip44 = 0
+      return
+    if checkSlip173:
+      slipWebsites.update(slip173["websites"])
+      slipMainnetPrefixes.update(slip173["mainnet_prefixes"])
+      slipTestnetPrefixes.update(slip173["testnet_prefixes"])
+    if checkSlip44:
+      slip44Websites.update(slip44["websites"])
+      slipCoinTypesByNum.update(slip44["coin_types_by_num"])
+      slipCoinTypesByName.update(slip44["coin_types_by_name"])
 
-# -----FOR EACH CHAIN-----
-def checkChains():
-    for chainfolder in os.listdir(rootdir):
-        chainjson = os.path.join(chainfolder, "chain.json")
-        print(chainjson + "  - " + str(os.path.exists(chainjson)))
-        if not os.path.exists(chainjson):
-            continue
-        chainSchema = json.load(open(os.path.join(rootdir, chainjson)))
-        assetlistjson = os.path.join(chainfolder, "assetlist.json")
-        print(assetlistjson + "  - " + str(os.path.exists(assetlistjson)))
-        if not os.path.exists(assetlistjson):
-            continue
-        assetlistSchema = json.load(open(os.path.join(rootdir, assetlistjson)))
-        bases = []
-        if "assets" in assetlistSchema:
-          if assetlistSchema["assets"]:
-            for asset in assetlistSchema["assets"]:
-              assetDenoms = []
-              if "denom_units" in asset:
-                if asset["denom_units"]:
-                  for unit in asset["denom_units"]:
-                    if "denom" in unit:
-                      assetDenoms.append(unit["denom"])
-                    else:
-                      raise Exception("unit doesn't contain 'denom' string")
-                    if "aliases" in unit:
-                      for alias in unit["aliases"]:
-                        assetDenoms.append(alias)
-                else:
-                  raise Exception("'denon_units' array doesn't contain any units")
-              else:
-                raise Exception("asset doesn't contain 'denom_units' array")
-              if "base" in asset:
-                if asset["base"] in assetDenoms:
-                  bases.append(asset["base"])
+# -----FOR ONE CHAIN-----
+# Returns every problem found, so one run reports all of them instead of the first
+def checkChain(chainSchema, assetlistSchema):
+    errors = []
+    bases = []
+    if "assets" in assetlistSchema:
+      if assetlistSchema["assets"]:
+        for asset in assetlistSchema["assets"]:
+          assetDenoms = []
+          if "denom_units" in asset:
+            if asset["denom_units"]:
+              for unit in asset["denom_units"]:
+                if "denom" in unit:
+                  assetDenoms.append(unit["denom"])
                 else:
-                  raise Exception("base not in denom_units")
-              else:
-                raise Exception("asset doesn't contain 'base' string")
-              if "display" in asset:
-                if asset["display"] not in assetDenoms:
-                  raise Exception("display " + asset["display"] + " not in denom_units")
-              else:
-                raise Exception("asset doesn't contain 'display' string")
+                  errors.append("unit doesn't contain 'denom' string")
+                if "aliases" in unit:
+                  for alias in unit["aliases"]:
+                    assetDenoms.append(alias)
+            else:
+              errors.append("'denon_units' array doesn't contain any units")
           else:
-            raise Exception("'assets' array doesn't contain any tokens")
-        else:
-          raise Exception("assetlist schema doesn't contain 'assets' array")
-        if "fees" in chainSchema:
-          if "fee_tokens" in chainSchema["fees"]:
-            if chainSchema["fees"]["fee_tokens"]:
-              for token in chainSchema["fees"]["fee_tokens"]:
-                if "denom" in token:
-                  if token["denom"] not in bases:
-                    raise Exception(token["denom"] + " is not in bases")
-                else:
-                  raise Exception("token doesn't contain 'denom' string")
+            errors.append("asset doesn't contain 'denom_units' array")
+          if "base" in asset:
+            if asset["base"] in assetDenoms:
+              bases.append(asset["base"])
             else:
-              raise Exception("'fee_tokens' array doesn't contain any tokens")
+              errors.append("base not in denom_units")
+          else:
+            errors.append("asset doesn't contain 'base' string")
+          if "display" in asset:
+            if asset["display"] not in assetDenoms:
+              errors.append("display " + asset["display"] + " not in denom_units")
           else:
-            raise Exception("'fees' object doesn't contain 'fee_tokens' array")
+            errors.append("asset doesn't contain 'display' string")
+        for asset, path, expected in ibcDenomMismatches(assetlistSchema["assets"]):
+          if expected is None:
+            errors.append("IBC denom " + asset["base"] + " has no trace path")
+          else:
+            errors.append("IBC denom " + asset["base"] + " does not match the hash of " + path + " (" + expected + ")")
+      else:
+        errors.append("'assets' array doesn't contain any tokens")
+    else:
+      errors.append("assetlist schema doesn't contain 'assets' array")
+    if "fees" in chainSchema:
+      if "fee_tokens" in chainSchema["fees"]:
+        if chainSchema["fees"]["fee_tokens"]:
+          for token in chainSchema["fees"]["fee_tokens"]:
+            if "denom" in token:
+              if token["denom"] not in bases:
+                errors.append(token["denom"] + " is not in bases")
+            else:
+              errors.append("token doesn't contain 'denom' string")
         else:
-          print("[OPTIONAL - Keplr Compliance] chain schema doesn't contain 'fees' object")
-        if "staking" in chainSchema:
-          if "staking_tokens" in chainSchema["staking"]:
-            if chainSchema["staking"]["staking_tokens"]:
-              for token in chainSchema["staking"]["staking_tokens"]:
-                if "denom" in token:
-                  if token["denom"] not in bases:
-                    raise Exception(token["denom"] + " is not in bases")
-                else:
-                  raise Exception("token doesn't contain 'denom' string")
+          errors.append("'fee_tokens' array doesn't contain any tokens")
+      else:
+        errors.append("'fees' object doesn't contain 'fee_tokens' array")
+    else:
+      print("[OPTIONAL - Keplr Compliance] chain schema doesn't contain 'fees' object")
+    if "staking" in chainSchema:
+      if "staking_tokens" in chainSchema["staking"]:
+        if chainSchema["staking"]["staking_tokens"]:
+          for token in chainSchema["staking"]["staking_tokens"]:
+            if "denom" in token:
+              if token["denom"] not in bases:
+                errors.append(token["denom"] + " is not in bases")
             else:
-              raise Exception("'staking_tokens' array doesn't contain any tokens")
-          else:
-            raise Exception("'fees' object doesn't contain 'staking_tokens' array")
+              errors.append("token doesn't contain 'denom' string")
         else:
-          print("[OPTIONAL - Keplr Compliance] chain schema doesn't contain 'staking' object")
-        if "network_type" in chainSchema:
-          networkType = chainSchema["network_type"]
-          if networkType == "mainnet":
-            slipPrefixes = slipMainnetPrefixes
-          elif networkType == "testnet":
-            slipPrefixes = slipTestnetPrefixes
+          errors.append("'staking_tokens' array doesn't contain any tokens")
+      else:
+        errors.append("'fees' object doesn't contain 'staking_tokens' array")
+    else:
+      print("[OPTIONAL - Keplr Compliance] chain schema doesn't contain 'staking' object")
+    # without a known network type there are no SLIP-0173 prefixes to compare against
+    slipPrefixes = None
+    if "network_type" in chainSchema:
+      networkType = chainSchema["network_type"]
+      if networkType == "mainnet":
+        slipPrefixes = slipMainnetPrefixes
+      elif networkType == "testnet":
+        slipPrefixes = slipTestnetPrefixes
+      else:
+        errors.append("network type unknown (not Mainnet nor Testnet)")
+    else:
+      errors.append("chain schema doesn't contain 'network_type'")
+    if "pretty_name" in chainSchema:
+      prettyName = chainSchema["pretty_name"]
+      if checkSlip173 and slipPrefixes is not None:
+        if "bech32_prefix" in chainSchema:
+          if prettyName == "Terra Classic" or prettyName == "Terra 2.0":
+              prettyName = "Terra"
+          if prettyName in slipWebsites:
+            if prettyName in slipPrefixes:
+              if chainSchema["bech32_prefix"] != slipPrefixes[prettyName]:
+                errors.append("chain.json bech32 prefix " + chainSchema["bech32_prefix"] + " does not match SLIP-0173 prefix " + slipPrefixes[prettyName])
+            else:
+              errors.append(prettyName + " SLIP-0173 registeration does not have prefix")
           else:
-            raise Exception("network type unknown (not Mainnet nor Testnet)")
+            errors.append(prettyName + "  not registered to SLIP-0173")
         else:
-          raise Exception("chain schema doesn't contain 'network_type'")
-        if "pretty_name" in chainSchema:
-          prettyName = chainSchema["pretty_name"]
-          if checkSlip173:
-            if "bech32_prefix" in chainSchema:
-              if prettyName == "Terra Classic" or prettyName == "Terra 2.0":
-                  prettyName = "Terra"
-              if prettyName in slipWebsites:
-                if prettyName in slipPrefixes:
-                  if chainSchema["bech32_prefix"] != slipPrefixes[prettyName]:
-                    raise Exception("chain.json bech32 prefix " + chainSchema["bech32_prefix"] + " does not match SLIP-0173 prefix " + slipPrefixes[prettyName])
-                else:
-                  raise Exception(prettyName + " SLIP-0173 registeration does not have prefix")
-              else:
-                raise Exception(prettyName + "  not registered to SLIP-0173")
-            else:
-              raise Exception(prettyName + " missing 'bech32_prefix'")
-          if checkSlip44:
-            if "slip44" in chainSchema:
-              coinType = chainSchema["slip44"]
-              if prettyName in slipCoinTypesByName:
-                if coinType != slipCoinTypesByName[prettyName]:
-                  raise Exception("Chain schema Coin Type " + str(coinType) + " does not equal slip44 registration " + str(slipCoinTypesByName[prettyName]))
-              else:
-                if coinType in slipCoinTypesByNum:
-                  if slipCoinTypesByNum[coinType] == "":
-                    raise Exception("Coin Type " + str(coinType) + " is unregistered in SLIP44")
-                else:
-                  raise Exception("Coin Type " + str(coinType) + " is unreserved in SLIP44")
+          errors.append(prettyName + " missing 'bech32_prefix'")
+      if checkSlip44:
+        if "slip44" in chainSchema:
+          coinType = chainSchema["slip44"]
+          if prettyName in slipCoinTypesByName:
+            if coinType != slipCoinTypesByName[prettyName]:
+              errors.append("Chain schema Coin Type " + str(coinType) + " does not equal slip44 registration " + str(slipCoinTypesByName[prettyName]))
+          else:
+            if coinType in slipCoinTypesByNum:
+              if slipCoinTypesByNum[coinType] == "":
+                errors.append("Coin Type " + str(coinType) + " is unregistered in SLIP44")
             else:
-              print("[OPTIONAL - Keplr Compliance] chain schema doesn't contain 'slip44' string")
+              errors.append("Coin Type " + str(coinType) + " is unreserved in SLIP44")
         else:
-          raise Exception("chainSchema does not contain 'pretty_name'")
-    print("Done")
+          print("[OPTIONAL - Keplr Compliance] chain schema doesn't contain 'slip44' string")
+    else:
+      errors.append("chainSchema does not contain 'pretty_name'")
+    return errors
+
+# -----INCREMENTAL STATE-----
+# Each chain's result is stored under a key over the content hashes of its chain.json and
+# assetlist.json, plus the SLIP tables it is checked against; only chains whose key changed
+# are validated again. fee/staking tokens can only reference the chain's own assetlist, so a
+# changed assetlist re-validates exactly the chain that depends on it.
+manifestVersion = 3
+manifestFileName = "validate_data.json"
+
+def slipFingerprint():
+  tables = [checkSlip173, checkSlip44, slipWebsites, slipMainnetPrefixes, slipTestnetPrefixes, slipCoinTypesByName, {str(k): v for k, v in slipCoinTypesByNum.items()}]
+  return hashlib.sha256(json.dumps(tables, sort_keys=True).encode("utf-8")).hexdigest()
+
+def chainKey(registry, chainjson, assetlistjson, slip):
+  parts = [str(manifestVersion), registry.digests.get(chainjson, ""), registry.digests.get(assetlistjson, ""), slip]
+  return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+
+def loadManifest():
+  try:
+    with open(getCachePath(manifestFileName, rootdir)) as f:
+      manifest = json.load(f)
+  except (OSError, ValueError):
+    return {}
+  if manifest.get("version") != manifestVersion:
+    return {}
+  return manifest.get("chains", {})
+
+@instrumentation.stage("save_manifest")
+def saveManifest(results):
+  path = getCachePath(manifestFileName, rootdir)
+  with open(path + ".tmp", "w") as f:
+    json.dump({"version": manifestVersion, "chains": results}, f, indent=2)
+  os.replace(path + ".tmp", path)
+
+# -----FOR EACH CHAIN-----
+# Returns every failure as "<chain folder>: <problem>"; runAll() reports them
+@instrumentation.stage("check_chains")
+def checkChains(incremental=False, snapshot=None):
+    # a snapshot (see registry_snapshot.py) is read lazily instead of parsing every file; one
+    # that no longer matches the working tree is rebuilt first
+    registry = loadSnapshot(snapshot, rootdir) if snapshot else getRegistry(rootdir)
+    previous = loadManifest() if incremental else {}
+    slip = slipFingerprint()
+    results = {}
+    failures = []
+    checked = 0
+    for chain in registry.getChains(network_types=["mainnet"], domains=["cosmos"]):
+        chainfolder = os.path.basename(chain.directory)
+        chainjson = os.path.join(chainfolder, "chain.json")
+        assetlistjson = os.path.join(chainfolder, "assetlist.json")
+        parseErrors = [path + " could not be parsed: " + registry.errors[path] for path in (chainjson, assetlistjson) if path in registry.errors]
+        if parseErrors:
+            failures += parseErrors
+            continue
+        print(chainjson + "  - " + str(chain.chain is not None))
+        if chain.chain is None:
+            continue
+        print(assetlistjson + "  - " + str(chain.assetlist is not None))
+        if chain.assetlist is None:
+            continue
+        key = chainKey(registry, chainjson, assetlistjson, slip)
+        if chainfolder in previous and previous[chainfolder]["key"] == key:
+            errors = previous[chainfolder]["errors"]
+            instrumentation.count("chains_cached")
+        else:
+            checked += 1
+            instrumentation.count("chains_validated")
+            try:
+                errors = checkChain(chain.chain, chain.assetlist)
+            except Exception as e:
+                # malformed data the checks do not guard against (e.g. a non-object asset)
+                errors = ["could not be checked: " + str(e)]
+        results[chainfolder] = {"key": key, "errors": errors}
+        failures += [chainfolder + ": " + error for error in errors]
+    if incremental:
+        saveManifest(results)
+        print("Validated " + str(checked) + " of " + str(len(results)) + " chains (others unchanged)")
+    return failures
     
-def runAll():
-  if checkSlip173:
-    readSLIP173()
-  if checkSlip44:
-    readSLIP44()
-  checkChains()
+def checkSchemas():
+  count, errors = validateRegistry(rootdir)
+  print("Validated " + str(count) + " file(s) against their schemas")
+  return [path + ": " + error for path, error in errors]
+
+# Schema and chain failures are collected and reported together, then raised once
+@instrumentation.stage("run_all")
+def runAll(incremental=False, refreshSlip=False, snapshot=None, schemas=True):
+  failures = []
+  if schemas:
+    failures += checkSchemas()
+  if checkSlip173 or checkSlip44:
+    readSLIPTables(refreshSlip)
+  failures += checkChains(incremental, snapshot)
+  for failure in failures:
+    print("[FAILED] " + failure)
+  if failures:
+    raise Exception(str(len(failures)) + " problem(s) found in validation")
+  print("Done")
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Validate chain.json and assetlist.json data against each other and SLIP-0044/SLIP-0173")
+  parser.add_argument("--incremental", action="store_true", help="only re-validate chains whose files changed since the last run")
+  parser.add_argument("--refresh-slip", action="store_true", help="check for newer SLIP-0044/SLIP-0173 tables before validating")
+  parser.add_argument("--snapshot", default=None, help="read the registry from a binary snapshot instead of the JSON files (rebuilt if out of date)")
+  parser.add_argument("--skip-schemas", action="store_true", help="do not validate files against their JSON schemas first")
+  args = parser.parse_args()
+  runAll(args.incremental, args.refresh_slip, args.snapshot, not args.skip_schemas)
@@ -1,6 +1,6 @@
 import json
 import os
-import random as rand
+import sys
 import time
 from multiprocessing import Pool
 
@@ -8,23 +8,12 @@ import requests
 
 current_dir = os.path.dirname(os.path.realpath(__file__))
 parent_dir = os.path.dirname(current_dir)
-folders = [
-    folder
-    for folder in os.listdir(parent_dir)
-    if os.path.isdir(os.path.join(parent_dir, folder))
-]
-
-IGNORE_FOLDERS: list[str] = [
-    "_IBC",
-    "_memo_keys",
-    "_non-cosmos",
-    "_scripts",
-    "_template",
-    ".github",
-    "testnets",
-    ".git",
-    ".mypy_cache",
-]
+
+sys.path.append(os.path.join(parent_dir, ".github", "workflows", "utility"))
+from chain_registry import loadRegistry  # noqa: E402
+from endpoint_history import EndpointHistory  # noqa: E402
+from json_files import writeJsonFile  # noqa: E402
+import instrumentation  # noqa: E402
 
 IGNORE_CHAINS: list[str] = []
 
@@ -34,106 +23,105 @@ thirty_days_ago = epoch_time - (60 * 60 * 24 * 10 * 1_000)
 TIMEOUT_SECONDS = 10
                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                  
 
-# endpoint_type == 'rpc' or 'rest'
-def remove_endpoint(folder: str, endpoint_url, endpoint_type: str, iter_num: int = 0):
-    chain_dir = os.path.join(parent_dir, folder, f"chain.json")
-
-    if iter_num > 25:
-        print(f"ISSUE: {folder} {endpoint_type} {endpoint_url}")
-        return
+# removals: {endpoint_type: {address, ...}} where endpoint_type == 'rpc' or 'rest'
+def apply_removals(folder: str, removals: dict[str, set[str]]) -> bool:
+    # Only the main process writes: each affected chain.json is read once, every removal
+    # for it is applied, and it is written once (atomically) only if something changed.
+    chain_dir = os.path.join(parent_dir, folder, "chain.json")
 
     with open(chain_dir, "r") as f:
-        try:
-            chain_data = json.load(f)
-        except Exception as e:
-            # multiprocessing 'patch'
-            time.sleep(rand.uniform(0.1, 5.0))
-            remove_endpoint(folder, endpoint_url, endpoint_type, iter_num + 1)
-            return
-
-    print(f"[-] {folder} {endpoint_type} {endpoint_url}")
+        chain_data = json.load(f)
+
     apis: dict = chain_data.get("apis", {})
     if len(apis) == 0:
-        return
-
-    # [{"address": "https://api.comdex.audit.one/rest","provider": "audit"},...]
-    endpoints = apis.get(endpoint_type, [])
+        return False
+
+    changed = False
+    for endpoint_type, addresses in removals.items():
+        # [{"address": "https://api.comdex.audit.one/rest","provider": "audit"},...]
+        endpoints = apis.get(endpoint_type, [])
+        kept = [
+            endpoint
+            for endpoint in endpoints
+            if endpoint.get("address", "") not in addresses
+        ]
+        for endpoint in endpoints:
+            if endpoint.get("address", "") in addresses:
+                print(f"[-] {folder} {endpoint_type} {endpoint['address']}")
+        if len(kept) != len(endpoints):
+            apis[endpoint_type] = kept
+            changed = True
+
+    if not changed:
+        return False
 
-    apis[endpoint_type] = [
-        endpoint
-        for endpoint in endpoints
-        if endpoint.get("address", "") != endpoint_url
-    ]
     chain_data["apis"] = apis
+    return writeJsonFile(chain_dir, chain_data)
 
-    with open(chain_dir, "w") as f:
-        json.dump(chain_data, f, indent=2, ensure_ascii=False)
 
-
-def do_last_time(folder, _type, addr, last_time_endpoints):
-    # check when the last time it was on. If it is >30 days, remove from chain.json
-    last_online_time = last_time_endpoints[addr].get("lastSuccessAt", -1)
+def do_last_time(folder, _type, addr, last_success_at):
+    # check when the last time it was on. If it is >30 days, report it for removal from chain.json
+    last_online_time = last_success_at * 1000 if last_success_at is not None else -1
 
     if last_online_time < thirty_days_ago:
+        url = addr[:-1] if addr.endswith("/") else addr
         try:
-            if addr.endswith("/"):
-                addr = addr[:-1]
-
-            query = requests.get(f"{addr}/", timeout=TIMEOUT_SECONDS)
+            query = requests.get(f"{url}/", timeout=TIMEOUT_SECONDS)
             if query.status_code not in [200, 501]:  # 501 = default REST API
-                remove_endpoint(folder, addr, _type)
+                return folder, _type, addr
 
         except Exception:
-            remove_endpoint(folder, addr, _type)
-
-
-def api_check(folder: str, apis: dict) -> list[str]:
-    tasks = []
-    res = requests.get(f"https://status.cosmos.directory/{folder}").json()
-
-    for _type in ["rpc", "rest"]:
-        last_time_endpoints = res[_type]["current"]
+            return folder, _type, addr
 
-        for rpc1 in apis[_type]:
-            for rpc2 in last_time_endpoints.keys():
-                addr = rpc1["address"]
-                if addr == rpc2:
-                    tasks.append([folder, _type, addr, last_time_endpoints])
-
-    return tasks
+    return None
 
 
 def main():
-    to_check: list[str, dict[str, str]] = []
+    tasks: list[list] = []
 
-    for idx, folder in enumerate(folders):
-        if folder in IGNORE_FOLDERS + IGNORE_CHAINS:
-            continue
+    # probe results recorded by .github/workflows/tests/apis.py
+    with instrumentation.stage("load_history"):
+        history = EndpointHistory(root=parent_dir).load()
 
-        path = f"{parent_dir}/{folder}/chain.json"
-        if not os.path.exists(path):
-            continue
+    registry = loadRegistry(parent_dir)
+    for path in registry.errors:
+        print(f"[!] {path} issue")
 
-        try:
-            apis: dict = json.loads(open(path).read())
-        except Exception:
-            print(f"[!] {folder} chain.json issue")
+    for chain in registry.getChains(network_types=["mainnet"], domains=["cosmos"]):
+        folder = os.path.basename(chain.directory)
+        if folder in IGNORE_CHAINS or chain.chain is None:
             continue
 
-        apis = apis.get("apis", {})  # rpc, rest, grpc
-
-        if len(apis) == 0:
+        apis = chain.chain.get("apis", {})  # rpc, rest, grpc
+
+        for _type in ["rpc", "rest"]:
+            for endpoint in apis.get(_type, []):
+                addr = endpoint.get("address")
+                # never probed, or first probed within the window: no evidence it is stale
+                first_seen = history.first_seen(addr) if addr else None
+                if first_seen is not None and first_seen * 1000 < thirty_days_ago:
+                    tasks.append([folder, _type, addr, history.last_success(addr)])
+
+    with instrumentation.stage("pool_startup"):
+        pool = Pool(os.cpu_count() * 2)
+    with pool as p, instrumentation.stage("probe"):
+        stale = p.starmap(do_last_time, tasks)
+    # the workers only probe candidates whose last success is too old
+    instrumentation.count("candidates", len(tasks))
+    instrumentation.count("stale", sum(removal is not None for removal in stale))
+
+    # group per chain so every file is rewritten at most once, by this process only
+    change_sets: dict[str, dict[str, set[str]]] = {}
+    for removal in stale:
+        if removal is None:
             continue
+        folder, _type, addr = removal
+        change_sets.setdefault(folder, {}).setdefault(_type, set()).add(addr)
 
-        to_check.append([folder, apis])
-
-    with Pool(os.cpu_count() * 2) as p:
-        tasks = p.starmap(api_check, to_check)
-
-    tasks = [task for sublist in tasks for task in sublist]
-
-    with Pool(os.cpu_count() * 2) as p:
-        p.starmap(do_last_time, tasks)
+    with instrumentation.stage("apply_removals"):
+        written = sum(apply_removals(folder, removals) for folder, removals in sorted(change_sets.items()))
+    instrumentation.count("files_written", written)
+    print(f"Removed stale endpoints from {written} chain.json file(s)")
 
 
 if __name__ == "__main__":